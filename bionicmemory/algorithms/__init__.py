@@ -4,4 +4,8 @@
 包含仿生记忆系统的核心算法：
 - 牛顿冷却遗忘算法
 - 聚类抑制机制
+- 可插拔抑制策略（k-means、MMR、阈值去重、不抑制）
+- 列式检索候选集合
+- 球面k-means聚类（支持热启动）
+- 按用户的聚类质心缓存
 """
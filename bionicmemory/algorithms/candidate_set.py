@@ -0,0 +1,188 @@
+"""
+列式检索候选集合
+检索到抑制的整条链路以列存储候选：ID、距离、有效访问次数、时间戳为NumPy数组，全部向量为一个矩阵，
+元数据与文档文本只保留ChromaDB返回对象的引用，按需读取；
+抑制与排序只做下标运算，最终的k条记录才物化为字典
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class CandidateSet:
+    """
+    列式候选集合（不可变语义：take / with_columns 均返回新对象，数组按下标取子集）
+    """
+
+    __slots__ = ("ids", "distances", "valid_counts", "timestamps", "embeddings",
+                 "metadatas", "documents", "cluster_sizes")
+
+    def __init__(self,
+                 ids: List[str],
+                 distances: np.ndarray,
+                 valid_counts: np.ndarray,
+                 timestamps: np.ndarray,
+                 embeddings: Optional[np.ndarray],
+                 metadatas: List[Dict],
+                 documents: List[str],
+                 cluster_sizes: Optional[np.ndarray] = None):
+        """
+        Args:
+            ids: 文档ID列表
+            distances: 与查询的距离（float64，缺失为NaN）
+            valid_counts: 有效访问次数（float64）
+            timestamps: 最近更新时间的epoch秒（float64，缺失为NaN）
+            embeddings: 形如 (N, D) 的float32向量矩阵；检索未返回向量时为None
+            metadatas: 元数据引用列表
+            documents: 文档（摘要）文本引用列表
+            cluster_sizes: 抑制后每个代表所代表的记录数（抑制前为None）
+        """
+        self.ids = ids
+        self.distances = distances
+        self.valid_counts = valid_counts
+        self.timestamps = timestamps
+        self.embeddings = embeddings
+        self.metadatas = metadatas
+        self.documents = documents
+        self.cluster_sizes = cluster_sizes
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_columns(cls,
+                     ids: Sequence[str],
+                     distances: Sequence[Optional[float]],
+                     metadatas: Sequence[Dict],
+                     documents: Sequence[str],
+                     embeddings,
+                     valid_counts: Optional[Sequence[float]] = None,
+                     timestamps: Optional[Sequence[float]] = None) -> "CandidateSet":
+        """
+        由ChromaDB返回的各列构建候选集合，丢弃没有向量的记录（无法参与抑制）
+
+        Args:
+            ids: 文档ID
+            distances: 距离（可为None）
+            metadatas: 元数据
+            documents: 文档文本
+            embeddings: 向量列表/矩阵；为None或空时集合不含向量矩阵
+            valid_counts: 有效访问次数，默认取元数据中的 valid_access_count
+            timestamps: 时间戳，默认全部为NaN
+        """
+        n = len(ids)
+        metadatas = list(metadatas)
+        documents = list(documents) + [""] * max(0, n - len(documents))
+        distance_array = np.asarray(
+            [np.nan if d is None else float(d) for d in distances] + [np.nan] * max(0, n - len(distances)),
+            dtype=np.float64
+        )
+        if valid_counts is None:
+            valid_counts = [float((m or {}).get("valid_access_count", 1.0)) for m in metadatas]
+        count_array = np.asarray(valid_counts, dtype=np.float64)
+        timestamp_array = (
+            np.asarray(timestamps, dtype=np.float64) if timestamps is not None else np.full(n, np.nan)
+        )
+
+        if embeddings is None or len(embeddings) == 0:
+            return cls(list(ids), distance_array, count_array, timestamp_array, None, metadatas, documents)
+
+        keep = [i for i in range(n) if i < len(embeddings) and embeddings[i] is not None and len(embeddings[i]) > 0]
+        matrix = np.asarray([embeddings[i] for i in keep], dtype=np.float32) if keep else None
+        if len(keep) == n:
+            return cls(list(ids), distance_array, count_array, timestamp_array, matrix, metadatas, documents)
+
+        index = np.asarray(keep, dtype=np.int64)
+        return cls(
+            [ids[i] for i in keep],
+            distance_array[index],
+            count_array[index],
+            timestamp_array[index],
+            matrix,
+            [metadatas[i] for i in keep],
+            [documents[i] for i in keep]
+        )
+
+    def take(self, indices) -> "CandidateSet":
+        """
+        按下标取子集（保持下标顺序）
+
+        Args:
+            indices: 下标序列或数组
+        """
+        index = np.asarray(indices, dtype=np.int64)
+        return CandidateSet(
+            [self.ids[i] for i in index],
+            self.distances[index],
+            self.valid_counts[index],
+            self.timestamps[index],
+            self.embeddings[index] if self.embeddings is not None else None,
+            [self.metadatas[i] for i in index],
+            [self.documents[i] for i in index],
+            self.cluster_sizes[index] if self.cluster_sizes is not None else None
+        )
+
+    def with_columns(self,
+                     distances: Optional[np.ndarray] = None,
+                     valid_counts: Optional[np.ndarray] = None,
+                     cluster_sizes: Optional[np.ndarray] = None,
+                     timestamps: Optional[np.ndarray] = None) -> "CandidateSet":
+        """替换部分数值列，返回新集合（其余列共享引用）"""
+        return CandidateSet(
+            self.ids,
+            self.distances if distances is None else np.asarray(distances, dtype=np.float64),
+            self.valid_counts if valid_counts is None else np.asarray(valid_counts, dtype=np.float64),
+            self.timestamps if timestamps is None else np.asarray(timestamps, dtype=np.float64),
+            self.embeddings,
+            self.metadatas,
+            self.documents,
+            self.cluster_sizes if cluster_sizes is None else np.asarray(cluster_sizes, dtype=np.int64)
+        )
+
+    def concat(self, other: "CandidateSet") -> "CandidateSet":
+        """拼接两个集合（两者需同时有或同时没有向量矩阵）"""
+        if (self.embeddings is None) != (other.embeddings is None):
+            raise ValueError("拼接的候选集合向量列不一致")
+        return CandidateSet(
+            self.ids + other.ids,
+            np.concatenate([self.distances, other.distances]),
+            np.concatenate([self.valid_counts, other.valid_counts]),
+            np.concatenate([self.timestamps, other.timestamps]),
+            np.vstack([self.embeddings, other.embeddings]) if self.embeddings is not None else None,
+            self.metadatas + other.metadatas,
+            self.documents + other.documents
+        )
+
+    def to_records(self, include_embedding: bool = True) -> List[Dict]:
+        """
+        物化为记录字典列表（与检索接口返回的字典格式一致）
+
+        Args:
+            include_embedding: 是否附带embedding列表
+        """
+        records = []
+        for i, doc_id in enumerate(self.ids):
+            metadata = self.metadatas[i] or {}
+            distance = self.distances[i]
+            timestamp = self.timestamps[i]
+            record = {
+                "doc_id": doc_id,
+                "content": metadata.get("content", ""),
+                "summary_document": self.documents[i],
+                "distance": None if np.isnan(distance) else float(distance),
+                "valid_access_count": float(self.valid_counts[i]),
+                "last_updated": metadata.get("last_updated", ""),
+                "last_updated_ts": 0.0 if np.isnan(timestamp) else float(timestamp),
+                "source_type": metadata.get("source_type", ""),
+                "user_id": metadata.get("user_id", ""),
+                "embedding": self.embeddings[i].tolist() if include_embedding and self.embeddings is not None else None
+            }
+            if metadata.get("parent_id"):
+                record["parent_id"] = metadata["parent_id"]
+            if self.cluster_sizes is not None:
+                record["cluster_size"] = int(self.cluster_sizes[i])
+            records.append(record)
+        return records
@@ -0,0 +1,148 @@
+"""
+按用户缓存的聚类质心
+同一用户相邻两轮对话的检索候选高度重叠，缓存上一轮的质心用于下一轮k-means热启动；
+候选ID集合完全不变时直接复用上一轮的簇分配，跳过聚类
+缓存以用户（及集合）为键，按LRU淘汰
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional
+
+import numpy as np
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class CentroidCacheEntry:
+    """单个缓存项：上一轮的候选ID集合、簇分配与质心"""
+
+    __slots__ = ("id_set", "labels_by_id", "centers", "cluster_count")
+
+    def __init__(self, id_set: FrozenSet[str], labels_by_id: Dict[str, int], centers: np.ndarray, cluster_count: int):
+        self.id_set = id_set
+        self.labels_by_id = labels_by_id
+        self.centers = centers
+        self.cluster_count = cluster_count
+
+class CentroidCache:
+    """
+    质心缓存（LRU）
+    线程安全；命中统计分为完全复用（候选集合不变）与热启动（沿用质心重新迭代）
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        初始化质心缓存
+
+        Args:
+            max_entries: 最多缓存的用户（键）数，超出时淘汰最久未使用的
+        """
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, CentroidCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.label_reuses = 0
+        self.warm_starts = 0
+        self.cold_starts = 0
+        self.evictions = 0
+        self.iterations_saved = 0.0
+        # 冷启动平均迭代次数（EMA），作为估算热启动节省迭代数的基准
+        self._cold_iterations_ema: Optional[float] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str) -> Optional[CentroidCacheEntry]:
+        """
+        查找缓存项并刷新其LRU位置
+
+        Args:
+            key: 缓存键（集合名:用户ID）
+        """
+        with self._lock:
+            self.lookups += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CentroidCacheEntry):
+        """
+        写入缓存项，超出容量时淘汰最久未使用的键
+
+        Args:
+            key: 缓存键
+            entry: 缓存项
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[str] = None):
+        """
+        失效缓存
+
+        Args:
+            key: 指定键，默认清空全部
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def record_label_reuse(self):
+        """记录一次完全复用（省去整次聚类，按冷启动平均迭代次数计入节省）"""
+        with self._lock:
+            self.label_reuses += 1
+            if self._cold_iterations_ema is not None:
+                self.iterations_saved += self._cold_iterations_ema
+
+    def record_run(self, warm: bool, n_iter: int):
+        """
+        记录一次聚类运行
+
+        Args:
+            warm: 是否为热启动
+            n_iter: 本次迭代次数
+        """
+        with self._lock:
+            if warm:
+                self.warm_starts += 1
+                if self._cold_iterations_ema is not None:
+                    self.iterations_saved += max(0.0, self._cold_iterations_ema - n_iter)
+            else:
+                self.cold_starts += 1
+                if self._cold_iterations_ema is None:
+                    self._cold_iterations_ema = float(n_iter)
+                else:
+                    self._cold_iterations_ema = 0.9 * self._cold_iterations_ema + 0.1 * n_iter
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存统计
+
+        Returns:
+            容量、查找次数、命中率（完全复用+热启动）及估算节省的迭代次数
+        """
+        with self._lock:
+            hits = self.label_reuses + self.warm_starts
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "lookups": self.lookups,
+                "label_reuses": self.label_reuses,
+                "warm_starts": self.warm_starts,
+                "cold_starts": self.cold_starts,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+                "avg_cold_iterations": round(self._cold_iterations_ema, 2) if self._cold_iterations_ema is not None else None,
+                "iterations_saved": round(self.iterations_saved, 1)
+            }
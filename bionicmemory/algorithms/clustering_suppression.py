@@ -6,142 +6,141 @@
 1. 从短期记忆中加载数倍(t:聚类平均条数)目标所需条数(k*n：从n倍的检索结果中取topk)的相关记录（含embedding），总检索条数=t*k*n
 2. 对结果根据embedding进行k-means聚类，簇数为k*n（同条数/t）
 3. 每簇取与检索最相似的代表当前簇，返回k个簇代表作为最终结果
+
+聚类后端默认使用内置的NumPy球面k-means（余弦、k-means++播种、单次初始化），
+scikit-learn 为可选依赖，安装后可通过 kmeans_backend="sklearn" 切回 KMeans(n_init=10)
 """
 
 import numpy as np
-from sklearn.cluster import KMeans
-from typing import List, Dict, Tuple
+from typing import List, Optional, Tuple
 import logging
 
+from bionicmemory.algorithms.spherical_kmeans import SphericalKMeans
+from bionicmemory.algorithms.suppression_strategy import SuppressionStrategy
+from bionicmemory.algorithms.centroid_cache import CentroidCache, CentroidCacheEntry
+
+try:
+    from sklearn.cluster import KMeans
+except ImportError:
+    KMeans = None
+
 # 使用统一日志配置
 from bionicmemory.utils.logging_config import get_logger
 logger = get_logger(__name__)
 
-class ClusteringSuppression:
+class ClusteringSuppression(SuppressionStrategy):
     """
-    聚类抑制机制
+    聚类抑制机制（抑制策略 "kmeans"）
     通过k-means聚类对相似记忆进行分组，从每组中选择最相关的代表
     """
     
+    name = "kmeans"
+    
     def __init__(self, 
                  cluster_multiplier: int = 3,
-                 retrieval_multiplier: int = 2):
+                 retrieval_multiplier: int = 2,
+                 kmeans_backend: str = "spherical",
+                 centroid_cache: Optional[CentroidCache] = None):
         """
         初始化聚类抑制机制
         
         Args:
             cluster_multiplier: 每个簇期望包含的记录数量，默认3条
             retrieval_multiplier: 检索结果倍数，默认2倍
+            kmeans_backend: 聚类后端，"spherical"（内置NumPy球面k-means）或 "sklearn"（需安装scikit-learn）
+            centroid_cache: 按用户的质心缓存，提供时以上一轮质心热启动，候选集合不变时直接复用簇分配
         """
-        self.cluster_multiplier = cluster_multiplier
-        self.retrieval_multiplier = retrieval_multiplier
-        logger.info(f"聚类抑制机制初始化: 每簇期望记录数={cluster_multiplier}, 检索倍数={retrieval_multiplier}")
-    
-    
-
-    
-    
-    
+        if kmeans_backend not in ("spherical", "sklearn"):
+            raise ValueError(f"不支持的聚类后端: {kmeans_backend}")
+        if kmeans_backend == "sklearn" and KMeans is None:
+            logger.warning("未安装scikit-learn，聚类后端回退为球面k-means")
+            kmeans_backend = "spherical"
+        
+        super().__init__(cluster_multiplier, retrieval_multiplier)
+        self.kmeans_backend = kmeans_backend
+        self.centroid_cache = centroid_cache
+        logger.info(f"聚类抑制机制初始化: 每簇期望记录数={cluster_multiplier}, 检索倍数={retrieval_multiplier}, 聚类后端={kmeans_backend}")
     
-    def calculate_retrieval_parameters(self, target_k: int) -> Tuple[int, int]:
+    def _fit_predict(self,
+                     embeddings_array: np.ndarray,
+                     cluster_count: int,
+                     init: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, int]:
         """
-        计算检索参数
+        按配置的后端聚类
         
         Args:
-            target_k: 目标返回条数
-            
+            embeddings_array: 形如 (N, D) 的向量数组
+            cluster_count: 聚类簇数
+            init: 热启动质心（可选）
+        
         Returns:
-            (总检索条数, 聚类数)
+            (簇标签, 质心, 迭代次数)
+        """
+        if self.kmeans_backend == "sklearn":
+            if init is not None and init.shape == (cluster_count, embeddings_array.shape[1]):
+                kmeans = KMeans(n_clusters=cluster_count, init=init, n_init=1)
+            else:
+                kmeans = KMeans(n_clusters=cluster_count, random_state=42, n_init=10)
+            labels = kmeans.fit_predict(embeddings_array)
+            return labels, kmeans.cluster_centers_, int(kmeans.n_iter_)
+        model = SphericalKMeans(n_clusters=cluster_count, random_state=42, init=init).fit(embeddings_array)
+        return model.labels_, model.cluster_centers_, model.n_iter_
+    
+    def _cluster_labels(self,
+                        ids: List[str],
+                        embeddings_array: np.ndarray,
+                        cluster_count: int,
+                        cache_key: Optional[str]) -> np.ndarray:
         """
-        # 聚类数 = 目标条数 * 检索倍数
-        cluster_count = target_k * self.retrieval_multiplier
+        获取簇标签：候选ID集合与缓存一致时复用上一轮分配，否则以缓存质心热启动聚类并写回缓存
+        """
+        if self.centroid_cache is None or not cache_key:
+            return self._fit_predict(embeddings_array, cluster_count)[0]
+        
+        id_set = frozenset(ids)
+        entry = self.centroid_cache.get(cache_key)
         
-        # 总检索条数 = 聚类数 * 每簇期望记录数
-        total_retrieval = cluster_count * self.cluster_multiplier
+        if entry is not None and entry.cluster_count == cluster_count and entry.id_set == id_set:
+            self.centroid_cache.record_label_reuse()
+            return np.array([entry.labels_by_id[doc_id] for doc_id in ids])
         
-        return total_retrieval, cluster_count
+        init = None
+        if entry is not None and entry.centers.shape[1] == embeddings_array.shape[1]:
+            init = entry.centers
+        labels, centers, n_iter = self._fit_predict(embeddings_array, cluster_count, init=init)
+        self.centroid_cache.record_run(warm=init is not None, n_iter=n_iter)
+        
+        # ID重复时无法按ID复用分配，只缓存质心
+        labels_by_id = dict(zip(ids, (int(label) for label in labels)))
+        reuse_id_set = id_set if len(labels_by_id) == len(ids) else frozenset()
+        self.centroid_cache.put(
+            cache_key,
+            CentroidCacheEntry(reuse_id_set, labels_by_id, np.asarray(centers, dtype=np.float32), cluster_count)
+        )
+        return labels
     
-    def cluster_by_query_similarity_and_aggregate(self,
-                                                records: List[Dict],
-                                                embeddings_array: np.ndarray,
-                                                distances: List[float],
-                                                cluster_count: int,
-                                                target_k: int) -> List[Dict]:
+    def _select_groups(self,
+                       ids: List[str],
+                       embeddings_array: np.ndarray,
+                       distances: np.ndarray,
+                       cluster_count: int,
+                       cache_key: Optional[str] = None) -> List[Tuple[int, np.ndarray]]:
         """
-        基于查询相似度的聚类：
-        - 簇内选与查询distance最小的记录为代表；
-        - 代表记录的valid_access_count = 簇内所有记录的valid_access_count之和；
-        - 最终结果 = 分别按相关度与valid_access_count各取target_k条，按doc_id去重后返回合集。
-        Args:
-            records: 与embeddings_array、distances一一对齐的记录列表（每条含embedding、distance、valid_access_count）
-            embeddings_array: 形如 (N, D) 的向量数组
-            distances: 长度为 N 的距离列表（越小越相似）
-            cluster_count: 聚类簇数
-            target_k: 返回前k条代表
+        k-means分组：簇内选与查询distance最小的记录为代表
+        样本数 <= 聚类数时不聚类，每条记录自成一组
         """
-        import numpy as np
-        from sklearn.cluster import KMeans
-
-        if not isinstance(cluster_count, int) or cluster_count < 1:
-            cluster_count = 1
-
-        n = len(records)
-        if n == 0:
-            return []
-
-        # 样本数 <= 聚类数：不聚类，直接在原集合上做双路topK并去重
+        n = len(ids)
         if n <= cluster_count:
-            base = []
-            for i in range(n):
-                rep = dict(records[i])
-                rep["cluster_size"] = 1
-                base.append(rep)
-            # 分别取topK
-            by_rel = sorted(base, key=lambda x: float(x.get("distance", float("inf"))))[:target_k]
-            by_cnt = sorted(base, key=lambda x: float(x.get("valid_access_count", 0.0)), reverse=True)[:target_k]
-            # 合并去重（按doc_id）
-            seen = set()
-            merged = []
-            for r in by_rel + by_cnt:
-                rid = r.get("doc_id")
-                if rid not in seen:
-                    seen.add(rid)
-                    merged.append(r)
-            return merged
+            return [(i, np.array([i])) for i in range(n)]
 
-        # KMeans 聚类
-        kmeans = KMeans(n_clusters=cluster_count, random_state=42, n_init=10)
-        labels = kmeans.fit_predict(embeddings_array)
+        labels = self._cluster_labels(ids, embeddings_array, cluster_count, cache_key)
 
-        # 簇代表选择与累计
-        representatives = []
+        groups = []
         for cid in np.unique(labels):
             idx = np.where(labels == cid)[0]
             if len(idx) == 0:
                 continue
-
-            # 代表：簇内与查询distance最小
-            local_dist = [(i, float(distances[i]) if distances[i] is not None else float("inf")) for i in idx]
-            rep_idx, _ = min(local_dist, key=lambda t: t[1])
-
-            # 累计簇内valid_access_count
-            sum_valid = float(sum(float(records[i].get("valid_access_count", 0.0)) for i in idx))
-
-            rep = dict(records[rep_idx])
-            rep["valid_access_count"] = sum_valid
-            rep["cluster_size"] = len(idx)
-            representatives.append(rep)
-
-        # 分别按相关度与valid_access_count取topK，然后合并去重
-        top_by_relevance = sorted(representatives, key=lambda x: float(x.get("distance", float("inf"))))[:target_k]
-        top_by_count = sorted(representatives, key=lambda x: float(x.get("valid_access_count", 0.0)), reverse=True)[:target_k]
-
-        seen_ids = set()
-        final_selection = []
-        for r in top_by_relevance + top_by_count:
-            rid = r.get("doc_id")
-            if rid not in seen_ids:
-                seen_ids.add(rid)
-                final_selection.append(r)
-
-        return final_selection
\ No newline at end of file
+            # 代表：簇内与查询distance最小（并列时取靠前者）
+            rep_idx = idx[int(np.argmin(distances[idx]))]
+            groups.append((int(rep_idx), idx))
+        return groups
@@ -1,6 +1,8 @@
 import math
+import numpy as np
 from enum import Enum
 from datetime import datetime
+from typing import Iterable, Optional, Tuple, Union
 
 class CoolingRate(Enum):
     MINUTES_20 = (0.582, 20 * 60)
@@ -11,14 +13,19 @@ class CoolingRate(Enum):
     DAYS_6 = (0.254, 6 * 24 * 60 * 60)
     DAYS_31 = (0.211, 31 * 24 * 60 * 60)
 
+# 各遗忘速率对应的冷却系数（alpha），模块加载时一次性预计算
+COOLING_ALPHAS = {
+    rate: -math.log(rate.value[0]) / rate.value[1]
+    for rate in CoolingRate
+}
+
 class NewtonCoolingHelper:
     @staticmethod
     def calculate_cooling_rate(enum_value: CoolingRate) -> float:
         """
         根据枚举值计算冷却速率系数（alpha）。
         """
-        final_temperature_ratio, time_interval = enum_value.value
-        return -math.log(final_temperature_ratio) / time_interval
+        return COOLING_ALPHAS[enum_value]
 
     @staticmethod
     def calculate_newton_cooling_effect(initial_temperature: float, time_interval: float, cooling_rate: float = None) -> float:
@@ -26,7 +33,7 @@ class NewtonCoolingHelper:
         根据牛顿冷却定律计算当前时间的温度。
         """
         if cooling_rate is None:
-            cooling_rate = NewtonCoolingHelper.calculate_cooling_rate(CoolingRate.DAYS_31)
+            cooling_rate = COOLING_ALPHAS[CoolingRate.DAYS_31]
         return initial_temperature * math.exp(-cooling_rate * time_interval)
 
     @staticmethod
@@ -40,9 +47,108 @@ class NewtonCoolingHelper:
             current_time = datetime.fromisoformat(current_time)
         time_delta = current_time - update_time
         return time_delta.total_seconds()
-    
+
     @staticmethod
     def get_threshold(cooling_rate: CoolingRate=None) -> float:
         if cooling_rate is None:
             cooling_rate=CoolingRate.DAYS_31
         return cooling_rate.value[0]
+
+    @staticmethod
+    def to_epoch_seconds(values: Iterable[Union[float, int, str, datetime, None]]) -> np.ndarray:
+        """
+        将时间值序列转换为 float64 的epoch秒数组。
+        支持数值（原样保留）、ISO字符串与datetime，缺失或无法解析的值记为NaN。
+        """
+        result = []
+        for value in values:
+            if value is None or value == "":
+                result.append(np.nan)
+            elif isinstance(value, (int, float)):
+                result.append(float(value))
+            else:
+                try:
+                    if isinstance(value, str):
+                        value = datetime.fromisoformat(value)
+                    result.append(value.timestamp())
+                except (TypeError, ValueError):
+                    result.append(np.nan)
+        return np.asarray(result, dtype=np.float64)
+
+    @staticmethod
+    def calculate_newton_cooling_effect_array(initial_temperatures: np.ndarray,
+                                              time_intervals: np.ndarray,
+                                              cooling_rate: Union[CoolingRate, float] = None) -> np.ndarray:
+        """
+        calculate_newton_cooling_effect 的向量化版本，一次计算整组记录的温度。
+        """
+        if cooling_rate is None:
+            cooling_rate = CoolingRate.DAYS_31
+        alpha = COOLING_ALPHAS[cooling_rate] if isinstance(cooling_rate, CoolingRate) else float(cooling_rate)
+        initial_temperatures = np.asarray(initial_temperatures, dtype=np.float64)
+        time_intervals = np.asarray(time_intervals, dtype=np.float64)
+        return initial_temperatures * np.exp(-alpha * time_intervals)
+
+    @staticmethod
+    def calculate_decay_array(valid_access_counts: np.ndarray,
+                              last_updated_ts: np.ndarray,
+                              current_time: Optional[float] = None,
+                              cooling_rate: CoolingRate = None,
+                              threshold: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量计算衰减后的有效访问次数与过期掩码。
+        last_updated_ts 为NaN的记录视为未知更新时间，不做衰减（与单条计算的降级行为一致）。
+
+        Returns:
+            (衰减后的值数组, 低于阈值的布尔掩码)
+        """
+        if cooling_rate is None:
+            cooling_rate = CoolingRate.DAYS_31
+        if threshold is None:
+            threshold = NewtonCoolingHelper.get_threshold(cooling_rate)
+        if current_time is None:
+            current_time = datetime.now().timestamp()
+
+        valid_access_counts = np.asarray(valid_access_counts, dtype=np.float64)
+        last_updated_ts = np.asarray(last_updated_ts, dtype=np.float64)
+        elapsed = np.nan_to_num(current_time - last_updated_ts, nan=0.0)
+
+        decayed = NewtonCoolingHelper.calculate_newton_cooling_effect_array(
+            valid_access_counts, elapsed, cooling_rate
+        )
+        return decayed, decayed < threshold
+
+    @staticmethod
+    def calculate_expiry_time(valid_access_count: float,
+                              last_updated_ts: float,
+                              cooling_rate: CoolingRate = None,
+                              threshold: Optional[float] = None) -> float:
+        """
+        计算记录的遗忘时刻（epoch秒）。
+        由 v * exp(-alpha * t) = threshold 解得 t_expire = last_updated + ln(v / threshold) / alpha，
+        当前值已不高于阈值时返回 last_updated 本身。
+        """
+        if cooling_rate is None:
+            cooling_rate = CoolingRate.DAYS_31
+        if threshold is None:
+            threshold = NewtonCoolingHelper.get_threshold(cooling_rate)
+        if valid_access_count <= threshold:
+            return float(last_updated_ts)
+        return float(last_updated_ts) + math.log(valid_access_count / threshold) / COOLING_ALPHAS[cooling_rate]
+
+    @staticmethod
+    def calculate_expiry_time_array(valid_access_counts: np.ndarray,
+                                    last_updated_ts: np.ndarray,
+                                    cooling_rate: CoolingRate = None,
+                                    threshold: Optional[float] = None) -> np.ndarray:
+        """
+        calculate_expiry_time 的向量化版本。
+        """
+        if cooling_rate is None:
+            cooling_rate = CoolingRate.DAYS_31
+        if threshold is None:
+            threshold = NewtonCoolingHelper.get_threshold(cooling_rate)
+        valid_access_counts = np.asarray(valid_access_counts, dtype=np.float64)
+        last_updated_ts = np.asarray(last_updated_ts, dtype=np.float64)
+        ratio = np.maximum(valid_access_counts / threshold, 1.0)
+        return last_updated_ts + np.log(ratio) / COOLING_ALPHAS[cooling_rate]
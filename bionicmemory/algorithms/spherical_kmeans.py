@@ -0,0 +1,196 @@
+"""
+球面k-means（余弦k-means）
+在单位球面上聚类：样本与质心均L2归一化，以余弦相似度分配簇，质心取簇内均值后重新归一化
+
+相比 sklearn KMeans(n_init=10)：
+1. 纯NumPy实现，float32矩阵乘完成全部相似度计算，不依赖scikit-learn
+2. k-means++ 播种（按余弦距离 1-cos 采样），默认只做1次初始化
+3. 质心移动小于tol或分配不再变化时提前停止，并有最大迭代次数上限
+4. 支持以给定质心热启动（init），候选集合变化不大时通常一两轮即收敛
+"""
+
+import numpy as np
+from typing import Optional
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+def normalize_rows(X: np.ndarray) -> np.ndarray:
+    """
+    按行L2归一化为float32，零向量保持为零
+
+    Args:
+        X: 形如 (N, D) 的矩阵
+
+    Returns:
+        归一化后的 float32 矩阵
+    """
+    X = np.asarray(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.maximum(norms, 1e-12)
+
+class SphericalKMeans:
+    """
+    球面k-means聚类器
+    接口与 sklearn KMeans 的常用部分保持一致（fit / fit_predict / labels_ / cluster_centers_ / n_iter_）
+    """
+
+    def __init__(self,
+                 n_clusters: int,
+                 n_init: int = 1,
+                 max_iter: int = 50,
+                 tol: float = 1e-4,
+                 random_state: Optional[int] = 42,
+                 init: Optional[np.ndarray] = None):
+        """
+        初始化聚类器
+
+        Args:
+            n_clusters: 簇数
+            n_init: 初始化次数，取目标函数（簇内余弦相似度之和）最大的一次
+            max_iter: 每次初始化的最大迭代次数
+            tol: 质心最大移动量（1-cos）小于该值时停止
+            random_state: 随机种子
+            init: 热启动质心，形如 (k', D)；不足n_clusters时其余质心按k-means++补齐，提供时只做1次初始化
+        """
+        self.n_clusters = n_clusters
+        self.n_init = max(1, n_init)
+        self.max_iter = max(1, max_iter)
+        self.tol = tol
+        self.random_state = random_state
+        self.init = init
+
+        self.labels_: Optional[np.ndarray] = None
+        self.cluster_centers_: Optional[np.ndarray] = None
+        self.n_iter_: int = 0
+        self.inertia_: float = 0.0
+
+    def fit(self, X: np.ndarray, normalized: bool = False) -> "SphericalKMeans":
+        """
+        拟合聚类
+
+        Args:
+            X: 形如 (N, D) 的样本矩阵
+            normalized: X是否已按行归一化（已归一化时跳过归一化）
+
+        Returns:
+            self
+        """
+        X = np.asarray(X, dtype=np.float32) if normalized else normalize_rows(X)
+        n_samples = X.shape[0]
+        if n_samples == 0:
+            raise ValueError("样本数为0，无法聚类")
+        k = min(self.n_clusters, n_samples)
+
+        rng = np.random.default_rng(self.random_state)
+        n_init = self.n_init
+        if self.init is not None:
+            n_init = 1
+        best = None
+        for _ in range(n_init):
+            if self.init is not None:
+                centers = self._warm_centers(X, k, rng)
+            else:
+                centers = self._init_centers(X, k, rng)
+            labels, centers, n_iter, score = self._lloyd(X, centers)
+            if best is None or score > best[3]:
+                best = (labels, centers, n_iter, score)
+
+        self.labels_, self.cluster_centers_, self.n_iter_, score = best
+        # inertia_ 与 sklearn 的含义对应：越小越好，这里为簇内余弦距离之和
+        self.inertia_ = float(n_samples - score)
+        return self
+
+    def fit_predict(self, X: np.ndarray, normalized: bool = False) -> np.ndarray:
+        """
+        拟合并返回每个样本的簇标签
+
+        Args:
+            X: 形如 (N, D) 的样本矩阵
+            normalized: X是否已按行归一化
+
+        Returns:
+            长度为 N 的簇标签数组
+        """
+        return self.fit(X, normalized=normalized).labels_
+
+    @staticmethod
+    def _init_centers(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        k-means++ 播种：按与已选质心的最小余弦距离平方加权采样下一个质心
+        """
+        n_samples = X.shape[0]
+        centers = np.empty((k, X.shape[1]), dtype=np.float32)
+        centers[0] = X[rng.integers(n_samples)]
+        closest = np.clip(1.0 - X @ centers[0], 0.0, None)
+
+        for c in range(1, k):
+            weights = closest ** 2
+            total = float(weights.sum())
+            if total <= 0.0:
+                # 剩余样本与已选质心完全重合，随机补齐
+                idx = rng.integers(n_samples)
+            else:
+                idx = rng.choice(n_samples, p=weights / total)
+            centers[c] = X[idx]
+            closest = np.minimum(closest, np.clip(1.0 - X @ centers[c], 0.0, None))
+        return centers
+
+    def _warm_centers(self, X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        以给定质心热启动：多余的截断，不足的按与已有质心的余弦距离平方加权采样补齐
+        """
+        init = normalize_rows(self.init)[:k]
+        if init.shape[1] != X.shape[1]:
+            raise ValueError(f"热启动质心维度不匹配: {init.shape[1]} != {X.shape[1]}")
+        centers = np.empty((k, X.shape[1]), dtype=np.float32)
+        centers[:len(init)] = init
+        if len(init) == k:
+            return centers
+
+        closest = np.clip(1.0 - (X @ init.T).max(axis=1), 0.0, None) if len(init) else np.ones(X.shape[0], dtype=np.float32)
+        for c in range(len(init), k):
+            weights = closest ** 2
+            total = float(weights.sum())
+            idx = rng.integers(X.shape[0]) if total <= 0.0 else rng.choice(X.shape[0], p=weights / total)
+            centers[c] = X[idx]
+            closest = np.minimum(closest, np.clip(1.0 - X @ centers[c], 0.0, None))
+        return centers
+
+    def _lloyd(self, X: np.ndarray, centers: np.ndarray):
+        """
+        Lloyd迭代：按余弦相似度分配，质心取簇内和再归一化；空簇用离所属质心最远的样本重新播种
+
+        Returns:
+            (标签, 质心, 迭代次数, 簇内余弦相似度之和)
+        """
+        k = centers.shape[0]
+        labels = None
+        n_iter = 0
+        for n_iter in range(1, self.max_iter + 1):
+            similarities = X @ centers.T
+            new_labels = similarities.argmax(axis=1)
+            if labels is not None and np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+
+            new_centers = np.zeros_like(centers)
+            np.add.at(new_centers, labels, X)
+            counts = np.bincount(labels, minlength=k)
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                assigned = similarities[np.arange(X.shape[0]), labels]
+                for c, idx in zip(empty, np.argsort(assigned)[:len(empty)]):
+                    new_centers[c] = X[idx]
+            new_centers = normalize_rows(new_centers)
+
+            shift = float(np.max(1.0 - np.sum(new_centers * centers, axis=1)))
+            centers = new_centers
+            if shift <= self.tol:
+                break
+
+        similarities = X @ centers.T
+        labels = similarities.argmax(axis=1)
+        score = float(similarities[np.arange(X.shape[0]), labels].sum())
+        return labels, centers, n_iter, score
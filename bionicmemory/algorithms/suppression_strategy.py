@@ -0,0 +1,330 @@
+"""
+记忆抑制策略
+检索候选往往包含大量语义重复的记录，抑制策略把相似记录归并为一个代表，
+代表记录的 valid_access_count 为其所代表记录（衰减后）valid_access_count 之和，最后按相关度与访问热度双路取topK
+
+可选策略：
+- kmeans: k-means聚类，每簇取与查询最相似的记录为代表（ClusteringSuppression，迭代聚类）
+- mmr: 最大边际相关（Maximal Marginal Relevance）贪心选代表，其余记录归入最相似的代表，O(N·k)
+- threshold: 相似度阈值贪心去重（leader聚类），按相关度依次加入，与已有代表相似度超过阈值即归入，O(N·L)
+- none: 不抑制，直接双路topK
+
+检索链路使用 suppress_candidates 在列式候选集合（CandidateSet）上按下标完成分组、聚合与双路topK
+"""
+
+import numpy as np
+from typing import List, Optional, Tuple
+
+from bionicmemory.algorithms.spherical_kmeans import normalize_rows
+from bionicmemory.algorithms.candidate_set import CandidateSet
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+SUPPRESSION_STRATEGIES = ("kmeans", "mmr", "threshold", "none")
+
+# 候选数低于该值时完整稳定排序比 argpartition 的额外数组操作更快
+PARTITION_MIN_SIZE = 128
+
+def stable_topk_indices(keys: np.ndarray, k: int) -> np.ndarray:
+    """
+    取keys最小的k个下标并按 (key, 下标) 升序返回，结果与 np.argsort(keys, kind="stable")[:k] 一致
+    用 argpartition 定位第k小的值，只对入选的k个元素排序，O(N + k log k)；
+    候选较少（< PARTITION_MIN_SIZE）时直接稳定排序
+
+    Args:
+        keys: 一维数组（不含NaN）
+        k: 取的个数
+    """
+    n = len(keys)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n or n < PARTITION_MIN_SIZE:
+        return np.argsort(keys, kind="stable")[:k]
+
+    kth_value = keys[np.argpartition(keys, k - 1)[k - 1]]
+    below = np.flatnonzero(keys < kth_value)
+    # 与第k小值并列的元素按下标先后补足，保证与稳定排序的结果一致
+    ties = np.flatnonzero(keys == kth_value)[:k - len(below)]
+    selected = np.concatenate([below, ties])
+    return selected[np.lexsort((selected, keys[selected]))]
+
+def dual_topk_indices(distances: np.ndarray, counts: np.ndarray, target_k: int) -> np.ndarray:
+    """
+    双路topK的下标版本：按距离升序与计数降序各取target_k个下标，合并去重（相关度一路在前）
+
+    Args:
+        distances: 距离数组（NaN视为最远）
+        counts: valid_access_count 数组
+        target_k: 每一路取的条数
+
+    Returns:
+        下标数组
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    missing = np.isnan(distances)
+    if missing.any():
+        distances = np.where(missing, np.inf, distances)
+    by_relevance = stable_topk_indices(distances, target_k)
+    by_count = stable_topk_indices(-np.asarray(counts, dtype=np.float64), target_k)
+
+    # 掩码求并集：计数一路只保留相关度一路未选中的下标
+    chosen = np.zeros(len(distances), dtype=bool)
+    chosen[by_relevance] = True
+    return np.concatenate([by_relevance, by_count[~chosen[by_count]]])
+
+def similarity_softmax(distances: np.ndarray) -> np.ndarray:
+    """
+    以相似度（similarity = 1 - distance，缺失距离记为0）做softmax
+
+    Args:
+        distances: 距离数组（缺失为NaN）
+
+    Returns:
+        与distances等长的概率数组
+    """
+    if len(distances) == 0:
+        return np.empty(0, dtype=np.float64)
+    similarities = 1.0 - np.asarray(distances, dtype=np.float64)
+    similarities[np.isnan(similarities)] = 0.0
+    exps = np.exp(similarities - similarities.max())
+    return exps / (exps.sum() or 1.0)
+
+class SuppressionStrategy:
+    """
+    抑制策略基类
+    子类实现 _select_groups，返回 [(代表下标, 组内下标数组), ...]；聚合与双路topK由基类完成
+    """
+
+    name = "base"
+
+    def __init__(self,
+                 cluster_multiplier: int = 3,
+                 retrieval_multiplier: int = 2):
+        """
+        初始化抑制策略
+
+        Args:
+            cluster_multiplier: 每个簇期望包含的记录数量，默认3条
+            retrieval_multiplier: 检索结果倍数，默认2倍
+        """
+        self.cluster_multiplier = cluster_multiplier
+        self.retrieval_multiplier = retrieval_multiplier
+
+    def calculate_retrieval_parameters(self, target_k: int) -> Tuple[int, int]:
+        """
+        计算检索参数
+
+        Args:
+            target_k: 目标返回条数
+
+        Returns:
+            (总检索条数, 聚类数)
+        """
+        # 聚类数 = 目标条数 * 检索倍数
+        cluster_count = target_k * self.retrieval_multiplier
+
+        # 总检索条数 = 聚类数 * 每簇期望记录数
+        total_retrieval = cluster_count * self.cluster_multiplier
+
+        return total_retrieval, cluster_count
+
+    def suppress_candidates(self,
+                            candidates: CandidateSet,
+                            cluster_count: int,
+                            target_k: int,
+                            cache_key: Optional[str] = None) -> CandidateSet:
+        """
+        在列式候选集合上做抑制
+
+        Args:
+            candidates: 候选集合（需含向量矩阵）
+            cluster_count: 期望的代表数（簇数）
+            target_k: 双路topK每路取的条数
+            cache_key: 跨轮次复用状态的键
+
+        Returns:
+            代表集合（valid_counts 为组内之和，cluster_sizes 为组大小）
+        """
+        if len(candidates) == 0:
+            return candidates
+        if not isinstance(cluster_count, int) or cluster_count < 1:
+            cluster_count = 1
+
+        groups = self._select_groups(
+            candidates.ids, candidates.embeddings, candidates.distances, cluster_count, cache_key
+        )
+        rep_indices = np.fromiter((rep_idx for rep_idx, _ in groups), dtype=np.int64, count=len(groups))
+        group_sums = np.fromiter(
+            (candidates.valid_counts[members].sum() for _, members in groups), dtype=np.float64, count=len(groups)
+        )
+        group_sizes = np.fromiter((len(members) for _, members in groups), dtype=np.int64, count=len(groups))
+
+        representatives = candidates.take(rep_indices).with_columns(valid_counts=group_sums, cluster_sizes=group_sizes)
+        return representatives.take(dual_topk_indices(representatives.distances, group_sums, target_k))
+
+    def _select_groups(self,
+                       ids: List[str],
+                       embeddings_array: np.ndarray,
+                       distances: np.ndarray,
+                       cluster_count: int,
+                       cache_key: Optional[str] = None) -> List[Tuple[int, np.ndarray]]:
+        """
+        子类实现：分组并选出代表
+
+        Args:
+            ids: 候选文档ID
+            embeddings_array: 形如 (N, D) 的向量矩阵
+            distances: 距离数组（缺失为inf）
+            cluster_count: 期望的代表数
+            cache_key: 跨轮次复用状态的键
+
+        Returns:
+            [(代表下标, 组内下标数组), ...]
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _relevance(distances: np.ndarray) -> np.ndarray:
+        """距离转相关度（与检索流程一致按余弦距离处理：similarity = 1 - distance），缺失距离记为最低"""
+        relevance = 1.0 - np.asarray(distances, dtype=np.float64)
+        relevance[~np.isfinite(relevance)] = -1.0
+        return relevance
+
+    @staticmethod
+    def _assign_to_representatives(rep_similarities: np.ndarray, rep_indices: List[int]) -> List[Tuple[int, np.ndarray]]:
+        """将全部记录归入最相似的代表（rep_similarities 形如 (N, 代表数)），代表自身一定归入自己的组"""
+        owners = rep_similarities.argmax(axis=1)
+        owners[rep_indices] = np.arange(len(rep_indices))
+        return [(rep_idx, np.flatnonzero(owners == g)) for g, rep_idx in enumerate(rep_indices)]
+
+class NoSuppression(SuppressionStrategy):
+    """不抑制：每条记录自成一组"""
+
+    name = "none"
+
+    def _select_groups(self, ids, embeddings_array, distances, cluster_count, cache_key=None):
+        return [(i, np.array([i])) for i in range(len(ids))]
+
+class MMRSuppression(SuppressionStrategy):
+    """
+    最大边际相关抑制
+    贪心选择 cluster_count 个代表：score = λ·相关度 - (1-λ)·与已选代表的最大相似度
+    """
+
+    name = "mmr"
+
+    def __init__(self,
+                 cluster_multiplier: int = 3,
+                 retrieval_multiplier: int = 2,
+                 mmr_lambda: float = 0.7):
+        """
+        Args:
+            cluster_multiplier: 每个簇期望包含的记录数量
+            retrieval_multiplier: 检索结果倍数
+            mmr_lambda: 相关度权重，越大越偏向相关度，越小越偏向多样性
+        """
+        super().__init__(cluster_multiplier, retrieval_multiplier)
+        self.mmr_lambda = mmr_lambda
+
+    def _select_groups(self, ids, embeddings_array, distances, cluster_count, cache_key=None):
+        n = len(ids)
+        if n <= cluster_count:
+            return [(i, np.array([i])) for i in range(n)]
+
+        normalized = normalize_rows(embeddings_array)
+        relevance = self._relevance(distances)
+
+        # 只计算候选与已选代表之间的相似度，复杂度 O(N·k·D)
+        selected = [int(np.argmax(relevance))]
+        max_similarity = (normalized @ normalized[selected[0]]).astype(np.float64)
+        available = np.ones(n, dtype=bool)
+        available[selected[0]] = False
+
+        while len(selected) < cluster_count and available.any():
+            scores = self.mmr_lambda * relevance - (1.0 - self.mmr_lambda) * max_similarity
+            scores[~available] = -np.inf
+            next_idx = int(np.argmax(scores))
+            selected.append(next_idx)
+            available[next_idx] = False
+            max_similarity = np.maximum(max_similarity, normalized @ normalized[next_idx])
+
+        return self._assign_to_representatives(normalized @ normalized[selected].T, selected)
+
+class ThresholdSuppression(SuppressionStrategy):
+    """
+    相似度阈值贪心去重（leader聚类）
+    按相关度从高到低遍历，与某个已有代表的余弦相似度不低于阈值则归入该代表，否则自成新代表
+    """
+
+    name = "threshold"
+
+    def __init__(self,
+                 cluster_multiplier: int = 3,
+                 retrieval_multiplier: int = 2,
+                 similarity_threshold: float = 0.9):
+        """
+        Args:
+            cluster_multiplier: 每个簇期望包含的记录数量
+            retrieval_multiplier: 检索结果倍数
+            similarity_threshold: 归入已有代表的余弦相似度阈值
+        """
+        super().__init__(cluster_multiplier, retrieval_multiplier)
+        self.similarity_threshold = similarity_threshold
+
+    def _select_groups(self, ids, embeddings_array, distances, cluster_count, cache_key=None):
+        normalized = normalize_rows(embeddings_array)
+        order = np.argsort(-self._relevance(distances), kind="stable")
+
+        leaders: List[int] = []
+        members: List[List[int]] = []
+        for idx in order:
+            if leaders:
+                leader_similarities = normalized[leaders] @ normalized[idx]
+                best = int(np.argmax(leader_similarities))
+                if leader_similarities[best] >= self.similarity_threshold:
+                    members[best].append(int(idx))
+                    continue
+            leaders.append(int(idx))
+            members.append([int(idx)])
+
+        return [(leader, np.array(group)) for leader, group in zip(leaders, members)]
+
+def create_suppression_strategy(strategy: str,
+                                cluster_multiplier: int = 3,
+                                retrieval_multiplier: int = 2,
+                                kmeans_backend: str = "spherical",
+                                mmr_lambda: float = 0.7,
+                                similarity_threshold: float = 0.9,
+                                centroid_cache=None) -> SuppressionStrategy:
+    """
+    按名称创建抑制策略
+
+    Args:
+        strategy: 策略名称（kmeans / mmr / threshold / none）
+        cluster_multiplier: 每个簇期望包含的记录数量
+        retrieval_multiplier: 检索结果倍数
+        kmeans_backend: kmeans策略的聚类后端
+        mmr_lambda: mmr策略的相关度权重
+        similarity_threshold: threshold策略的归并阈值
+        centroid_cache: kmeans策略的按用户质心缓存（CentroidCache，可选）
+
+    Returns:
+        抑制策略实例
+    """
+    if strategy == "kmeans":
+        from bionicmemory.algorithms.clustering_suppression import ClusteringSuppression
+        return ClusteringSuppression(
+            cluster_multiplier=cluster_multiplier,
+            retrieval_multiplier=retrieval_multiplier,
+            kmeans_backend=kmeans_backend,
+            centroid_cache=centroid_cache
+        )
+    if strategy == "mmr":
+        return MMRSuppression(cluster_multiplier, retrieval_multiplier, mmr_lambda=mmr_lambda)
+    if strategy == "threshold":
+        return ThresholdSuppression(cluster_multiplier, retrieval_multiplier, similarity_threshold=similarity_threshold)
+    if strategy == "none":
+        return NoSuppression(cluster_multiplier, retrieval_multiplier)
+    raise ValueError(f"不支持的抑制策略: {strategy}")
@@ -5,6 +5,7 @@
 
 from contextlib import asynccontextmanager
 import os
+import hmac
 import json
 import logging
 import asyncio
@@ -51,6 +52,61 @@ SUMMARY_MAX_LENGTH = int(os.getenv('SUMMARY_MAX_LENGTH', '500'))
 MAX_RETRIEVAL_RESULTS = int(os.getenv('MAX_RETRIEVAL_RESULTS', '7'))
 CLUSTER_MULTIPLIER = int(os.getenv('CLUSTER_MULTIPLIER', '3'))
 RETRIEVAL_MULTIPLIER = int(os.getenv('RETRIEVAL_MULTIPLIER', '2'))
+CLUSTERING_BACKEND = os.getenv('CLUSTERING_BACKEND', 'spherical')
+LONG_TERM_SUPPRESSION = os.getenv('LONG_TERM_SUPPRESSION', 'kmeans')
+SHORT_TERM_SUPPRESSION = os.getenv('SHORT_TERM_SUPPRESSION', 'kmeans')
+MMR_LAMBDA = float(os.getenv('MMR_LAMBDA', '0.7'))
+DEDUPE_SIMILARITY_THRESHOLD = float(os.getenv('DEDUPE_SIMILARITY_THRESHOLD', '0.9'))
+CENTROID_CACHE_SIZE = int(os.getenv('CENTROID_CACHE_SIZE', '0'))
+ADAPTIVE_RETRIEVAL = os.getenv('ADAPTIVE_RETRIEVAL', 'false').lower() == 'true'
+USER_COUNT_TTL_SECONDS = float(os.getenv('USER_COUNT_TTL_SECONDS', '300'))
+MIN_CLUSTER_CANDIDATES = int(os.getenv('MIN_CLUSTER_CANDIDATES', '12'))
+TIERED_RETRIEVAL = os.getenv('TIERED_RETRIEVAL', 'off').lower()
+TIERED_SIMILARITY_THRESHOLD = float(os.getenv('TIERED_SIMILARITY_THRESHOLD', '0.8'))
+TIERED_MIN_HITS = int(os.getenv('TIERED_MIN_HITS', '3'))
+RETRIEVAL_CACHE_SIZE = int(os.getenv('RETRIEVAL_CACHE_SIZE', '0'))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv('RETRIEVAL_CACHE_TTL_SECONDS', '300'))
+PIPELINED_PROCESSING = os.getenv('PIPELINED_PROCESSING', 'false').lower() == 'true'
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '4'))
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', 'false').lower() == 'true'
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv('WRITE_BEHIND_QUEUE_SIZE', '1024'))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '64'))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv('WRITE_BEHIND_MAX_RETRIES', '2'))
+ACCESS_COUNTER_DB = os.getenv('ACCESS_COUNTER_DB', '')
+ACCESS_COUNTER_FLUSH_SIZE = int(os.getenv('ACCESS_COUNTER_FLUSH_SIZE', '256'))
+ACCESS_COUNTER_FLUSH_SECONDS = float(os.getenv('ACCESS_COUNTER_FLUSH_SECONDS', '1.0'))
+SUMMARY_ENGINE = os.getenv('SUMMARY_ENGINE', 'llm')
+CHUNK_LONG_CONTENT = os.getenv('CHUNK_LONG_CONTENT', 'false').lower() == 'true'
+CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', str(SUMMARY_MAX_LENGTH)))
+CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '100'))
+
+# 清理调度配置
+CLEANUP_MODE = os.getenv('CLEANUP_MODE', 'full')
+CLEANUP_PAGE_SIZE = int(os.getenv('CLEANUP_PAGE_SIZE', '500'))
+CLEANUP_TIME_BUDGET_MS = int(os.getenv('CLEANUP_TIME_BUDGET_MS', '200'))
+CLEANUP_TICK_SECONDS = int(os.getenv('CLEANUP_TICK_SECONDS', '60'))
+CLEANUP_CURSOR_PATH = os.getenv('CLEANUP_CURSOR_PATH', './data/cleanup_cursor.json')
+CLEANUP_WORKERS = int(os.getenv('CLEANUP_WORKERS', '1'))
+CLEANUP_PARTITIONS = int(os.getenv('CLEANUP_PARTITIONS', '8'))
+SHORT_TERM_EXPIRY_MODE = os.getenv('SHORT_TERM_EXPIRY_MODE', 'poll')
+EXPIRY_TICK_SECONDS = int(os.getenv('EXPIRY_TICK_SECONDS', '5'))
+EXPIRY_BATCH_SIZE = int(os.getenv('EXPIRY_BATCH_SIZE', '100'))
+EXPIRY_SYNC_SECONDS = int(os.getenv('EXPIRY_SYNC_SECONDS', '30'))
+EXPIRY_SAFETY_SWEEP_MINUTES = int(os.getenv('EXPIRY_SAFETY_SWEEP_MINUTES', '60'))
+SHORT_TERM_EPOCHS = os.getenv('SHORT_TERM_EPOCHS', 'false').lower() == 'true'
+SHORT_TERM_SNAPSHOT_PATH = os.getenv('SHORT_TERM_SNAPSHOT_PATH', './data/short_term_snapshot.npz')
+CLEANUP_ADAPTIVE = os.getenv('CLEANUP_ADAPTIVE', 'false').lower() == 'true'
+CLEANUP_ADAPT_TICK_SECONDS = int(os.getenv('CLEANUP_ADAPT_TICK_SECONDS', '60'))
+CLEANUP_BACKLOG_TARGET = int(os.getenv('CLEANUP_BACKLOG_TARGET', '500'))
+CLEANUP_SHORT_MIN_MINUTES = int(os.getenv('CLEANUP_SHORT_MIN_MINUTES', '1'))
+CLEANUP_SHORT_MAX_MINUTES = int(os.getenv('CLEANUP_SHORT_MAX_MINUTES', '30'))
+CLEANUP_LONG_MIN_HOURS = int(os.getenv('CLEANUP_LONG_MIN_HOURS', '1'))
+CLEANUP_LONG_MAX_HOURS = int(os.getenv('CLEANUP_LONG_MAX_HOURS', '24'))
+CLEANUP_LEADER_LOCK_PATH = os.getenv('CLEANUP_LEADER_LOCK_PATH', './data/cleanup_leader.lock')
+CLEANUP_LEADER_RETRY_SECONDS = int(os.getenv('CLEANUP_LEADER_RETRY_SECONDS', '15'))
+CLEANUP_REPORT_HISTORY = int(os.getenv('CLEANUP_REPORT_HISTORY', '20'))
+# 管理接口密钥：所有 /admin/* 接口需携带 Bearer 密钥，为空时管理接口一律拒绝
+ADMIN_API_KEY = os.getenv('ADMIN_API_KEY', '')
 
 # ========== 工具函数 ==========
 
@@ -75,6 +131,15 @@ def extract_api_key_from_request(request: Request) -> str:
         logger.error(f"❌ 提取API Key失败: {e}")
         return ""
 
+def is_admin_request(request: Request) -> bool:
+    """校验请求是否携带管理接口密钥（未配置ADMIN_API_KEY时一律拒绝）"""
+    if not ADMIN_API_KEY:
+        return False
+    authorization = request.headers.get("Authorization", "")
+    if not authorization.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(authorization[7:].strip().encode("utf-8"), ADMIN_API_KEY.encode("utf-8"))
+
 def extract_user_id_from_request(body_data: Dict, api_key: str = None) -> str:
     """从OpenAI请求中提取用户ID，实现API Key隔离"""
     try:
@@ -206,29 +271,107 @@ def initialize_memory_system():
             max_retrieval_results=MAX_RETRIEVAL_RESULTS,
             cluster_multiplier=CLUSTER_MULTIPLIER,
             retrieval_multiplier=RETRIEVAL_MULTIPLIER,
+            summary_engine=SUMMARY_ENGINE,
+            chunk_long_content=CHUNK_LONG_CONTENT,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            expiry_index=SHORT_TERM_EXPIRY_MODE == 'event',
+            short_term_epochs=SHORT_TERM_EPOCHS,
+            clustering_backend=CLUSTERING_BACKEND,
+            long_term_suppression=LONG_TERM_SUPPRESSION,
+            short_term_suppression=SHORT_TERM_SUPPRESSION,
+            mmr_lambda=MMR_LAMBDA,
+            dedupe_threshold=DEDUPE_SIMILARITY_THRESHOLD,
+            centroid_cache_size=CENTROID_CACHE_SIZE,
+            adaptive_retrieval=ADAPTIVE_RETRIEVAL,
+            user_count_ttl_seconds=USER_COUNT_TTL_SECONDS,
+            min_cluster_candidates=MIN_CLUSTER_CANDIDATES,
+            tiered_retrieval=TIERED_RETRIEVAL,
+            tiered_similarity_threshold=TIERED_SIMILARITY_THRESHOLD,
+            tiered_min_hits=TIERED_MIN_HITS,
+            retrieval_cache_size=RETRIEVAL_CACHE_SIZE,
+            retrieval_cache_ttl_seconds=RETRIEVAL_CACHE_TTL_SECONDS,
+            pipelined_processing=PIPELINED_PROCESSING,
+            pipeline_workers=PIPELINE_WORKERS,
+            write_behind=WRITE_BEHIND,
+            write_behind_queue_size=WRITE_BEHIND_QUEUE_SIZE,
+            write_behind_batch_size=WRITE_BEHIND_BATCH_SIZE,
+            write_behind_max_retries=WRITE_BEHIND_MAX_RETRIES,
+            access_counter_path=ACCESS_COUNTER_DB or None,
+            access_counter_flush_size=ACCESS_COUNTER_FLUSH_SIZE,
+            access_counter_flush_seconds=ACCESS_COUNTER_FLUSH_SECONDS,
         )
         
-        # 启动时清空短期记忆库
-        try:
-            # 清空短期记忆库
-            short_term_deleted_ids = chroma_service.delete_documents(
-                memory_system.short_term_collection_name
-            )
-            logger.info(f"启动清空短期记忆库，删除 {len(short_term_deleted_ids)} 条记录")
-            
-        except Exception as _e:
-            logger.warning("启动清空短期记忆库失败", exc_info=True)
-        
         # 初始化清理调度器
-        memory_cleanup_scheduler = MemoryCleanupScheduler(memory_system=memory_system)
+        memory_cleanup_scheduler = MemoryCleanupScheduler(
+            memory_system=memory_system,
+            cleanup_mode=CLEANUP_MODE,
+            page_size=CLEANUP_PAGE_SIZE,
+            time_budget_ms=CLEANUP_TIME_BUDGET_MS,
+            tick_seconds=CLEANUP_TICK_SECONDS,
+            cursor_path=CLEANUP_CURSOR_PATH,
+            cleanup_workers=CLEANUP_WORKERS,
+            cleanup_partitions=CLEANUP_PARTITIONS,
+            short_term_expiry_mode=SHORT_TERM_EXPIRY_MODE,
+            expiry_tick_seconds=EXPIRY_TICK_SECONDS,
+            expiry_batch_size=EXPIRY_BATCH_SIZE,
+            expiry_sync_seconds=EXPIRY_SYNC_SECONDS,
+            safety_sweep_minutes=EXPIRY_SAFETY_SWEEP_MINUTES,
+            adaptive=CLEANUP_ADAPTIVE,
+            adapt_tick_seconds=CLEANUP_ADAPT_TICK_SECONDS,
+            backlog_target=CLEANUP_BACKLOG_TARGET,
+            short_term_min_minutes=CLEANUP_SHORT_MIN_MINUTES,
+            short_term_max_minutes=CLEANUP_SHORT_MAX_MINUTES,
+            long_term_min_hours=CLEANUP_LONG_MIN_HOURS,
+            long_term_max_hours=CLEANUP_LONG_MAX_HOURS,
+            leader_lock_path=CLEANUP_LEADER_LOCK_PATH or None,
+            leader_retry_seconds=CLEANUP_LEADER_RETRY_SECONDS,
+            report_history=CLEANUP_REPORT_HISTORY,
+        )
         memory_cleanup_scheduler.start()
         
+        # 启动时恢复短期记忆快照（无快照则清空短期记忆库）
+        # 多worker部署时只由清理leader执行，避免各worker相互清空或重复恢复
+        if memory_cleanup_scheduler.get_role() != "follower":
+            restore_or_reset_short_term_memory()
+        
         logger.info("记忆系统初始化完成")
         return True
     except Exception as e:
         logger.error(f"记忆系统初始化失败: {str(e)}", exc_info=True)
         return False
 
+def restore_or_reset_short_term_memory():
+    """启动时从快照恢复短期记忆，快照不存在或恢复失败时清空短期记忆库"""
+    try:
+        if SHORT_TERM_SNAPSHOT_PATH and os.path.exists(SHORT_TERM_SNAPSHOT_PATH):
+            # 先清空残留记录，再写回快照中未过期的记录
+            memory_system.reset_short_term_memory()
+            stats = memory_system.restore_short_term_memory(SHORT_TERM_SNAPSHOT_PATH)
+            logger.info(f"启动恢复短期记忆快照: 恢复 {stats['restored']} 条, 丢弃过期 {stats['expired']} 条")
+            return
+    except Exception as _e:
+        logger.warning("启动恢复短期记忆快照失败，改为清空短期记忆库", exc_info=True)
+    
+    try:
+        # 清空短期记忆库（纪元模式下删除全部纪元集合）
+        short_term_deleted = memory_system.reset_short_term_memory()
+        logger.info(f"启动清空短期记忆库，删除 {short_term_deleted} 条记录")
+        
+    except Exception as _e:
+        logger.warning("启动清空短期记忆库失败", exc_info=True)
+
+def save_short_term_snapshot():
+    """优雅关闭时保存短期记忆快照（多worker部署时只由清理leader保存）"""
+    if not SHORT_TERM_SNAPSHOT_PATH or not memory_system:
+        return
+    if memory_cleanup_scheduler and memory_cleanup_scheduler.get_role() == "follower":
+        return
+    try:
+        memory_system.snapshot_short_term_memory(SHORT_TERM_SNAPSHOT_PATH)
+    except Exception as _e:
+        logger.warning("保存短期记忆快照失败", exc_info=True)
+
 def initialize_openai_clients():
     """初始化OpenAI客户端"""
     global openai_client, async_openai_client
@@ -261,10 +404,14 @@ async def lifespan(app: FastAPI):
     initialize_memory_system()
     initialize_openai_clients()
     yield
-    # 关闭时清理
+    # 关闭时清理：先保存短期记忆快照（此时仍持有leader身份），再停止调度器
+    save_short_term_snapshot()
     if memory_cleanup_scheduler:
         memory_cleanup_scheduler.stop()
         logger.info("记忆清理调度器已停止")
+    if memory_system:
+        memory_system.close()
+        memory_system.chroma_service.close()
 
 # ========== FastAPI应用初始化 ==========
 app = FastAPI(title="BionicMemory OpenAI Proxy", version="2.0.0", lifespan=lifespan)
@@ -287,9 +434,57 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "memory_system_initialized": memory_system is not None,
         "openai_client_initialized": openai_client is not None,
-        "cleanup_scheduler_running": memory_cleanup_scheduler is not None if memory_cleanup_scheduler else False
+        "cleanup_scheduler_running": memory_cleanup_scheduler is not None if memory_cleanup_scheduler else False,
+        "cleanup_role": memory_cleanup_scheduler.get_role() if memory_cleanup_scheduler else None,
+        "pid": os.getpid()
     }
 
+# ========== 管理接口 ==========
+ADMIN_FORBIDDEN_MESSAGE = "管理接口需要管理接口密钥（ADMIN_API_KEY）"
+
+@app.get("/admin/cleanup/reports")
+async def get_cleanup_reports(request: Request, limit: Optional[int] = None):
+    """获取最近的清理报告"""
+    if not is_admin_request(request):
+        return JSONResponse(status_code=403, content={"error": ADMIN_FORBIDDEN_MESSAGE})
+    if not memory_cleanup_scheduler:
+        return JSONResponse(status_code=503, content={"error": "清理调度器未初始化"})
+    return {
+        "role": memory_cleanup_scheduler.get_role(),
+        "reports": memory_cleanup_scheduler.get_cleanup_reports(limit)
+    }
+
+@app.post("/admin/cleanup/run")
+async def run_cleanup(request: Request, dry_run: bool = True):
+    """
+    立即执行一次清理（默认dry-run，只统计不删除）
+    需携带管理接口密钥（dry-run同样会扫描整个集合）；真实删除只能由leader（或未选主的单进程部署）执行，
+    避免与leader的清理任务并发删除
+    """
+    if not is_admin_request(request):
+        return JSONResponse(status_code=403, content={"error": ADMIN_FORBIDDEN_MESSAGE})
+    if not memory_cleanup_scheduler:
+        return JSONResponse(status_code=503, content={"error": "清理调度器未初始化"})
+    if not dry_run and memory_cleanup_scheduler.get_role() == "follower":
+        return JSONResponse(status_code=409, content={"error": "当前worker不是清理leader，请在leader上执行或使用dry-run"})
+    try:
+        reports = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: memory_cleanup_scheduler.run_cleanup_now(dry_run=dry_run)
+        )
+        return {"dry_run": dry_run, "reports": reports}
+    except Exception as e:
+        logger.error(f"❌ 执行清理失败: {e}")
+        return JSONResponse(status_code=500, content={"error": f"执行清理失败: {str(e)}"})
+
+@app.get("/admin/retrieval/stats")
+async def get_retrieval_stats(request: Request):
+    """获取检索侧统计（抑制策略、质心缓存命中率、分级检索命中/回退率等）"""
+    if not is_admin_request(request):
+        return JSONResponse(status_code=403, content={"error": ADMIN_FORBIDDEN_MESSAGE})
+    if not memory_system:
+        return JSONResponse(status_code=503, content={"error": "记忆系统未初始化"})
+    return memory_system.get_retrieval_stats()
+
 # ========== 主要路由处理 ==========
 @app.api_route("/v1/{path:path}", methods=["POST", "GET"])
 async def proxy(request: Request, path: str):
@@ -4,4 +4,11 @@
 包含仿生记忆系统的核心功能：
 - 长短期记忆系统
 - ChromaDB服务封装
+- 短期记忆过期索引
+- 自适应检索规模
+- 检索结果缓存
+- 分阶段耗时统计
+- 记忆写入的后台写回队列
+- ChromaDB写入合并
+- 访问计数旁路存储
 """
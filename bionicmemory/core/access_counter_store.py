@@ -0,0 +1,439 @@
+"""
+访问计数旁路存储（sidecar）
+每次检索命中只需刷新 valid_access_count / total_access_count / last_updated / last_updated_ts / expires_at，
+却要通过 update_documents 把包含完整 content 的整个元数据字典写回ChromaDB。
+旁路存储把这些高频变化的计数字段放在SQLite表中（按 (命名空间, doc_id) 为主键），
+写入先进入内存中的脏数据表，达到条数阈值或时间间隔（后台线程定时检查）后在一个事务中批量upsert；
+命中不再逐条产生向量库写入
+
+多进程共用同一个SQLite文件时，各进程的脏数据基于落盘前读到的计数累加。
+落盘在 BEGIN IMMEDIATE 事务中重读当前行，若已被其他进程改写，则由 merge 回调把本进程的增量叠加到当前值上，
+避免读-改-写相互覆盖
+
+读取时以旁路中的值覆盖ChromaDB元数据中的计数字段（仅当旁路记录不早于元数据中的时间戳）：
+访问只会推迟遗忘时刻，因此ChromaDB中的 expires_at 是真实值的下界。
+落盘后由 on_flush 回调把新的 expires_at 成批回写ChromaDB，使范围查询的下界保持贴近真实值，
+回写成功的行标记为已同步；回写失败时下界仍然成立，只是范围查询会多取到一些记录再由旁路复核
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+# 旁路存储的计数字段（其余元数据仍以ChromaDB为准）
+COUNTER_FIELDS = ("valid_access_count", "total_access_count", "last_updated", "last_updated_ts", "expires_at")
+
+# 单条SQL中IN列表的最大参数数（低于SQLite默认的变量上限）
+_SQL_BATCH = 500
+
+class AccessCounterStore:
+    """
+    SQLite访问计数旁路存储
+    线程安全；写入批量落盘，读取合并尚未落盘的脏数据
+    """
+
+    def __init__(self,
+                 path: str,
+                 flush_size: int = 256,
+                 flush_interval_seconds: float = 1.0,
+                 merge: Optional[Callable[[str, Dict, Dict, Dict], Dict]] = None,
+                 on_flush: Optional[Callable[[str, List[str], List[float]], None]] = None):
+        """
+        初始化旁路存储
+
+        Args:
+            path: SQLite文件路径（":memory:" 为进程内存储）
+            flush_size: 脏数据条数达到该值时批量落盘
+            flush_interval_seconds: 落盘间隔，后台线程按该间隔落盘，保证脏数据在一个间隔内对其他进程可见
+            merge: 落盘时当前行已被其他进程改写的合并函数 (命名空间, 当前值, 本进程读到的旧值, 本进程写入值) -> 合并值，
+                   默认以本进程写入值覆盖
+            on_flush: 落盘后的回写函数 (集合名, doc_id列表, expires_at列表)，用于把遗忘时刻同步回ChromaDB
+        """
+        self.path = path
+        self.flush_size = max(1, flush_size)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.merge = merge
+        self.on_flush = on_flush
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS access_counters ("
+            " namespace TEXT NOT NULL,"
+            " doc_id TEXT NOT NULL,"
+            " valid_access_count REAL,"
+            " total_access_count REAL,"
+            " last_updated TEXT,"
+            " last_updated_ts REAL,"
+            " expires_at REAL,"
+            " synced INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (namespace, doc_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_access_counters_expires ON access_counters (namespace, expires_at)"
+        )
+        self._conn.commit()
+
+        # 脏数据：(命名空间, doc_id) -> (本进程首次读到的旧值, 最新写入值, 写入时所在的集合)
+        self._dirty: Dict[Tuple[str, str], Tuple[Optional[Tuple], Tuple, Optional[str]]] = {}
+        # 已落盘、待回写ChromaDB的记录：集合名 -> [(命名空间, doc_id, expires_at)]
+        self._write_back_pending: Dict[str, List[Tuple[str, str, float]]] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+        self._closed = threading.Event()
+        self._wake = threading.Event()
+        self._flusher = None
+        if flush_interval_seconds > 0:
+            self._flusher = threading.Thread(target=self._run_flusher, name="access-counter-flush", daemon=True)
+            self._flusher.start()
+
+    @property
+    def visibility_lag_seconds(self) -> float:
+        """
+        其他进程的访问最迟多久在本进程可见：后台线程每个间隔落盘一次，取两倍间隔为落盘耗时留出余量
+        """
+        return 2.0 * self.flush_interval_seconds
+
+    def upsert(self,
+               namespace: str,
+               ids: List[str],
+               metadatas: List[Dict],
+               previous: Optional[List[Optional[Dict]]] = None,
+               collection_name: Optional[str] = None):
+        """
+        写入一批记录的计数字段（先进入脏数据表，按阈值批量落盘）
+
+        Args:
+            namespace: 命名空间（逻辑集合名）
+            ids: 文档ID列表
+            metadatas: 与ids对齐、含计数字段的元数据
+            previous: 与ids对齐、计算新计数时读到的旧元数据（落盘时据此判断其他进程是否改写过）
+            collection_name: 记录所在的实际集合（落盘后据此回写 expires_at，为空时不回写）
+        """
+        write_back_now = False
+        with self._lock:
+            for i, (doc_id, metadata) in enumerate(zip(ids, metadatas)):
+                key = (namespace, doc_id)
+                latest = tuple(metadata.get(field) for field in COUNTER_FIELDS)
+                if key in self._dirty:
+                    # 同一进程内的连续写入已基于上一次写入值，旧值沿用首次读到的
+                    base = self._dirty[key][0]
+                else:
+                    old = previous[i] if previous is not None else None
+                    base = tuple(old.get(field) for field in COUNTER_FIELDS) if old else None
+                self._dirty[key] = (base, latest, collection_name)
+            self._counts["upserts"] += len(ids)
+            if (len(self._dirty) >= self.flush_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval_seconds):
+                self._flush_locked()
+                # 落盘只涉及本地SQLite；回写ChromaDB交给后台线程，不占用命中路径
+                if self._flusher is not None:
+                    self._wake.set()
+                else:
+                    write_back_now = True
+        if write_back_now:
+            self._write_back()
+
+    def _merge_row(self, namespace: str, current: Optional[Tuple], base: Optional[Tuple], latest: Tuple) -> Tuple:
+        """
+        计算落盘值：当前行自本进程读取后未被改写时直接用本进程的写入值，否则交给merge合并
+        """
+        if self.merge is None or current is None or base is None or current == base:
+            return latest
+        base_ts = base[COUNTER_FIELDS.index("last_updated_ts")]
+        current_ts = current[COUNTER_FIELDS.index("last_updated_ts")]
+        if isinstance(base_ts, (int, float)) and float(current_ts or 0.0) < base_ts:
+            # 当前行早于本进程读到的元数据（记录已被重新写入ChromaDB），不是并发改写
+            return latest
+        merged = self.merge(
+            namespace,
+            dict(zip(COUNTER_FIELDS, current)),
+            dict(zip(COUNTER_FIELDS, base)),
+            dict(zip(COUNTER_FIELDS, latest))
+        )
+        self._counts["merged"] += 1
+        return tuple(merged.get(field) for field in COUNTER_FIELDS)
+
+    def _flush_locked(self):
+        """
+        在一个 BEGIN IMMEDIATE 事务中重读当前行、合并并批量upsert脏数据（调用方持有锁），
+        落盘的 expires_at 进入待回写列表
+        """
+        self._last_flush = time.monotonic()
+        if not self._dirty:
+            return
+        current: Dict[Tuple[str, str], Tuple] = {}
+        rows = []
+        pending: Dict[str, List[Tuple[str, str, float]]] = {}
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for namespace, doc_ids in self._group_dirty_ids().items():
+                for i in range(0, len(doc_ids), _SQL_BATCH):
+                    batch = doc_ids[i:i + _SQL_BATCH]
+                    for row in self._conn.execute(
+                        f"SELECT doc_id, {', '.join(COUNTER_FIELDS)} FROM access_counters"
+                        f" WHERE namespace = ? AND doc_id IN ({', '.join('?' * len(batch))})",
+                        [namespace] + batch
+                    ):
+                        current[(namespace, row[0])] = tuple(row[1:])
+            for key, (base, latest, collection_name) in self._dirty.items():
+                values = self._merge_row(key[0], current.get(key), base, latest)
+                rows.append(key + values)
+                expires_at = values[COUNTER_FIELDS.index("expires_at")]
+                if collection_name and isinstance(expires_at, (int, float)):
+                    pending.setdefault(collection_name, []).append((key[0], key[1], expires_at))
+            self._conn.executemany(
+                "INSERT INTO access_counters"
+                " (namespace, doc_id, valid_access_count, total_access_count, last_updated, last_updated_ts, expires_at, synced)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, 0)"
+                " ON CONFLICT(namespace, doc_id) DO UPDATE SET"
+                " valid_access_count=excluded.valid_access_count,"
+                " total_access_count=excluded.total_access_count,"
+                " last_updated=excluded.last_updated,"
+                " last_updated_ts=excluded.last_updated_ts,"
+                " expires_at=excluded.expires_at,"
+                " synced=0",
+                rows
+            )
+            self._conn.commit()
+        except Exception as e:
+            self._conn.rollback()
+            logger.error(f"访问计数批量落盘失败（{len(self._dirty)} 条），保留在内存中等待下次落盘: {e}")
+            raise
+        self._dirty.clear()
+        for collection_name, items in pending.items():
+            self._write_back_pending.setdefault(collection_name, []).extend(items)
+        self._counts["flushes"] += 1
+        self._counts["flushed_rows"] += len(rows)
+
+    def _group_dirty_ids(self) -> Dict[str, List[str]]:
+        """按命名空间分组脏数据的doc_id"""
+        grouped: Dict[str, List[str]] = {}
+        for namespace, doc_id in self._dirty:
+            grouped.setdefault(namespace, []).append(doc_id)
+        return grouped
+
+    def _write_back(self):
+        """
+        把已落盘的 expires_at 按集合回写ChromaDB（回写期间不持有锁，避免阻塞命中路径），成功的行标记为已同步
+        """
+        with self._lock:
+            pending, self._write_back_pending = self._write_back_pending, {}
+        if not pending or self.on_flush is None:
+            return
+        for collection_name, items in pending.items():
+            try:
+                self.on_flush(collection_name, [doc_id for _, doc_id, _ in items], [expires_at for *_, expires_at in items])
+            except Exception as e:
+                self._counts["write_back_failures"] += 1
+                logger.warning(f"访问计数回写ChromaDB失败（{collection_name}，{len(items)} 条），保留为未同步: {e}")
+                continue
+            with self._lock:
+                # 只标记回写值仍是当前值的行，期间再次落盘的行保持未同步
+                self._conn.executemany(
+                    "UPDATE access_counters SET synced = 1 WHERE namespace = ? AND doc_id = ? AND expires_at = ?",
+                    items
+                )
+                self._conn.commit()
+                self._counts["written_back"] += len(items)
+
+    def _run_flusher(self):
+        """后台定时落盘，使只被访问一次的记录也能在一个间隔内对其他进程可见"""
+        while True:
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            if self._closed.is_set():
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"访问计数定时落盘失败: {e}")
+
+    def flush(self):
+        """立即落盘全部脏数据并回写ChromaDB"""
+        with self._lock:
+            self._flush_locked()
+        self._write_back()
+
+    def get_many(self, namespace: str, ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        读取一批记录的计数字段
+
+        Args:
+            namespace: 命名空间
+            ids: 文档ID
+
+        Returns:
+            doc_id -> 计数字段字典（旁路中没有的记录不出现）
+        """
+        ids = list(dict.fromkeys(ids))
+        found: Dict[str, Dict] = {}
+        with self._lock:
+            missing = []
+            for doc_id in ids:
+                entry = self._dirty.get((namespace, doc_id))
+                if entry is None:
+                    missing.append(doc_id)
+                else:
+                    found[doc_id] = dict(zip(COUNTER_FIELDS, entry[1]))
+            for i in range(0, len(missing), _SQL_BATCH):
+                batch = missing[i:i + _SQL_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT doc_id, {', '.join(COUNTER_FIELDS)} FROM access_counters"
+                    f" WHERE namespace = ? AND doc_id IN ({', '.join('?' * len(batch))})",
+                    [namespace] + batch
+                ).fetchall()
+                for row in rows:
+                    found[row[0]] = dict(zip(COUNTER_FIELDS, row[1:]))
+            self._counts["lookups"] += len(ids)
+            self._counts["lookup_hits"] += len(found)
+        return found
+
+    def overlay(self, namespace: str, ids: List[str], metadatas: List[Optional[Dict]]) -> List[Optional[Dict]]:
+        """
+        以旁路中的计数字段覆盖元数据（返回新列表，不修改传入的字典）
+        旁路记录早于元数据中的 last_updated_ts 时（如记录被重新写入ChromaDB）以元数据为准
+
+        Args:
+            namespace: 命名空间
+            ids: 文档ID列表
+            metadatas: 与ids对齐的元数据
+        """
+        counters = self.get_many(namespace, ids)
+        if not counters:
+            return list(metadatas)
+        merged = []
+        for doc_id, metadata in zip(ids, metadatas):
+            row = counters.get(doc_id)
+            if metadata is None or row is None:
+                merged.append(metadata)
+                continue
+            stored_ts = metadata.get("last_updated_ts")
+            if isinstance(stored_ts, (int, float)) and float(row.get("last_updated_ts") or 0.0) < stored_ts:
+                merged.append(metadata)
+                continue
+            updated = dict(metadata)
+            updated.update({field: value for field, value in row.items() if value is not None})
+            merged.append(updated)
+        return merged
+
+    def live_ids(self, namespace: str, now_ts: float) -> List[str]:
+        """
+        旁路中遗忘时刻不早于 now_ts、且尚未回写ChromaDB的记录ID
+        （用于找回ChromaDB中 expires_at 已过时但仍存活的记录；已回写的记录按ChromaDB的范围查询即可找到）
+
+        Args:
+            namespace: 命名空间
+            now_ts: 当前时间（epoch秒）
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id FROM access_counters WHERE namespace = ? AND expires_at >= ? AND synced = 0",
+                (namespace, now_ts)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, namespace: str, ids: Iterable[str]):
+        """删除一批记录的计数"""
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            for doc_id in ids:
+                self._dirty.pop((namespace, doc_id), None)
+            self._drop_write_back(namespace, set(ids))
+            self._conn.executemany(
+                "DELETE FROM access_counters WHERE namespace = ? AND doc_id = ?",
+                [(namespace, doc_id) for doc_id in ids]
+            )
+            self._conn.commit()
+
+    def _drop_write_back(self, namespace: str, ids: Optional[set] = None):
+        """从待回写列表中移除已删除的记录（调用方持有锁）"""
+        for collection_name, items in list(self._write_back_pending.items()):
+            kept = [item for item in items if item[0] != namespace or (ids is not None and item[1] not in ids)]
+            if kept:
+                self._write_back_pending[collection_name] = kept
+            else:
+                del self._write_back_pending[collection_name]
+
+    def clear(self, namespace: str):
+        """删除命名空间下的全部计数"""
+        with self._lock:
+            for key in [key for key in self._dirty if key[0] == namespace]:
+                del self._dirty[key]
+            self._drop_write_back(namespace)
+            self._conn.execute("DELETE FROM access_counters WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+    def purge_expired(self, namespace: str, before_ts: float) -> int:
+        """
+        删除遗忘时刻早于 before_ts 的计数
+        旁路中已过期的记录在ChromaDB中必然也已过期（ChromaDB中的值只会更早），删除后判定结果不变
+
+        Returns:
+            删除的行数
+        """
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM access_counters WHERE namespace = ? AND expires_at < ?",
+                (namespace, before_ts)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """停止后台落盘线程，落盘脏数据并关闭连接"""
+        self._closed.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        with self._lock:
+            self._conn.close()
+        logger.info("访问计数旁路存储已关闭")
+
+    def get_stats(self) -> Dict:
+        """
+        获取旁路存储统计
+
+        Returns:
+            行数、未同步行数、待落盘条数、写入条数、落盘次数与平均每次落盘行数、
+            并发合并行数、回写行数与失败次数、读取命中率
+        """
+        with self._lock:
+            rows, unsynced = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(synced = 0), 0) FROM access_counters"
+            ).fetchone()
+            flushes = self._counts["flushes"]
+            lookups = self._counts["lookups"]
+            return {
+                "path": self.path,
+                "rows": rows,
+                "unsynced": unsynced,
+                "dirty": len(self._dirty),
+                "upserts": self._counts["upserts"],
+                "flushes": flushes,
+                "rows_per_flush": round(self._counts["flushed_rows"] / flushes, 2) if flushes else 0.0,
+                "merged": self._counts["merged"],
+                "written_back": self._counts["written_back"],
+                "write_back_failures": self._counts["write_back_failures"],
+                "lookups": lookups,
+                "lookup_hit_rate": round(self._counts["lookup_hits"] / lookups, 4) if lookups else 0.0
+            }
@@ -1,11 +1,13 @@
 import chromadb
 from chromadb import Documents, EmbeddingFunction, Embeddings
 from typing import Optional, List, Dict, Any, Union, Callable
+from concurrent.futures import Future
 import json
 import logging
 import os
 from dotenv import load_dotenv
 from bionicmemory.services.chat_helper import ChatHelper
+from bionicmemory.core.write_coalescer import WriteCoalescer
 
 # 加载.env文件
 load_dotenv()
@@ -29,7 +31,9 @@ class ChromaService:
                  host: str = None,
                  port: int = None,
                  chat_api_key: str = None,
-                 chat_base_url: str = None):
+                 chat_base_url: str = None,
+                 write_batch_ms: float = None,
+                 write_batch_size: int = None):
         """
         初始化ChromaDB服务
         
@@ -40,6 +44,8 @@ class ChromaService:
             port (int): 服务器端口（仅http模式）
             chat_api_key (str): 聊天API密钥
             chat_base_url (str): 聊天API基础URL
+            write_batch_ms (float): 写入合并的最长等待时间（毫秒），0表示不合并、每次调用直接写入
+            write_batch_size (int): 单次合并写入的最大记录数
         """
         try:
             # 从环境变量读取配置
@@ -57,6 +63,8 @@ class ChromaService:
             port = int(port or os.getenv('CHROMA_PORT', '8001'))
             chat_api_key = chat_api_key or os.getenv('OPENAI_API_KEY')
             chat_base_url = chat_base_url or os.getenv('OPENAI_API_BASE')
+            write_batch_ms = float(write_batch_ms if write_batch_ms is not None else os.getenv('CHROMA_WRITE_BATCH_MS', '0'))
+            write_batch_size = int(write_batch_size or os.getenv('CHROMA_WRITE_BATCH_SIZE', '256'))
             
             # 初始化ChromaDB客户端
             if client_type == "persistent":
@@ -83,6 +91,15 @@ class ChromaService:
             # 初始化自定义embedding函数相关变量
             self._custom_embedding_func = None
             self._embedding_function = None  # 本地模式不需要embedding函数
+            
+            # 写入合并：并发请求的小批量写入按集合合并为批量调用
+            self.write_coalescer = WriteCoalescer(
+                self._execute_write,
+                max_delay_ms=write_batch_ms,
+                max_batch_records=write_batch_size
+            ) if write_batch_ms > 0 else None
+            if self.write_coalescer is not None:
+                logger.info(f"Chroma写入合并已开启: 最长等待={write_batch_ms}ms, 单批上限={write_batch_size}条")
                 
         except Exception as e:
             raise Exception(f"初始化ChromaDB客户端失败: {str(e)}")
@@ -167,6 +184,8 @@ class ChromaService:
             None
         """
         try:
+            if self.write_coalescer is not None:
+                self.write_coalescer.flush(name)
             self.client.delete_collection(name=name)
             logger.info(f"成功删除集合: {name}")
         except Exception as e:
@@ -203,12 +222,17 @@ class ChromaService:
             if ids is None:
                 ids = [f"doc_{i}" for i in range(len(documents))]
             
+            # 验证参数长度一致性
+            if embeddings is not None and len(documents) != len(embeddings):
+                raise ValueError(f"文档数量({len(documents)})与embedding数量({len(embeddings)})不匹配")
+            
+            if self.write_coalescer is not None:
+                return self.submit_add(
+                    collection_name, documents, embeddings=embeddings, ids=ids, metadatas=metadatas
+                ).result()
+            
             # 如果提供了预计算的embedding，使用它们
             if embeddings is not None:
-                # 验证参数长度一致性
-                if len(documents) != len(embeddings):
-                    raise ValueError(f"文档数量({len(documents)})与embedding数量({len(embeddings)})不匹配")
-                
                 collection.add(
                     documents=documents,
                     embeddings=embeddings,
@@ -228,6 +252,99 @@ class ChromaService:
             logger.error(f"添加文档失败: {e}")
             raise  # ✅ 抛出异常
     
+    def submit_add(self,
+                   collection_name: str,
+                   documents: List[str],
+                   embeddings: List[List[float]] = None,
+                   ids: Optional[List[str]] = None,
+                   metadatas: Optional[List[Dict[str, Any]]] = None) -> Future:
+        """
+        提交添加文档的写操作，返回完成时结束的Future（结果为文档ID列表）
+        开启写入合并时与其他并发写入合并为批量调用，否则立即执行
+        """
+        if ids is None:
+            ids = [f"doc_{i}" for i in range(len(documents))]
+        return self._submit_write(collection_name, "add", ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+    
+    def submit_update(self,
+                      collection_name: str,
+                      ids: List[str],
+                      documents: Optional[List[str]] = None,
+                      metadatas: Optional[List[Dict[str, Any]]] = None) -> Future:
+        """提交更新文档的写操作，返回完成时结束的Future（结果为文档ID列表）"""
+        return self._submit_write(collection_name, "update", ids, documents=documents, metadatas=metadatas)
+    
+    def submit_delete(self, collection_name: str, ids: List[str]) -> Future:
+        """提交按ID删除文档的写操作，返回完成时结束的Future（结果为文档ID列表）"""
+        return self._submit_write(collection_name, "delete", ids)
+    
+    def _submit_write(self,
+                      collection_name: str,
+                      operation: str,
+                      ids: List[str],
+                      documents: Optional[List[str]] = None,
+                      embeddings: Optional[List[List[float]]] = None,
+                      metadatas: Optional[List[Dict[str, Any]]] = None) -> Future:
+        """提交写操作：交给写入合并器，未开启时同步执行并返回已完成的Future"""
+        if self.write_coalescer is not None:
+            return self.write_coalescer.submit(
+                collection_name, operation, ids, documents=documents, embeddings=embeddings, metadatas=metadatas
+            )
+        future = Future()
+        try:
+            self._execute_write(collection_name, operation, {
+                "ids": ids, "documents": documents, "embeddings": embeddings, "metadatas": metadatas
+            })
+            future.set_result(ids)
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def _execute_write(self, collection_name: str, operation: str, columns: Dict[str, Optional[list]]):
+        """
+        执行一次（可能是合并后的）批量写入
+        
+        Args:
+            collection_name: 集合名称
+            operation: add / update / delete
+            columns: ids / documents / embeddings / metadatas
+        """
+        collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=self._embedding_function
+        )
+        if operation == "add":
+            kwargs = {"documents": columns["documents"], "ids": columns["ids"], "metadatas": columns["metadatas"]}
+            if columns.get("embeddings") is not None:
+                kwargs["embeddings"] = columns["embeddings"]
+            collection.add(**kwargs)
+        elif operation == "update":
+            collection.update(ids=columns["ids"], documents=columns.get("documents"), metadatas=columns.get("metadatas"))
+        elif operation == "delete":
+            collection.delete(ids=columns["ids"])
+        else:
+            raise ValueError(f"不支持的写操作: {operation}")
+    
+    def flush_writes(self, collection_name: Optional[str] = None):
+        """
+        立即写入写入合并器中排队的写操作并等待完成（未开启合并时直接返回）
+        
+        Args:
+            collection_name: 只刷写该集合，默认全部
+        """
+        if self.write_coalescer is not None:
+            self.write_coalescer.flush(collection_name)
+    
+    def get_write_stats(self) -> Optional[Dict[str, Any]]:
+        """获取写入合并统计（未开启时返回None）"""
+        return self.write_coalescer.get_stats() if self.write_coalescer is not None else None
+    
+    def close(self):
+        """写完排队中的写操作并停止写入合并线程"""
+        if self.write_coalescer is not None:
+            self.write_coalescer.close()
+            self.write_coalescer = None
+    
     def query_documents(self,
                        collection_name: str,
                        query_texts: List[str] = None,
@@ -300,7 +417,8 @@ class ChromaService:
                      ids: Optional[List[str]] = None,
                      limit: Optional[int] = None,
                      where: Optional[Dict[str, Any]] = None,
-                     include: Optional[List[str]] = None) -> Dict:
+                     include: Optional[List[str]] = None,
+                     offset: Optional[int] = None) -> Dict:
         """
         获取文档
         
@@ -310,6 +428,7 @@ class ChromaService:
             limit (int, optional): 限制返回数量
             where (Dict[str, Any], optional): 元数据过滤条件
             include (List[str], optional): 需要返回的数据类型
+            offset (int, optional): 跳过的记录数（与limit配合分页）
             
         Returns:
             Dict: 文档结果字典
@@ -328,6 +447,7 @@ class ChromaService:
             results = collection.get(
                 ids=ids,
                 limit=limit,
+                offset=offset,
                 where=where,
                 include=include
             )
@@ -375,11 +495,14 @@ class ChromaService:
                 embedding_function=self._embedding_function
             )
             
-            collection.update(
-                ids=ids,
-                documents=documents,
-                metadatas=metadatas
-            )
+            if self.write_coalescer is not None:
+                self.submit_update(collection_name, ids, documents=documents, metadatas=metadatas).result()
+            else:
+                collection.update(
+                    ids=ids,
+                    documents=documents,
+                    metadatas=metadatas
+                )
             
             # 返回更新后的文档数据
             return collection.get(ids=ids)  # ✅ 返回实际数据
@@ -411,12 +534,17 @@ class ChromaService:
             
             # 如果提供了ids，直接删除
             if ids:
+                if self.write_coalescer is not None:
+                    return self.submit_delete(collection_name, ids).result()
                 collection.delete(ids=ids)
                 return ids  # ✅ 返回实际数据
             else:
+                # 按条件删除需要先看到排队中的写入
+                if self.write_coalescer is not None:
+                    self.write_coalescer.flush(collection_name)
                 # 如果使用where条件，先查询要删除的文档
                 if where:
-                    results = collection.get(where=where)
+                    results = collection.get(where=where, include=[])
                     deleted_ids = results.get('ids', [])
                     if deleted_ids:
                         collection.delete(ids=deleted_ids)
@@ -548,3 +676,25 @@ class ChromaService:
         except Exception as e:
             logger.error(f"获取集合失败: {name}, 错误: {e}")
             raise
+
+    def get_distance_space(self, name: str) -> str:
+        """
+        获取集合的向量距离空间（l2 / cosine / ip）
+        优先读取集合元数据中的 hnsw:space，其次读取集合配置；均未声明时为ChromaDB默认的 l2（平方欧氏距离）
+        
+        Args:
+            name (str): 集合名称
+            
+        Returns:
+            str: 距离空间名称
+        """
+        try:
+            collection = self.client.get_collection(name)
+            space = (collection.metadata or {}).get("hnsw:space")
+            if not space:
+                configuration = getattr(collection, "configuration", None) or {}
+                space = (configuration.get("hnsw") or {}).get("space")
+            return str(space or "l2").lower()
+        except Exception as e:
+            logger.error(f"获取集合距离空间失败: {name}, 错误: {e}")
+            raise
@@ -0,0 +1,163 @@
+"""
+进程内过期索引
+以最小堆维护 (expires_at, collection_name, doc_id)，由记忆系统的写入与访问更新驱动，
+到期记录按小批量取出交给清理调度器删除，替代固定间隔的全量轮询
+"""
+
+import heapq
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class ExpiryIndex:
+    """
+    过期索引（最小堆 + 惰性失效）
+    同一记录被重复推入时只以最新的 expires_at 为准，旧堆项在弹出时丢弃
+    """
+
+    def __init__(self):
+        """初始化过期索引"""
+        self._heap: List[Tuple[float, str, str]] = []
+        self._deadlines: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._deadlines)
+
+    def push(self, collection_name: str, doc_id: str, expires_at: float):
+        """
+        登记或刷新记录的遗忘时刻
+
+        Args:
+            collection_name: 集合名称
+            doc_id: 文档ID
+            expires_at: 遗忘时刻（epoch秒）
+        """
+        with self._lock:
+            self._deadlines[(collection_name, doc_id)] = float(expires_at)
+            heapq.heappush(self._heap, (float(expires_at), collection_name, doc_id))
+            self._maybe_compact()
+
+    def push_many(self, collection_name: str, entries: Iterable[Tuple[str, float]]) -> int:
+        """
+        批量登记记录的遗忘时刻（遗忘时刻未变的记录跳过）
+
+        Args:
+            collection_name: 集合名称
+            entries: (doc_id, expires_at) 序列
+
+        Returns:
+            新登记或刷新的记录数
+        """
+        changed = 0
+        with self._lock:
+            for doc_id, expires_at in entries:
+                key = (collection_name, doc_id)
+                if self._deadlines.get(key) == float(expires_at):
+                    continue
+                self._deadlines[key] = float(expires_at)
+                heapq.heappush(self._heap, (float(expires_at), collection_name, doc_id))
+                changed += 1
+            self._maybe_compact()
+        return changed
+
+    def discard(self, collection_name: str, doc_ids: Iterable[str]):
+        """
+        移除已被删除的记录（堆项惰性失效）
+
+        Args:
+            collection_name: 集合名称
+            doc_ids: 文档ID列表
+        """
+        with self._lock:
+            for doc_id in doc_ids:
+                self._deadlines.pop((collection_name, doc_id), None)
+
+    def clear(self, collection_name: Optional[str] = None):
+        """
+        清空索引
+
+        Args:
+            collection_name: 只清空指定集合，默认清空全部
+        """
+        with self._lock:
+            if collection_name is None:
+                self._deadlines.clear()
+                self._heap = []
+            else:
+                for key in [k for k in self._deadlines if k[0] == collection_name]:
+                    del self._deadlines[key]
+                self._maybe_compact()
+
+    def next_deadline(self) -> Optional[float]:
+        """返回最早的有效遗忘时刻，索引为空时返回None"""
+        with self._lock:
+            while self._heap:
+                expires_at, collection_name, doc_id = self._heap[0]
+                if self._deadlines.get((collection_name, doc_id)) == expires_at:
+                    return expires_at
+                heapq.heappop(self._heap)
+            return None
+
+    def count_due(self, collection_name: str, now_ts: Optional[float] = None, limit: Optional[int] = None) -> int:
+        """
+        统计集合中已到期（遗忘时刻不晚于 now_ts）的记录数，不取出
+
+        Args:
+            collection_name: 集合名称
+            now_ts: 当前时间（epoch秒），默认取当前时间
+            limit: 最多数到的条数，默认不限
+        """
+        if now_ts is None:
+            now_ts = datetime.now().timestamp()
+
+        count = 0
+        with self._lock:
+            for (name, _), expires_at in self._deadlines.items():
+                if name == collection_name and expires_at <= now_ts:
+                    count += 1
+                    if limit is not None and count >= limit:
+                        break
+        return count
+
+    def pop_due(self, now_ts: Optional[float] = None, limit: int = 100) -> Dict[str, List[str]]:
+        """
+        取出已到期的记录（至多limit条），按集合分组
+
+        Args:
+            now_ts: 当前时间（epoch秒），默认取当前时间
+            limit: 本批最多取出的记录数
+
+        Returns:
+            {collection_name: [doc_id, ...]}
+        """
+        if now_ts is None:
+            now_ts = datetime.now().timestamp()
+
+        due: Dict[str, List[str]] = {}
+        count = 0
+        with self._lock:
+            while self._heap and count < limit and self._heap[0][0] <= now_ts:
+                expires_at, collection_name, doc_id = heapq.heappop(self._heap)
+                key = (collection_name, doc_id)
+                if self._deadlines.get(key) != expires_at:
+                    # 记录已被刷新或删除，丢弃旧堆项
+                    continue
+                del self._deadlines[key]
+                due.setdefault(collection_name, []).append(doc_id)
+                count += 1
+        return due
+
+    def _maybe_compact(self):
+        """失效堆项过多时重建堆，避免内存随访问更新无限增长（调用方需持有锁）"""
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [
+                (expires_at, collection_name, doc_id)
+                for (collection_name, doc_id), expires_at in self._deadlines.items()
+            ]
+            heapq.heapify(self._heap)
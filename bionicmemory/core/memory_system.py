@@ -4,25 +4,46 @@
 """
 
 import hashlib
+import json
 import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FuturesTimeoutError
 import numpy as np
 from datetime import datetime
 from enum import Enum
 from typing import List, Dict, Optional, Tuple, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
 
 
 from bionicmemory.algorithms.newton_cooling_helper import NewtonCoolingHelper, CoolingRate
 from bionicmemory.core.chroma_service import ChromaService
+from bionicmemory.core.expiry_index import ExpiryIndex
 from bionicmemory.services.summary_service import SummaryService
-from bionicmemory.algorithms.clustering_suppression import ClusteringSuppression
+from bionicmemory.services.extractive_summary_service import ExtractiveSummaryService
+from bionicmemory.algorithms.suppression_strategy import (
+    SUPPRESSION_STRATEGIES, create_suppression_strategy, similarity_softmax, stable_topk_indices
+)
+from bionicmemory.algorithms.centroid_cache import CentroidCache
+from bionicmemory.algorithms.candidate_set import CandidateSet
+from bionicmemory.core.retrieval_sizing import RetrievalSizer
+from bionicmemory.core.retrieval_cache import RetrievalCache
+from bionicmemory.core.stage_timings import StageTimings
+from bionicmemory.core.write_behind import WriteBehindQueue
+from bionicmemory.core.access_counter_store import AccessCounterStore
 from bionicmemory.services.local_embedding_service import get_embedding_service
+from bionicmemory.utils.text_splitter import split_into_chunks
 
 # 使用统一日志配置
 from bionicmemory.utils.logging_config import get_logger
 logger = get_logger(__name__)
 
+# 用户分桶数：记录写入时按 user_id 哈希落入固定分桶，清理时按分桶分片并行处理
+USER_BUCKET_COUNT = 64
+
 class SourceType(Enum):
     """消息来源类型枚举"""
     USER = "user"      # 用户发送的消息
@@ -39,6 +60,37 @@ class MemoryRecord:
     total_access_count: int
     source_type: str
     user_id: str
+    last_updated_ts: float = 0.0
+    created_at_ts: float = 0.0
+
+@dataclass
+class CleanupReport:
+    """单次清理的统计报告"""
+    collection: str
+    mode: str                  # range / page / partition / incremental 等
+    dry_run: bool = False
+    started_at: str = ""
+    scanned: int = 0           # 读取并判定的记录数
+    expired: int = 0           # 判定为过期的父记录数
+    deleted: int = 0           # 实际删除的父记录数（dry-run时为0）
+    chunks: int = 0            # 随父记录级联的分块数
+    bytes_freed: int = 0       # 释放（dry-run时为可释放）的估算字节数
+    fetch_ms: float = 0.0
+    decay_ms: float = 0.0
+    delete_ms: float = 0.0
+    total_ms: float = 0.0
+
+    def merge(self, other: "CleanupReport"):
+        """累加另一份报告的计数与耗时（用于分页/分片汇总）"""
+        for field_name in ("scanned", "expired", "deleted", "chunks", "bytes_freed",
+                           "fetch_ms", "decay_ms", "delete_ms"):
+            setattr(self, field_name, getattr(self, field_name) + getattr(other, field_name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        for field_name in ("fetch_ms", "decay_ms", "delete_ms", "total_ms"):
+            data[field_name] = round(data[field_name], 2)
+        return data
 
 class LongShortTermMemorySystem:
     """
@@ -51,7 +103,36 @@ class LongShortTermMemorySystem:
                  summary_threshold: int = 500,
                  max_retrieval_results: int = 10,
                  cluster_multiplier: int = 3,
-                 retrieval_multiplier: int = 2):
+                 retrieval_multiplier: int = 2,
+                 summary_engine: str = "llm",
+                 chunk_long_content: bool = False,
+                 chunk_size: Optional[int] = None,
+                 chunk_overlap: int = 100,
+                 expiry_index: bool = False,
+                 short_term_epochs: bool = False,
+                 clustering_backend: str = "spherical",
+                 long_term_suppression: str = "kmeans",
+                 short_term_suppression: str = "kmeans",
+                 mmr_lambda: float = 0.7,
+                 dedupe_threshold: float = 0.9,
+                 centroid_cache_size: int = 0,
+                 adaptive_retrieval: bool = False,
+                 user_count_ttl_seconds: float = 300.0,
+                 min_cluster_candidates: int = 12,
+                 tiered_retrieval: str = "off",
+                 tiered_similarity_threshold: float = 0.8,
+                 tiered_min_hits: int = 3,
+                 retrieval_cache_size: int = 0,
+                 retrieval_cache_ttl_seconds: float = 300.0,
+                 pipelined_processing: bool = False,
+                 pipeline_workers: int = 4,
+                 write_behind: bool = False,
+                 write_behind_queue_size: int = 1024,
+                 write_behind_batch_size: int = 64,
+                 write_behind_max_retries: int = 2,
+                 access_counter_path: Optional[str] = None,
+                 access_counter_flush_size: int = 256,
+                 access_counter_flush_seconds: float = 1.0):
         """
         初始化长短期记忆系统
         
@@ -61,23 +142,137 @@ class LongShortTermMemorySystem:
             max_retrieval_results: 最大检索结果数量（默认10）
             cluster_multiplier: 聚类倍数（默认3）
             retrieval_multiplier: 检索倍数（默认2）
+            summary_engine: 主摘要引擎，"llm"（大模型摘要）或 "extractive"（本地抽取式摘要）
+            chunk_long_content: 是否对超长内容分块入库（默认关闭，关闭时超长内容只保留摘要）
+            chunk_size: 分块大小（默认等于摘要阈值）
+            chunk_overlap: 相邻分块的重叠字符数（默认100）
+            expiry_index: 是否维护短期记忆的进程内过期索引（事件驱动清理时开启）
+            short_term_epochs: 是否启用短期记忆纪元轮换（按纪元分集合写入，过期以整集合删除代替逐条删除）
+            clustering_backend: 聚类抑制的k-means后端，"spherical"（内置球面k-means）或 "sklearn"
+            long_term_suppression: 长期记忆检索的抑制策略（kmeans / mmr / threshold / none）
+            short_term_suppression: 短期记忆检索的抑制策略（kmeans / mmr / threshold / none）
+            mmr_lambda: mmr策略的相关度权重（默认0.7）
+            dedupe_threshold: threshold策略的归并余弦相似度阈值（默认0.9）
+            centroid_cache_size: kmeans抑制的按用户质心缓存容量（LRU，0表示关闭）
+            adaptive_retrieval: 是否按用户记录数与候选离散度自适应调整检索条数与聚类数
+            user_count_ttl_seconds: 用户记录数缓存有效期（秒）
+            min_cluster_candidates: 候选数不超过该值时跳过聚类抑制
+            tiered_retrieval: 短期优先的分级检索，"off"（关闭）、"skip"（短期命中时跳过长期检索）
+                或 "defer"（短期命中时把长期检索推迟到大模型回复后）
+            tiered_similarity_threshold: 短期命中的余弦相似度阈值（按短期集合的 hnsw:space 由距离换算）
+            tiered_min_hits: 短期命中的最少记录数
+            retrieval_cache_size: 检索结果缓存容量（按用户与内容哈希，写代次失效，0表示关闭；写回模式下不开启）
+            retrieval_cache_ttl_seconds: 检索结果缓存有效期（秒）
+            pipelined_processing: 是否以流水线方式处理消息（长期入库与长期检索并行执行）
+            pipeline_workers: 流水线工作线程数
+            write_behind: 是否启用写回模式（长期入库与短期更新进入后台队列，本轮检索在内存中合并新记录）
+            write_behind_queue_size: 写回队列容量，满时提交方阻塞
+            write_behind_batch_size: 写回线程每批最多处理的写操作数
+            write_behind_max_retries: 写回失败的操作的最大重试次数，仍失败时丢弃并计入统计
+            access_counter_path: 访问计数旁路存储的SQLite路径（命中时只更新旁路中的计数，不再改写ChromaDB元数据；None表示关闭）
+            access_counter_flush_size: 旁路存储脏数据批量落盘的条数阈值
+            access_counter_flush_seconds: 旁路存储脏数据批量落盘的时间间隔（秒）
         """
         self.chroma_service = chroma_service
         self.max_retrieval_results = max_retrieval_results
         self.cluster_multiplier = cluster_multiplier
         self.retrieval_multiplier = retrieval_multiplier
         self.summary_threshold = summary_threshold
+        if summary_engine not in ("llm", "extractive"):
+            raise ValueError(f"不支持的摘要引擎: {summary_engine}")
+        self.summary_engine = summary_engine
+        self.chunk_long_content = chunk_long_content
+        self.chunk_size = chunk_size or summary_threshold
+        self.chunk_overlap = chunk_overlap
+        self.clustering_backend = clustering_backend
+        for strategy in (long_term_suppression, short_term_suppression):
+            if strategy not in SUPPRESSION_STRATEGIES:
+                raise ValueError(f"不支持的抑制策略: {strategy}")
+        self.long_term_suppression = long_term_suppression
+        self.short_term_suppression = short_term_suppression
+        self.mmr_lambda = mmr_lambda
+        self.dedupe_threshold = dedupe_threshold
+        
+        # 按用户缓存聚类质心：相邻轮次以上一轮质心热启动，候选集合不变时直接复用簇分配
+        self.centroid_cache = CentroidCache(centroid_cache_size) if centroid_cache_size > 0 else None
+        
+        # 自适应检索规模：按用户记录数封顶检索条数，候选过少时跳过聚类
+        self.retrieval_sizer = RetrievalSizer(
+            count_ttl_seconds=user_count_ttl_seconds,
+            min_cluster_candidates=min_cluster_candidates
+        ) if adaptive_retrieval else None
+        
+        # 短期优先的分级检索：短期记忆已有足够近邻时跳过或推迟长期检索
+        if tiered_retrieval not in ("off", "skip", "defer"):
+            raise ValueError(f"不支持的分级检索模式: {tiered_retrieval}")
+        self.tiered_retrieval = tiered_retrieval
+        self.tiered_similarity_threshold = tiered_similarity_threshold
+        self.tiered_min_hits = tiered_min_hits
+        self._tiered_counts = Counter()
+        self._deferred_long_term: Dict[str, Tuple[str, List[float]]] = {}
+        self._tiered_lock = threading.Lock()
+        # 短期集合的距离空间（l2 / cosine / ip），首次分级检索时从集合读取
+        self._short_term_space: Optional[str] = None
+        
+        # 检索结果缓存：该用户任意写入即失效，重复请求直接返回上一次的记录与提示语
+        # 写回模式下本轮的写入在缓存之后才由后台线程落库并使缓存失效，缓存不起作用，因此不开启
+        if retrieval_cache_size > 0 and write_behind:
+            logger.warning("写回模式下检索结果缓存会被本轮的延迟写入立即失效，已关闭检索结果缓存")
+            retrieval_cache_size = 0
+        self.retrieval_cache = RetrievalCache(
+            max_entries=retrieval_cache_size,
+            ttl_seconds=retrieval_cache_ttl_seconds
+        ) if retrieval_cache_size > 0 else None
+        # 缓存命中时的访问记录交给单个后台线程按命中顺序执行：请求不等待ChromaDB读写，
+        # 串行执行使同一进程内的并发命中不会相互覆盖计数
+        self._hit_recorder = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="cache-hit-recorder"
+        ) if self.retrieval_cache is not None else None
+        self._hit_record_counts = Counter()
+        
+        # 流水线处理：embedding就绪后，长期入库在工作线程中与长期检索并行执行
+        self.pipelined_processing = pipelined_processing
+        self._pipeline_executor = ThreadPoolExecutor(
+            max_workers=max(1, pipeline_workers), thread_name_prefix="memory-pipeline"
+        ) if pipelined_processing else None
+        self.stage_timings = StageTimings()
+        
+        # 写回模式：本轮的长期入库与短期更新由后台线程成批写入，不计入本轮延迟
+        self.write_behind = WriteBehindQueue(
+            self._apply_pending_writes,
+            max_pending=write_behind_queue_size,
+            batch_size=write_behind_batch_size,
+            max_retries=write_behind_max_retries
+        ) if write_behind else None
+        
+        # 访问计数旁路存储：命中时的计数刷新写入SQLite，落盘后只把新的遗忘时刻成批回写ChromaDB
+        # 多worker共用同一文件时，落盘按牛顿冷却的线性性把各进程的增量合并，不会相互覆盖
+        self.access_counters = AccessCounterStore(
+            access_counter_path,
+            flush_size=access_counter_flush_size,
+            flush_interval_seconds=access_counter_flush_seconds,
+            merge=self._merge_counters,
+            on_flush=self._write_back_expiry
+        ) if access_counter_path else None
         
         # 牛顿冷却助手
         self.newton_helper = NewtonCoolingHelper()
         
-        # 摘要服务
+        # 摘要服务（抽取式为主引擎时不初始化LLM摘要）
+        self.summary_service = None
+        if self.summary_engine == "llm":
+            try:
+                self.summary_service = SummaryService()
+                logger.info("摘要服务初始化成功")
+            except Exception as e:
+                logger.warning(f"摘要服务初始化失败，将使用抽取式摘要: {e}")
+        
+        # 抽取式摘要服务（本地离线，作为主引擎或降级方案）
         try:
-            self.summary_service = SummaryService()
-            logger.info("摘要服务初始化成功")
+            self.extractive_summary_service = ExtractiveSummaryService()
         except Exception as e:
-            logger.warning(f"摘要服务初始化失败，将使用简单截断: {e}")
-            self.summary_service = None
+            logger.warning(f"抽取式摘要服务初始化失败，将使用简单截断: {e}")
+            self.extractive_summary_service = None
         
         # 遗忘阈值（从科学数据读取）
         self.long_term_threshold = self.newton_helper.get_threshold(CoolingRate.DAYS_31)
@@ -87,6 +282,16 @@ class LongShortTermMemorySystem:
         self.long_term_collection_name = "long_term_memory"
         self.short_term_collection_name = "short_term_memory"
         
+        # 短期记忆纪元轮换：写入当前纪元集合，读取当前与上一纪元，更早的纪元整集合删除
+        # 纪元长度取短期遗忘速率的时间尺度（MINUTES_20 即20分钟）
+        self.short_term_epochs = short_term_epochs
+        self.short_term_epoch_seconds = CoolingRate.MINUTES_20.value[1]
+        self._ensured_epochs = set()
+        
+        # 短期记忆过期索引（由写入与访问更新驱动，清理调度器按到期时刻批量删除）
+        # 纪元模式下过期由整集合轮换完成，不需要索引
+        self.expiry_index = ExpiryIndex() if expiry_index and not short_term_epochs else None
+        
         # 初始化集合
         self._initialize_collections()
         
@@ -97,11 +302,277 @@ class LongShortTermMemorySystem:
         
         logger.info(f"长短期记忆系统初始化完成")
         logger.info(f"摘要阈值: {self.summary_threshold}")
+        logger.info(f"摘要引擎: {self.summary_engine}")
+        logger.info(f"超长内容分块: {self.chunk_long_content} (块大小={self.chunk_size}, 重叠={self.chunk_overlap})")
         logger.info(f"最大检索结果数量: {self.max_retrieval_results}")
         logger.info(f"聚类倍数: {self.cluster_multiplier}")
         logger.info(f"检索倍数: {self.retrieval_multiplier}")
+        logger.info(f"聚类后端: {self.clustering_backend}")
+        logger.info(f"抑制策略: 长期={self.long_term_suppression}, 短期={self.short_term_suppression}")
+        logger.info(f"流水线处理: {'开启 (工作线程=' + str(pipeline_workers) + ')' if self.pipelined_processing else '关闭'}")
+        logger.info(f"访问计数旁路存储: {access_counter_path if self.access_counters is not None else '关闭'}")
+        logger.info(f"写回模式: {'开启 (队列容量=' + str(write_behind_queue_size) + ')' if self.write_behind is not None else '关闭'}")
+        logger.info(f"检索结果缓存: {'开启 (容量=' + str(retrieval_cache_size) + ')' if self.retrieval_cache is not None else '关闭'}")
+        logger.info(f"分级检索: {self.tiered_retrieval} (相似度阈值={self.tiered_similarity_threshold}, 最少命中={self.tiered_min_hits})")
+        logger.info(f"自适应检索规模: {'开启' if self.retrieval_sizer is not None else '关闭'}")
+        logger.info(f"聚类质心缓存: {'开启 (容量=' + str(centroid_cache_size) + ')' if self.centroid_cache is not None else '关闭'}")
         logger.info(f"长期记忆阈值: {self.long_term_threshold}")
         logger.info(f"短期记忆阈值: {self.short_term_threshold}")
+        logger.info(f"短期记忆过期索引: {'开启' if self.expiry_index is not None else '关闭'}")
+        logger.info(f"短期记忆纪元轮换: {'开启' if self.short_term_epochs else '关闭'} (纪元长度={self.short_term_epoch_seconds}s)")
+    
+    def _create_suppression(self, strategy: str, cluster_multiplier: int, retrieval_multiplier: int):
+        """
+        按配置创建检索抑制策略
+        
+        Args:
+            strategy: 策略名称（kmeans / mmr / threshold / none）
+            cluster_multiplier: 每簇期望记录数
+            retrieval_multiplier: 检索倍数
+        """
+        return create_suppression_strategy(
+            strategy,
+            cluster_multiplier=cluster_multiplier,
+            retrieval_multiplier=retrieval_multiplier,
+            kmeans_backend=self.clustering_backend,
+            mmr_lambda=self.mmr_lambda,
+            similarity_threshold=self.dedupe_threshold,
+            centroid_cache=self.centroid_cache
+        )
+    
+    def _centroid_cache_key(self, collection_name: str, user_id: Optional[str]) -> Optional[str]:
+        """质心缓存键：集合名:用户ID（未开启缓存时返回None）"""
+        if self.centroid_cache is None:
+            return None
+        return f"{collection_name}:{user_id or '*'}"
+    
+    def _user_record_count(self, collection_name: str, user_id: Optional[str]) -> Optional[int]:
+        """
+        获取用户在集合中的记录数（带TTL缓存，短期记忆汇总所有纪元集合）
+        
+        Returns:
+            记录数；未开启自适应检索、未指定用户或统计失败时返回None
+        """
+        if self.retrieval_sizer is None or not user_id:
+            return None
+        key = f"{collection_name}:{user_id}"
+        count = self.retrieval_sizer.get_count(key)
+        if count is not None:
+            return count
+        
+        try:
+            collections = (
+                self.get_short_term_collections()
+                if collection_name == self.short_term_collection_name
+                else [collection_name]
+            )
+            count = 0
+            for name in collections:
+                results = self.chroma_service.get_documents(
+                    name,
+                    where={"user_id": {"$eq": user_id}},
+                    include=[]
+                )
+                count += len(results.get("ids") or []) if results else 0
+            self.retrieval_sizer.set_count(key, count)
+            return count
+        except Exception as e:
+            logger.warning(f"统计用户 {user_id} 在 {collection_name} 中的记录数失败: {e}")
+            return None
+    
+    def _plan_retrieval(self,
+                        collection_name: str,
+                        user_id: Optional[str],
+                        suppression,
+                        total_retrieval: int,
+                        cluster_count: int):
+        """
+        规划检索规模（未开启自适应检索时原样返回）
+        
+        Returns:
+            (检索条数, 聚类数, 抑制策略)；候选数低于阈值时抑制策略替换为不抑制
+        """
+        if self.retrieval_sizer is None:
+            return total_retrieval, cluster_count, suppression
+        
+        record_count = self._user_record_count(collection_name, user_id)
+        if record_count == 0:
+            return 0, 0, suppression
+        n_results, cluster_count, skip_clustering = self.retrieval_sizer.plan(
+            f"{collection_name}:{user_id or '*'}",
+            record_count,
+            total_retrieval,
+            cluster_count,
+            suppression.cluster_multiplier
+        )
+        if skip_clustering:
+            suppression = create_suppression_strategy(
+                "none", suppression.cluster_multiplier, suppression.retrieval_multiplier
+            )
+        logger.debug(f"检索规模: {collection_name} 用户={user_id} 记录数={record_count} 检索条数={n_results} 聚类数={cluster_count} 跳过聚类={skip_clustering}")
+        return n_results, cluster_count, suppression
+    
+    def _observe_candidate_distances(self, collection_name: str, user_id: Optional[str], distances: List[Optional[float]]):
+        """记录候选距离分布，供下一次检索规划"""
+        if self.retrieval_sizer is not None:
+            self.retrieval_sizer.observe_distances(f"{collection_name}:{user_id or '*'}", distances)
+    
+    def _bump_write_generation(self, user_ids: Optional[List[Optional[str]]] = None):
+        """
+        递增写代次使检索结果缓存失效
+        
+        Args:
+            user_ids: 发生写入的用户ID；为None时递增全局代次（无法确定归属用户的批量删除）
+        """
+        if self.retrieval_cache is None:
+            return
+        if user_ids is None:
+            self.retrieval_cache.bump_all()
+        else:
+            self.retrieval_cache.bump(user_ids)
+    
+    def get_retrieval_stats(self) -> Dict[str, Dict]:
+        """
+        获取检索侧统计信息
+        
+        Returns:
+            抑制策略配置、质心缓存统计（命中率、节省的迭代次数）、自适应检索规模统计、分级检索命中率、
+            检索结果缓存命中率、消息处理的分阶段耗时、写回队列、Chroma写入合并与访问计数旁路存储统计
+        """
+        return {
+            "suppression": {
+                "long_term": self.long_term_suppression,
+                "short_term": self.short_term_suppression
+            },
+            "centroid_cache": self.centroid_cache.get_stats() if self.centroid_cache is not None else None,
+            "adaptive_sizing": self.retrieval_sizer.get_stats() if self.retrieval_sizer is not None else None,
+            "tiered": self._tiered_stats(),
+            "retrieval_cache": dict(
+                self.retrieval_cache.get_stats(),
+                hit_access_recorded=self._hit_record_counts["recorded"],
+                hit_access_failed=self._hit_record_counts["failed"]
+            ) if self.retrieval_cache is not None else None,
+            "pipeline": dict(self.stage_timings.get_stats(), enabled=self.pipelined_processing),
+            "write_behind": self.write_behind.get_stats() if self.write_behind is not None else None,
+            "chroma_writes": self.chroma_service.get_write_stats(),
+            "access_counters": self.access_counters.get_stats() if self.access_counters is not None else None
+        }
+    
+    def flush_pending_writes(self, timeout: float = None) -> bool:
+        """
+        等待缓存命中的访问记录与写回队列中的写操作全部写入（均未开启时直接返回）
+        
+        Args:
+            timeout: 最长等待秒数，默认一直等待
+        
+        Returns:
+            是否已全部写入
+        """
+        flushed = True
+        if self._hit_recorder is not None:
+            try:
+                # 单线程按提交顺序执行，空任务完成即表示之前提交的访问记录均已写入
+                self._hit_recorder.submit(lambda: None).result(timeout)
+            except FuturesTimeoutError:
+                flushed = False
+        if self.write_behind is not None:
+            flushed = self.write_behind.flush(timeout) and flushed
+        return flushed
+    
+    def close(self):
+        """关闭流水线工作线程（等待进行中的任务完成），写完缓存命中的访问记录与写回队列中的剩余写操作并落盘访问计数"""
+        if self._pipeline_executor is not None:
+            self._pipeline_executor.shutdown(wait=True)
+            self._pipeline_executor = None
+            logger.info("记忆系统流水线工作线程已关闭")
+        if self._hit_recorder is not None:
+            self._hit_recorder.shutdown(wait=True)
+            self._hit_recorder = None
+        if self.write_behind is not None:
+            self.write_behind.close()
+            self.write_behind = None
+        if self.access_counters is not None:
+            self.access_counters.close()
+            self.access_counters = None
+    
+    def _counter_namespace(self, collection_name: str) -> str:
+        """访问计数的命名空间：短期记忆的各纪元集合共用一个（记录迁入新纪元时沿用计数）"""
+        return self.short_term_collection_name if self._is_short_term_collection(collection_name) else collection_name
+    
+    def _overlay_counters(self, collection_name: str, ids: List[str], metadatas: List[Dict]) -> List[Dict]:
+        """以旁路存储中的访问计数覆盖ChromaDB元数据中的计数字段（未开启旁路时原样返回）"""
+        if self.access_counters is None or not ids:
+            return metadatas
+        return self.access_counters.overlay(self._counter_namespace(collection_name), ids, metadatas)
+    
+    def _persist_counters(self,
+                          collection_name: str,
+                          ids: List[str],
+                          metadatas: List[Dict],
+                          previous: Optional[List[Dict]] = None):
+        """
+        保存命中后刷新的访问计数：开启旁路时写入旁路存储，否则整条元数据写回ChromaDB
+        previous 为计算新计数时读到的元数据，旁路落盘时据此合并其他进程的并发访问
+        """
+        if self.access_counters is None:
+            self.chroma_service.update_documents(collection_name, ids=ids, metadatas=metadatas)
+        else:
+            self.access_counters.upsert(
+                self._counter_namespace(collection_name), ids, metadatas,
+                previous=previous, collection_name=collection_name
+            )
+    
+    def _merge_counters(self, namespace: str, current: Dict, base: Dict, latest: Dict) -> Dict:
+        """
+        旁路落盘时合并其他进程的并发访问：本进程在 base 之上累加的访问叠加到当前值上
+        牛顿冷却对访问次数是线性的，两部分分别衰减到同一时刻后相加即为两边访问都计入的结果
+        """
+        cooling_rate = self._collection_cooling_rate(namespace)
+        coefficient = self.newton_helper.calculate_cooling_rate(cooling_rate)
+        current_ts = self._get_timestamp(current)
+        base_ts = self._get_timestamp(base)
+        latest_ts = self._get_timestamp(latest)
+        merged_ts = max(current_ts, latest_ts)
+        
+        increment = float(latest.get("valid_access_count") or 0.0) - self.newton_helper.calculate_newton_cooling_effect(
+            float(base.get("valid_access_count") or 0.0), max(0.0, latest_ts - base_ts), coefficient
+        )
+        valid_count = self.newton_helper.calculate_newton_cooling_effect(
+            float(current.get("valid_access_count") or 0.0), merged_ts - current_ts, coefficient
+        ) + self.newton_helper.calculate_newton_cooling_effect(increment, merged_ts - latest_ts, coefficient)
+        total_count = (float(current.get("total_access_count") or 0.0)
+                       + float(latest.get("total_access_count") or 0.0)
+                       - float(base.get("total_access_count") or 0.0))
+        return {
+            "valid_access_count": valid_count,
+            "total_access_count": total_count,
+            "last_updated": datetime.fromtimestamp(merged_ts).isoformat(),
+            "last_updated_ts": merged_ts,
+            "expires_at": self._calculate_expires_at(valid_count, merged_ts, cooling_rate)
+        }
+    
+    def _write_back_expiry(self, collection_name: str, ids: List[str], expires_at: List[float]):
+        """
+        把旁路落盘的遗忘时刻回写ChromaDB（只更新 expires_at 字段），
+        使按 expires_at 的范围查询（清理、过期索引同步、纪元轮换）不再取到被访问续命的记录
+        """
+        self.chroma_service.update_documents(
+            collection_name, ids=ids, metadatas=[{"expires_at": value} for value in expires_at]
+        )
+    
+    def _expiry_cutoff(self, now_ts: float) -> float:
+        """
+        判定过期的时间点：开启旁路时其他进程的访问最迟在一个可见延迟内落盘，
+        只删除遗忘时刻早于 now 减去该延迟的记录，不会误删刚被其他进程访问、计数尚未落盘的记录
+        """
+        if self.access_counters is None:
+            return now_ts
+        return now_ts - self.access_counters.visibility_lag_seconds
+    
+    def _forget_counters(self, collection_name: str, ids: List[str]):
+        """删除记录时同步删除旁路中的访问计数"""
+        if self.access_counters is not None and ids:
+            self.access_counters.delete(self._counter_namespace(collection_name), ids)
     
     def _initialize_collections(self):
         """初始化长短期记忆集合"""
@@ -124,12 +595,378 @@ class LongShortTermMemorySystem:
     
     
     
+    def _current_epoch(self) -> int:
+        """当前短期记忆纪元编号"""
+        return int(datetime.now().timestamp() // self.short_term_epoch_seconds)
+    
+    def _epoch_collection_name(self, epoch: int) -> str:
+        """纪元对应的短期记忆集合名称"""
+        return f"{self.short_term_collection_name}_e{epoch}"
+    
+    def _ensure_epoch_collection(self, epoch: int) -> str:
+        """确保纪元集合存在并返回其名称（已确认过的纪元不再访问ChromaDB）"""
+        name = self._epoch_collection_name(epoch)
+        if epoch not in self._ensured_epochs:
+            self.chroma_service.get_or_create_collection(name)
+            self._ensured_epochs.add(epoch)
+        return name
+    
+    def _short_term_write_collection(self) -> str:
+        """短期记忆写入集合：纪元模式下为当前纪元集合"""
+        if not self.short_term_epochs:
+            return self.short_term_collection_name
+        return self._ensure_epoch_collection(self._current_epoch())
+    
+    def _short_term_previous_collection(self) -> Optional[str]:
+        """上一纪元的短期记忆集合，非纪元模式返回None"""
+        if not self.short_term_epochs:
+            return None
+        return self._ensure_epoch_collection(self._current_epoch() - 1)
+    
+    def _short_term_read_collections(self) -> List[str]:
+        """短期记忆读取集合：纪元模式下为当前与上一纪元（当前在前）"""
+        if not self.short_term_epochs:
+            return [self.short_term_collection_name]
+        return [self._short_term_write_collection(), self._short_term_previous_collection()]
+    
+    def _is_short_term_collection(self, collection_name: str) -> bool:
+        """是否为短期记忆集合（含纪元集合）"""
+        return (collection_name == self.short_term_collection_name
+                or collection_name.startswith(f"{self.short_term_collection_name}_e"))
+    
+    def _list_epoch_collections(self) -> Dict[int, str]:
+        """列出已存在的短期记忆纪元集合 {纪元编号: 集合名称}"""
+        prefix = f"{self.short_term_collection_name}_e"
+        epochs = {}
+        for collection in self.chroma_service.list_collections():
+            # 新版ChromaDB返回名称，旧版返回集合对象
+            name = getattr(collection, "name", collection)
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                epochs[int(name[len(prefix):])] = name
+        return epochs
+    
+    def get_short_term_collections(self) -> List[str]:
+        """所有短期记忆集合（基础集合及现存的纪元集合）"""
+        if not self.short_term_epochs:
+            return [self.short_term_collection_name]
+        return [self.short_term_collection_name] + [
+            name for _, name in sorted(self._list_epoch_collections().items())
+        ]
+    
+    def _query_short_term(self, n_results: int, **query_kwargs) -> Dict:
+        """
+        在短期记忆读取集合上做向量检索
+        纪元模式下分别检索当前与上一纪元，按doc_id去重（保留当前纪元的版本）后按距离合并取前n_results条
+        """
+        collections = self._short_term_read_collections()
+        if len(collections) == 1:
+            return self.chroma_service.query_documents(collections[0], n_results=n_results, **query_kwargs)
+        
+        keys = ("ids", "documents", "metadatas", "distances", "embeddings")
+        merged = []
+        seen = set()
+        for collection_name in collections:
+            results = self.chroma_service.query_documents(collection_name, n_results=n_results, **query_kwargs)
+            if not results or "error" in results or not results.get("ids"):
+                continue
+            columns = {
+                key: (results[key][0] if results.get(key) is not None and len(results[key]) > 0 else None)
+                for key in keys
+            }
+            for i, doc_id in enumerate(columns["ids"]):
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                merged.append({
+                    key: (columns[key][i] if columns[key] is not None and i < len(columns[key]) else None)
+                    for key in keys
+                })
+        
+        merged.sort(key=lambda row: row["distances"] if row["distances"] is not None else float("inf"))
+        merged = merged[:n_results]
+        return {key: [[row[key] for row in merged]] for key in keys}
+    
+    def rotate_short_term_epochs(self) -> Dict[str, Any]:
+        """
+        短期记忆纪元轮换：删除早于上一纪元的集合
+        删除前把其中尚未到期（expires_at >= now）的记录转入当前纪元，代价只与存活记录数成正比
+        
+        Returns:
+            轮换统计：删除的集合与转入当前纪元的记录数
+        """
+        if not self.short_term_epochs:
+            return {"dropped": [], "carried": 0}
+        
+        try:
+            current = self._current_epoch()
+            write_collection = self._short_term_write_collection()
+            dropped = []
+            carried = 0
+            
+            for epoch, name in sorted(self._list_epoch_collections().items()):
+                if epoch >= current - 1:
+                    continue
+                
+                now_ts = self._expiry_cutoff(datetime.now().timestamp())
+                survivors = self.chroma_service.get_documents(
+                    name,
+                    where={"expires_at": {"$gte": now_ts}},
+                    include=["documents", "metadatas", "embeddings"]
+                )
+                survivors = self._with_counter_survivors(name, survivors, now_ts)
+                survivor_ids = survivors.get("ids", []) if survivors else []
+                if survivor_ids:
+                    present = self.chroma_service.get_documents(write_collection, ids=survivor_ids, include=[])
+                    present_ids = set(present.get("ids", []) if present else [])
+                    keep = [i for i, doc_id in enumerate(survivor_ids) if doc_id not in present_ids]
+                    if keep:
+                        embeddings = survivors.get("embeddings")
+                        self.chroma_service.add_documents(
+                            write_collection,
+                            documents=[survivors["documents"][i] for i in keep],
+                            embeddings=[list(embeddings[i]) for i in keep] if embeddings is not None else None,
+                            metadatas=[survivors["metadatas"][i] for i in keep],
+                            ids=[survivor_ids[i] for i in keep]
+                        )
+                        carried += len(keep)
+                
+                self.chroma_service.delete_collection(name)
+                self._ensured_epochs.discard(epoch)
+                dropped.append(name)
+            
+            if dropped:
+                if self.access_counters is not None:
+                    # 未转入当前纪元的记录均已过期，其计数随之清除
+                    self.access_counters.purge_expired(
+                        self.short_term_collection_name, self._expiry_cutoff(datetime.now().timestamp())
+                    )
+                self._bump_write_generation()
+                logger.info(f"短期记忆纪元轮换: 删除集合 {dropped}，转入当前纪元 {carried} 条存活记录")
+            return {"dropped": dropped, "carried": carried}
+            
+        except Exception as e:
+            logger.error(f"短期记忆纪元轮换失败: {e}")
+            raise
+    
+    def _with_counter_survivors(self, collection_name: str, survivors: Optional[Dict], now_ts: float) -> Optional[Dict]:
+        """
+        纪元轮换时补上ChromaDB中 expires_at 已过时、但旁路计数显示仍存活的记录，并以旁路计数覆盖元数据
+        旁路落盘后会回写 expires_at，这里只需找回尚未回写成功的记录
+        """
+        if self.access_counters is None:
+            return survivors
+        survivors = survivors or {}
+        ids = list(survivors.get("ids", []))
+        documents = list(survivors.get("documents") or [])
+        metadatas = list(survivors.get("metadatas") or [])
+        embeddings = survivors.get("embeddings")
+        embeddings = [] if embeddings is None else list(embeddings)
+        
+        known = set(ids)
+        revived = [doc_id for doc_id in self.access_counters.live_ids(self._counter_namespace(collection_name), now_ts)
+                   if doc_id not in known]
+        if revived:
+            extra = self.chroma_service.get_documents(
+                collection_name, ids=revived, include=["documents", "metadatas", "embeddings"]
+            )
+            if extra and extra.get("ids"):
+                ids += extra["ids"]
+                documents += extra.get("documents") or []
+                metadatas += extra.get("metadatas") or []
+                extra_embeddings = extra.get("embeddings")
+                embeddings += [] if extra_embeddings is None else list(extra_embeddings)
+        
+        metadatas = self._overlay_counters(collection_name, ids, metadatas)
+        return {"ids": ids, "documents": documents, "metadatas": metadatas, "embeddings": embeddings}
+    
+    def reset_short_term_memory(self) -> int:
+        """
+        清空短期记忆（纪元模式下删除全部纪元集合）
+        
+        Returns:
+            删除的记录数
+        """
+        deleted = len(self.chroma_service.delete_documents(self.short_term_collection_name))
+        if self.short_term_epochs:
+            for epoch, name in self._list_epoch_collections().items():
+                deleted += self.chroma_service.count_documents(name)
+                self.chroma_service.delete_collection(name)
+                self._ensured_epochs.discard(epoch)
+        if self.expiry_index is not None:
+            self.expiry_index.clear(self.short_term_collection_name)
+        if self.access_counters is not None:
+            self.access_counters.clear(self.short_term_collection_name)
+        self._bump_write_generation()
+        return deleted
+    
+    def snapshot_short_term_memory(self, path: str, batch_size: int = 1000) -> int:
+        """
+        将短期记忆快照保存为npz文件（优雅关闭时调用）
+        向量存为 float32 矩阵，ID/文档/元数据存为JSON；访问次数按快照时刻衰减后写入，
+        last_updated 统一记为快照时刻，恢复时只需按停机时长整体再衰减一次
+        
+        Args:
+            path: 快照文件路径
+            batch_size: 每批读取的记录数
+        
+        Returns:
+            写入快照的记录数
+        """
+        self.flush_pending_writes()
+        try:
+            ids, documents, metadatas, embeddings = [], [], [], []
+            seen = set()
+            for collection_name in self.get_short_term_collections():
+                offset = 0
+                while True:
+                    page = self.chroma_service.get_documents(
+                        collection_name,
+                        limit=batch_size,
+                        offset=offset,
+                        include=["documents", "metadatas", "embeddings"]
+                    )
+                    page_ids = page.get("ids", []) if page else []
+                    if not page_ids:
+                        break
+                    page_embeddings = page.get("embeddings")
+                    for i, doc_id in enumerate(page_ids):
+                        if doc_id in seen or page_embeddings is None:
+                            continue
+                        seen.add(doc_id)
+                        ids.append(doc_id)
+                        documents.append(page["documents"][i])
+                        metadatas.append(page["metadatas"][i])
+                        embeddings.append(page_embeddings[i])
+                    if len(page_ids) < batch_size:
+                        break
+                    offset += batch_size
+            
+            saved_at = datetime.now().timestamp()
+            metadatas = self._overlay_counters(self.short_term_collection_name, ids, metadatas)
+            if ids:
+                decayed, expired = self.newton_helper.calculate_decay_array(
+                    [metadata.get("valid_access_count", 1.0) for metadata in metadatas],
+                    self.newton_helper.to_epoch_seconds(self._timestamp_value(metadata) for metadata in metadatas),
+                    current_time=saved_at,
+                    cooling_rate=CoolingRate.MINUTES_20,
+                    threshold=self.short_term_threshold
+                )
+                keep = np.flatnonzero(~expired)
+                for i in keep:
+                    metadatas[i] = dict(metadatas[i], valid_access_count=float(decayed[i]), last_updated_ts=saved_at)
+                ids = [ids[i] for i in keep]
+                documents = [documents[i] for i in keep]
+                metadatas = [metadatas[i] for i in keep]
+                embedding_matrix = np.asarray([embeddings[i] for i in keep], dtype=np.float32)
+            else:
+                embedding_matrix = np.zeros((0, 0), dtype=np.float32)
+            
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    embeddings=embedding_matrix,
+                    records=np.array(json.dumps({
+                        "saved_at": saved_at,
+                        "ids": ids,
+                        "documents": documents,
+                        "metadatas": metadatas
+                    }, ensure_ascii=False))
+                )
+            os.replace(tmp_path, path)
+            
+            logger.info(f"短期记忆快照已保存: {len(ids)} 条记录 -> {path}")
+            return len(ids)
+            
+        except Exception as e:
+            logger.error(f"保存短期记忆快照失败: {e}")
+            raise
+    
+    def restore_short_term_memory(self, path: str, batch_size: int = 500) -> Dict[str, int]:
+        """
+        从快照恢复短期记忆（启动时调用，代替清空短期记忆库）
+        按停机时长对全部记录做一次向量化衰减，丢弃已过期的记录，其余写回当前短期集合；
+        恢复成功后删除快照文件，避免之后的非正常重启恢复出过时的数据
+        
+        Args:
+            path: 快照文件路径
+            batch_size: 每批写入的记录数
+        
+        Returns:
+            恢复统计：快照记录数、恢复数与丢弃数
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                embedding_matrix = data["embeddings"]
+                snapshot = json.loads(str(data["records"]))
+            
+            ids = snapshot["ids"]
+            stats = {"total": len(ids), "restored": 0, "expired": 0}
+            if not ids:
+                os.remove(path)
+                return stats
+            
+            metadatas = snapshot["metadatas"]
+            now = datetime.now()
+            decayed, expired = self.newton_helper.calculate_decay_array(
+                [metadata.get("valid_access_count", 1.0) for metadata in metadatas],
+                np.full(len(ids), float(snapshot["saved_at"])),
+                current_time=now.timestamp(),
+                cooling_rate=CoolingRate.MINUTES_20,
+                threshold=self.short_term_threshold
+            )
+            keep = np.flatnonzero(~expired)
+            stats["expired"] = len(ids) - len(keep)
+            
+            restored_ids = [ids[i] for i in keep]
+            restored_documents = [snapshot["documents"][i] for i in keep]
+            restored_metadatas = []
+            for i in keep:
+                valid_count = float(decayed[i])
+                restored_metadatas.append(dict(
+                    metadatas[i],
+                    valid_access_count=valid_count,
+                    last_updated=now.isoformat(),
+                    last_updated_ts=now.timestamp(),
+                    expires_at=self._calculate_expires_at(valid_count, now.timestamp(), CoolingRate.MINUTES_20)
+                ))
+            restored_embeddings = embedding_matrix[keep]
+            
+            write_collection = self._short_term_write_collection()
+            for start in range(0, len(restored_ids), batch_size):
+                end = start + batch_size
+                self.chroma_service.add_documents(
+                    write_collection,
+                    documents=restored_documents[start:end],
+                    embeddings=restored_embeddings[start:end].tolist(),
+                    metadatas=restored_metadatas[start:end],
+                    ids=restored_ids[start:end]
+                )
+                self._track_expiry(write_collection, restored_ids[start:end], restored_metadatas[start:end])
+            stats["restored"] = len(restored_ids)
+            self._bump_write_generation()
+            
+            os.remove(path)
+            logger.info(f"短期记忆快照恢复完成: {stats}")
+            return stats
+            
+        except Exception as e:
+            logger.error(f"恢复短期记忆快照失败: {e}")
+            raise
+    
     def _generate_md5(self, content: str, user_id: str  ) -> str:
         """生成多租户隔离的MD5"""
         uid = (user_id or "").strip()
         key = f"{uid}::{content}"
         return hashlib.md5(key.encode('utf-8')).hexdigest()
     
+    @staticmethod
+    def _user_bucket(user_id: str) -> int:
+        """计算用户所属的分桶编号（稳定哈希，跨进程一致）"""
+        uid = (user_id or "").strip()
+        return int(hashlib.md5(uid.encode('utf-8')).hexdigest()[:8], 16) % USER_BUCKET_COUNT
+    
     def _validate_user_access(self, record_user_id: str, requesting_user_id: str, operation: str) -> bool:
         """
         验证用户访问权限
@@ -153,13 +990,13 @@ class LongShortTermMemorySystem:
     def _generate_summary(self, content: str) -> str:
         """
         生成内容摘要
-        优先使用LLM生成摘要，失败时降级到简单截断
+        按配置的主引擎生成摘要：LLM失败时降级到抽取式摘要，再失败时简单截断
         """
         if len(content) <= self.summary_threshold:
             return content
         
         # 如果有摘要服务，尝试使用LLM生成摘要
-        if self.summary_service:
+        if self.summary_engine == "llm" and self.summary_service:
             try:
                 summary = self.summary_service.generate_summary(content, self.summary_threshold)
                 if summary and len(summary) <= self.summary_threshold:
@@ -170,6 +1007,15 @@ class LongShortTermMemorySystem:
             except Exception as e:
                 logger.warning(f"LLM摘要生成失败，使用降级方案: {e}")
         
+        # 本地抽取式摘要（主引擎或降级方案）
+        if self.extractive_summary_service:
+            try:
+                summary = self.extractive_summary_service.generate_summary(content, self.summary_threshold)
+                if summary and len(summary) <= self.summary_threshold:
+                    return summary
+            except Exception as e:
+                logger.warning(f"抽取式摘要生成失败，使用简单截断: {e}")
+        
         # 降级方案：简单截断
         logger.warning("使用降级摘要方案：简单截断")
         summary = content[:self.summary_threshold]
@@ -178,15 +1024,79 @@ class LongShortTermMemorySystem:
         
         return summary
     
+    def _generate_local_summary(self, content: str) -> str:
+        """
+        生成本地摘要（不调用LLM，用于分块入库时的父记录）
+        """
+        if len(content) <= self.summary_threshold:
+            return content
+        
+        if self.extractive_summary_service:
+            try:
+                summary = self.extractive_summary_service.generate_summary(content, self.summary_threshold)
+                if summary:
+                    return summary
+            except Exception as e:
+                logger.warning(f"抽取式摘要生成失败，使用简单截断: {e}")
+        
+        return content[:self.summary_threshold]
+    
+    def _prepare_chunk_data(self,
+                            content: str,
+                            document_text: str,
+                            doc_id: str,
+                            metadata: Dict) -> Tuple[List[float], List[Tuple[str, str, Dict, List[float]]]]:
+        """
+        将超长内容切分为重叠分块，并与父记录摘要一起批量生成embedding
+        
+        Args:
+            content: 原始内容
+            document_text: 父记录的摘要文本
+            doc_id: 父记录ID
+            metadata: 父记录元数据（会写入chunk_count）
+        
+        Returns:
+            (父记录embedding, 分块记录列表[(chunk_text, chunk_id, chunk_metadata, chunk_embedding)])
+        """
+        chunks = split_into_chunks(content, self.chunk_size, self.chunk_overlap)
+        
+        # 父记录摘要与全部分块一次性批量编码
+        embeddings = self.embedding_service.encode_texts([document_text] + chunks)
+        parent_embedding = embeddings[0]
+        
+        metadata["chunk_count"] = len(chunks)
+        chunk_records = []
+        for i, (chunk_text, chunk_embedding) in enumerate(zip(chunks, embeddings[1:])):
+            chunk_metadata = {
+                "content": chunk_text,
+                "valid_access_count": metadata["valid_access_count"],
+                "last_updated": metadata["last_updated"],
+                "created_at": metadata["created_at"],
+                "last_updated_ts": metadata["last_updated_ts"],
+                "created_at_ts": metadata["created_at_ts"],
+                "total_access_count": metadata["total_access_count"],
+                "source_type": metadata["source_type"],
+                "user_id": metadata["user_id"],
+                "user_bucket": metadata["user_bucket"],
+                "parent_id": doc_id,
+                "chunk_index": i,
+                "chunk_count": len(chunks)
+            }
+            chunk_records.append((chunk_text, f"{doc_id}_chunk_{i}", chunk_metadata, chunk_embedding))
+        
+        logger.info(f"超长内容分块入库: {len(content)} 字符 -> {len(chunks)} 块")
+        return parent_embedding, chunk_records
+    
     def _prepare_document_data(self, 
                               content: str, 
                               source_type: SourceType, 
-                              user_id: str) -> Tuple[str, str, Dict, List[float]]:
+                              user_id: str) -> Tuple[str, str, Dict, List[float], List[Tuple]]:
         """
         准备文档数据 - 优化版本
         
         Returns:
-            (document_text, doc_id, metadata, embedding)
+            (document_text, doc_id, metadata, embedding, chunk_records)
+            chunk_records 仅在分块模式下处理超长内容时非空
         """
         logger.info(f"[调试] _prepare_document_data开始: content={content[:50]}...")
         
@@ -224,11 +1134,39 @@ class LongShortTermMemorySystem:
             logger.info(f"[调试] _prepare_document_data: embedding类型={type(embedding)}")
             
             logger.debug(f"文档 {doc_id} 已存在，跳过重复处理")
-            return document_text, doc_id, metadata, embedding
+            return document_text, doc_id, metadata, embedding, []
         
         logger.info("[调试] _prepare_document_data: 文档不存在，生成新数据")
-        # 决定用于embedding的文本
-        document_text = self._generate_summary(content)
+        # 准备元数据
+        now = datetime.now()
+        current_time = now.isoformat()
+        current_ts = now.timestamp()
+        metadata = {
+            "content": content,
+            "valid_access_count": 1.0,
+            "last_updated": current_time,
+            "created_at": current_time,
+            "last_updated_ts": current_ts,
+            "created_at_ts": current_ts,
+            "expires_at": self._calculate_expires_at(1.0, current_ts, CoolingRate.DAYS_31),
+            "total_access_count": 1,
+            "source_type": source_type.value,
+            "user_id": user_id,
+            "user_bucket": self._user_bucket(user_id)
+        }
+        
+        # 分块模式：超长内容切块入库，父记录使用本地摘要，LLM不进入写入路径
+        if self.chunk_long_content and len(content) > self.summary_threshold:
+            document_text = self._generate_local_summary(content)
+            try:
+                embedding, chunk_records = self._prepare_chunk_data(content, document_text, doc_id, metadata)
+                return document_text, doc_id, metadata, embedding, chunk_records
+            except Exception as e:
+                logger.error(f"分块入库准备失败，退回摘要模式: {e}")
+                metadata.pop("chunk_count", None)
+        else:
+            # 决定用于embedding的文本
+            document_text = self._generate_summary(content)
         logger.info(f"[调试] _prepare_document_data: document_text={document_text[:50]}...")
         
         # 生成embedding并保存，避免重复计算
@@ -240,19 +1178,73 @@ class LongShortTermMemorySystem:
             logger.error(f"生成embedding失败: {e}")
             embedding = []
         
-        # 准备元数据
-        current_time = datetime.now().isoformat()
-        metadata = {
-            "content": content,
-            "valid_access_count": 1.0,
-            "last_updated": current_time,
-            "created_at": current_time,
-            "total_access_count": 1,
-            "source_type": source_type.value,
-            "user_id": user_id
-        }
-        
-        return document_text, doc_id, metadata, embedding
+        return document_text, doc_id, metadata, embedding, []
+    
+    @staticmethod
+    def _timestamp_value(metadata: Dict, field: str = "last_updated"):
+        """
+        读取时间字段的原始值：优先数值时间戳字段（{field}_ts），缺失时回退到ISO字符串
+        """
+        value = metadata.get(f"{field}_ts")
+        return value if value is not None else metadata.get(field)
+    
+    def _get_timestamp(self, metadata: Dict, field: str = "last_updated") -> float:
+        """
+        获取时间字段的epoch秒数，缺失或无法解析时返回0.0
+        """
+        value = self._timestamp_value(metadata, field)
+        if isinstance(value, (int, float)):
+            return float(value)
+        ts = self.newton_helper.to_epoch_seconds([value])[0]
+        return 0.0 if np.isnan(ts) else float(ts)
+    
+    def _collection_cooling_rate(self, collection_name: str) -> CoolingRate:
+        """
+        获取集合对应的遗忘速率
+        """
+        if self._is_short_term_collection(collection_name):
+            return CoolingRate.MINUTES_20
+        return CoolingRate.DAYS_31
+    
+    def _calculate_expires_at(self, valid_access_count: float, last_updated_ts: float, cooling_rate: CoolingRate) -> float:
+        """
+        计算记录的遗忘时刻（epoch秒），阈值取该遗忘速率对应的科学阈值
+        """
+        return self.newton_helper.calculate_expiry_time(
+            float(valid_access_count),
+            last_updated_ts,
+            cooling_rate,
+            self.newton_helper.get_threshold(cooling_rate)
+        )
+    
+    def _track_expiry(self, collection_name: str, ids: List[str], metadatas: List[Dict]) -> int:
+        """
+        将短期记忆记录的遗忘时刻登记到过期索引（未开启索引或非短期集合时忽略），返回新登记或刷新的记录数
+        """
+        if self.expiry_index is None or collection_name != self.short_term_collection_name:
+            return 0
+        return self.expiry_index.push_many(collection_name, [
+            (doc_id, metadata["expires_at"])
+            for doc_id, metadata in zip(ids, metadatas)
+            if metadata and isinstance(metadata.get("expires_at"), (int, float))
+        ])
+    
+    def _record_inserts(self, collection_name: str, count: int, metadatas: Optional[List[Dict]] = None):
+        """
+        写入记录后累加缓存的用户记录数（提供元数据时）
+        """
+        if self.retrieval_sizer is not None and metadatas:
+            for user_id, user_count in Counter(m.get("user_id") for m in metadatas if m).items():
+                if user_id:
+                    self.retrieval_sizer.increment(f"{collection_name}:{user_id}", user_count)
+    
+    def _untrack_expiry(self, collection_name: str, ids: List[str]):
+        """
+        从过期索引移除已删除的记录
+        """
+        if self.expiry_index is None or not ids:
+            return
+        self.expiry_index.discard(collection_name, ids)
     
     def _calculate_decayed_valid_count(self, 
                                      record: Dict, 
@@ -268,14 +1260,12 @@ class LongShortTermMemorySystem:
             衰减后的有效访问次数
         """
         try:
-            last_updated = record.get("last_updated")
-            if not last_updated:
+            last_updated_ts = self._get_timestamp(record, "last_updated")
+            if not last_updated_ts:
                 return record.get("valid_access_count", 1.0)
             
             # 计算时间差
-            time_diff = self.newton_helper.calculate_time_difference(
-                last_updated, datetime.now()
-            )
+            time_diff = datetime.now().timestamp() - last_updated_ts
             
             # 计算冷却系数
             cooling_coefficient = self.newton_helper.calculate_cooling_rate(cooling_rate)
@@ -296,7 +1286,8 @@ class LongShortTermMemorySystem:
                                   collection_name: str, 
                                   doc_id: str, 
                                   cooling_rate: CoolingRate,
-                                  user_id: str) -> bool:
+                                  user_id: str,
+                                  bump_generation: bool = True) -> bool:
         """
         更新记录的访问次数
         
@@ -305,6 +1296,7 @@ class LongShortTermMemorySystem:
             doc_id: 文档ID
             cooling_rate: 遗忘速率
             user_id: 用户ID（用于安全检查）
+            bump_generation: 是否递增写代次（检索链路在本轮写入完成后统一递增一次时传False）
         
         Returns:
             是否更新成功
@@ -316,7 +1308,7 @@ class LongShortTermMemorySystem:
                 logger.warning(f"记录不存在: {doc_id}")
                 return False
             
-            metadata = result["metadatas"][0]
+            metadata = self._overlay_counters(collection_name, [doc_id], result["metadatas"][:1])[0]
             
             # 🔒 安全检查：确保只能更新自己的记录
             record_user_id = metadata.get("user_id")
@@ -331,16 +1323,22 @@ class LongShortTermMemorySystem:
             
             # 更新元数据
             updated_metadata = metadata.copy()
+            now = datetime.now()
             updated_metadata["valid_access_count"] = new_valid_count
-            updated_metadata["last_updated"] = datetime.now().isoformat()
+            updated_metadata["last_updated"] = now.isoformat()
+            updated_metadata["last_updated_ts"] = now.timestamp()
+            updated_metadata["expires_at"] = self._calculate_expires_at(new_valid_count, now.timestamp(), cooling_rate)
             updated_metadata["total_access_count"] = metadata.get("total_access_count", 0) + 1
+            if "created_at_ts" not in updated_metadata:
+                updated_metadata["created_at_ts"] = self._get_timestamp(metadata, "created_at")
+            if "user_bucket" not in updated_metadata:
+                updated_metadata["user_bucket"] = self._user_bucket(record_user_id)
             
-            # 更新记录
-            self.chroma_service.update_documents(
-                collection_name,
-                ids=[doc_id],
-                metadatas=[updated_metadata]
-            )
+            # 更新记录（开启旁路时只写访问计数）
+            self._persist_counters(collection_name, [doc_id], [updated_metadata], previous=[metadata])
+            self._track_expiry(collection_name, [doc_id], [updated_metadata])
+            if bump_generation:
+                self._bump_write_generation([record_user_id])
             
             logger.debug(f"更新记录访问次数成功: {doc_id}, 新值: {new_valid_count}")
             return True
@@ -353,7 +1351,8 @@ class LongShortTermMemorySystem:
                                content: str, 
                                source_type: SourceType, 
                                user_id: str,
-                               prepared_data: Tuple[str, str, Dict, List[float]] = None) -> str:
+                               prepared_data: Tuple[str, str, Dict, List[float], List[Tuple]] = None,
+                               bump_generation: bool = True) -> str:
         """
         添加内容到长期记忆库
         
@@ -361,18 +1360,20 @@ class LongShortTermMemorySystem:
             content: 内容
             source_type: 来源类型
             user_id: 用户ID
-            prepared_data: _prepare_document_data准备好的完整数据 (document_text, doc_id, metadata, embedding)
+            prepared_data: _prepare_document_data准备好的完整数据 (document_text, doc_id, metadata, embedding, chunk_records)
+            bump_generation: 是否递增写代次（检索链路在本轮写入完成后统一递增一次时传False）
         
         Returns:
-            文档ID
+            文档ID（分块模式下为父记录ID）
         """
         try:
             if prepared_data is not None:
                 # 使用_prepare_document_data准备好的完整数据，避免重复计算
-                document_text, doc_id, metadata, embedding = prepared_data
+                document_text, doc_id, metadata, embedding = prepared_data[:4]
+                chunk_records = prepared_data[4] if len(prepared_data) > 4 else []
             else:
                 # 降级：重新调用_prepare_document_data
-                document_text, doc_id, metadata, embedding = self._prepare_document_data(
+                document_text, doc_id, metadata, embedding, chunk_records = self._prepare_document_data(
                     content, source_type, user_id
                 )
             
@@ -385,7 +1386,8 @@ class LongShortTermMemorySystem:
                 # 记录已存在，更新访问次数
                 logger.info(f"长期记忆记录已存在，更新访问次数: {doc_id}")
                 self._update_record_access_count(
-                    self.long_term_collection_name, doc_id, CoolingRate.DAYS_31, user_id
+                    self.long_term_collection_name, doc_id, CoolingRate.DAYS_31, user_id,
+                    bump_generation=bump_generation
                 )
             else:
                 # 新增记录，使用预计算的embedding
@@ -406,14 +1408,30 @@ class LongShortTermMemorySystem:
                 else:
                     embeddings_param = None
                 
+                documents = [document_text]
+                metadatas = [metadata]
+                ids = [doc_id]
+                
+                # 分块记录与父记录一起批量写入
+                if chunk_records and embeddings_param is not None:
+                    for chunk_text, chunk_id, chunk_metadata, chunk_embedding in chunk_records:
+                        documents.append(chunk_text)
+                        embeddings_param.append(chunk_embedding)
+                        metadatas.append(chunk_metadata)
+                        ids.append(chunk_id)
+                    logger.info(f"长期记忆记录 {doc_id} 附带 {len(chunk_records)} 个分块")
+                
                 self.chroma_service.add_documents(
                     self.long_term_collection_name,
-                    documents=[document_text],
+                    documents=documents,
                     embeddings=embeddings_param,
-                    metadatas=[metadata],
-                    ids=[doc_id]
+                    metadatas=metadatas,
+                    ids=ids
                 )
+                self._record_inserts(self.long_term_collection_name, len(ids), metadatas)
             
+            if bump_generation:
+                self._bump_write_generation([user_id])
             return doc_id
             
         except Exception as e:
@@ -437,7 +1455,7 @@ class LongShortTermMemorySystem:
                 logger.warning(f"记录不存在: {doc_id} in {collection_name}")
                 return None
             
-            metadata = result["metadatas"][0]
+            metadata = self._overlay_counters(collection_name, [doc_id], result["metadatas"][:1])[0]
             document = result["documents"][0] if result.get("documents") else ""
             embedding = result["embeddings"][0] if result.get("embeddings") else None
             
@@ -447,6 +1465,7 @@ class LongShortTermMemorySystem:
                 "summary_document": document,
                 "valid_access_count": metadata.get("valid_access_count", 1.0),
                 "last_updated": metadata.get("last_updated", ""),
+                "last_updated_ts": self._get_timestamp(metadata, "last_updated"),
                 "source_type": metadata.get("source_type", ""),
                 "user_id": metadata.get("user_id", ""),
                 "embedding": embedding
@@ -458,25 +1477,138 @@ class LongShortTermMemorySystem:
             logger.error(f"从集合获取记录失败: {e}")
             return None
         
-    def retrieve_from_long_term_memory(self, 
-                                    query: str, 
-                                    user_id: str = None,
-                                    include: Optional[List[str]] = None,
-                                    query_embedding: List[float] = None) -> List[Dict]:
+    def _candidates_from_results(self,
+                                 results: Dict,
+                                 cooling_rate: Optional[CoolingRate] = None,
+                                 collection_name: Optional[str] = None) -> CandidateSet:
         """
-        从长期记忆库检索相关记录（使用聚类抑制机制）
+        将ChromaDB查询结果（取第一条查询）转换为列式候选集合
         
         Args:
-            query: 查询内容
-            user_id: 用户ID（可选过滤）
-            include: 需要返回的数据类型列表，可选值：
-                - "documents": 文档内容（摘要）
-                - "metadatas": 元数据
-                - "distances": 距离值
-                - "embeddings": 向量嵌入
-                默认返回 ["documents", "metadatas", "distances", "embeddings"]
+            results: query_documents 的返回值
+            cooling_rate: 提供时 valid_counts 取按该遗忘速率衰减后的值，否则取元数据原值
+            collection_name: 提供时以旁路存储中的访问计数覆盖元数据
+        """
+        metadatas_list = results.get("metadatas", [[]])[0] if results.get("metadatas") else []
+        ids_list = results.get("ids", [[]])[0] if results.get("ids") else []
+        documents_list = results.get("documents", [[]])[0] if results.get("documents") else []
+        distances_list = results.get("distances", [[]])[0] if results.get("distances") else []
+        embeddings_list = results.get("embeddings", [[]])[0] if results.get("embeddings") is not None and len(results.get("embeddings")) > 0 else None
         
-        Returns:
+        ids = [ids_list[i] if i < len(ids_list) else f"unknown_{i}" for i in range(len(metadatas_list))]
+        if collection_name is not None:
+            metadatas_list = self._overlay_counters(collection_name, ids, metadatas_list)
+        timestamps = self.newton_helper.to_epoch_seconds(
+            self._timestamp_value(metadata) for metadata in metadatas_list
+        )
+        valid_counts = None
+        if cooling_rate is not None:
+            # 一次向量化计算全部候选的衰减值
+            valid_counts, _ = self.newton_helper.calculate_decay_array(
+                [metadata.get("valid_access_count", 1.0) for metadata in metadatas_list],
+                timestamps,
+                cooling_rate=cooling_rate
+            )
+        
+        return CandidateSet.from_columns(
+            ids, distances_list, metadatas_list, documents_list, embeddings_list,
+            valid_counts=valid_counts, timestamps=timestamps
+        )
+    
+    def _collapse_chunk_hits(self, collection_name: str, candidates: CandidateSet) -> CandidateSet:
+        """
+        将命中的分块折叠回父记录
+        父记录的distance取其自身与所有命中分块中的最小值，保持原有命中顺序并按doc_id去重
+        
+        Args:
+            collection_name: 集合名称
+            candidates: 检索得到的候选集合（可能包含分块记录）
+        
+        Returns:
+            只包含父记录/普通记录的候选集合
+        """
+        parent_of = [(metadata or {}).get("parent_id") for metadata in candidates.metadatas]
+        best_chunk_distance = {}
+        for i, parent_id in enumerate(parent_of):
+            if parent_id:
+                distance = candidates.distances[i]
+                distance = 0.0 if np.isnan(distance) else float(distance)
+                best_chunk_distance[parent_id] = min(distance, best_chunk_distance.get(parent_id, float("inf")))
+        
+        if not best_chunk_distance:
+            return candidates
+        
+        # 批量获取未直接命中的父记录
+        present_ids = {doc_id for doc_id, parent_id in zip(candidates.ids, parent_of) if not parent_id}
+        missing_ids = [pid for pid in best_chunk_distance if pid not in present_ids]
+        parent_ids = []
+        combined = candidates
+        if missing_ids:
+            result = self.chroma_service.get_documents(
+                collection_name,
+                ids=missing_ids,
+                include=["documents", "metadatas", "embeddings"]
+            )
+            ids_list = result.get("ids", []) if result else []
+            metadatas_list = (result.get("metadatas") or []) if result else []
+            parents = CandidateSet.from_columns(
+                ids_list,
+                [best_chunk_distance[parent_id] for parent_id in ids_list],
+                metadatas_list,
+                (result.get("documents") or []) if result else [],
+                result.get("embeddings") if result and candidates.embeddings is not None else None,
+                timestamps=self.newton_helper.to_epoch_seconds(
+                    self._timestamp_value(metadata) for metadata in metadatas_list
+                )
+            )
+            if len(parents) and (parents.embeddings is None) == (candidates.embeddings is None):
+                parent_ids = parents.ids
+                combined = candidates.concat(parents)
+        
+        parent_position = {doc_id: len(candidates) + i for i, doc_id in enumerate(parent_ids)}
+        distances = combined.distances.copy()
+        order = []
+        seen = set()
+        for i, doc_id in enumerate(candidates.ids):
+            parent_id = parent_of[i]
+            if parent_id:
+                if parent_id not in parent_position:
+                    # 父记录已直接命中（随其自身输出）或已被清理，分块本身不输出
+                    continue
+                doc_id, position = parent_id, parent_position[parent_id]
+            else:
+                position = i
+                if doc_id in best_chunk_distance:
+                    current = distances[i]
+                    distances[i] = min(0.0 if np.isnan(current) else float(current), best_chunk_distance[doc_id])
+            
+            if doc_id not in seen:
+                seen.add(doc_id)
+                order.append(position)
+        
+        collapsed = combined.with_columns(distances=distances).take(order)
+        logger.debug(f"分块折叠: {len(candidates)} 条命中 -> {len(collapsed)} 条记录")
+        return collapsed
+    
+    def retrieve_from_long_term_memory(self, 
+                                    query: str, 
+                                    user_id: str = None,
+                                    include: Optional[List[str]] = None,
+                                    query_embedding: List[float] = None) -> List[Dict]:
+        """
+        从长期记忆库检索相关记录（使用聚类抑制机制）
+        
+        Args:
+            query: 查询内容
+            user_id: 用户ID（可选过滤）
+            include: 需要返回的数据类型列表，可选值：
+                - "documents": 文档内容（摘要）
+                - "metadatas": 元数据
+                - "distances": 距离值
+                - "embeddings": 向量嵌入
+                默认返回 ["documents", "metadatas", "distances", "embeddings"]
+        
+        Returns:
             经过聚类抑制后的相关记录列表
         """
         try:
@@ -489,13 +1621,18 @@ class LongShortTermMemorySystem:
             if include is None:
                 include = ["documents", "metadatas", "distances", "embeddings"]
             
-            # 使用与短期一致的聚类抑制机制与参数
+            # 使用与短期一致的抑制参数，抑制策略按长期记忆配置
             target_k = self.max_retrieval_results * self.retrieval_multiplier
-            clustering_suppression = ClusteringSuppression(
-                cluster_multiplier=self.cluster_multiplier,
-                retrieval_multiplier=self.retrieval_multiplier
+            suppression = self._create_suppression(
+                self.long_term_suppression, self.cluster_multiplier, self.retrieval_multiplier
+            )
+            total_retrieval, cluster_count = suppression.calculate_retrieval_parameters(target_k)
+            total_retrieval, cluster_count, suppression = self._plan_retrieval(
+                self.long_term_collection_name, user_id, suppression, total_retrieval, cluster_count
             )
-            total_retrieval, cluster_count = clustering_suppression.calculate_retrieval_parameters(target_k)
+            if total_retrieval == 0:
+                logger.info("长期记忆库中该用户暂无记录")
+                return []
             
             # 检索相关记录，优先使用预计算的embedding
             if query_embedding is not None:
@@ -529,81 +1666,27 @@ class LongShortTermMemorySystem:
                 logger.info("长期记忆库中未找到相关记录")
                 return []
             
-            # 处理ChromaDB返回的嵌套列表格式
-            records = []
-            metadatas_list = results.get("metadatas", [[]])[0] if results.get("metadatas") else []
-            ids_list = results.get("ids", [[]])[0] if results.get("ids") else []
-            documents_list = results.get("documents", [[]])[0] if results.get("documents") else []
-            distances_list = results.get("distances", [[]])[0] if results.get("distances") else []
-            embeddings_list = results.get("embeddings", [[]])[0] if results.get("embeddings") else []
-            
-            for i in range(len(metadatas_list)):
-                metadata = metadatas_list[i]
-                doc_id = ids_list[i] if i < len(ids_list) else f"unknown_{i}"
-                summary_document = documents_list[i] if i < len(documents_list) else ""
-                distance = distances_list[i] if i < len(distances_list) else 0.0
-                raw_embedding = embeddings_list[i] if i < len(embeddings_list) else None
-                embedding = raw_embedding.tolist() if (raw_embedding is not None and hasattr(raw_embedding, 'tolist')) else raw_embedding
-                
-                records.append({
-                    "doc_id": doc_id,
-                    "content": metadata.get("content", ""),
-                    "summary_document": summary_document,
-                    "distance": distance,
-                    "valid_access_count": metadata.get("valid_access_count", 1.0),
-                    "last_updated": metadata.get("last_updated", ""),
-                    "source_type": metadata.get("source_type", ""),
-                    "user_id": metadata.get("user_id", ""),
-                    "embedding": embedding
-                })
+            # 转换为列式候选集合（向量为一个矩阵，元数据与文本只保留引用）
+            candidates = self._candidates_from_results(results, collection_name=self.long_term_collection_name)
+            
+            # 分块命中折叠回父记录，保证提示语中只出现父记录摘要
+            candidates = self._collapse_chunk_hits(self.long_term_collection_name, candidates)
             
             # 应用聚类抑制机制
-            if records:
-                # 提取embedding和距离用于聚类
-                embeddings = []
-                valid_records = []
-                distances = []
-                
-                for record in records:
-                    if ('embedding' in record and 
-                        record['embedding'] is not None and 
-                        len(record['embedding']) > 0 and 
-                        'distance' in record):
-                        embeddings.append(record['embedding'])
-                        valid_records.append(record)
-                        distances.append(record['distance'])
-                
-                if embeddings:
-                    embeddings_array = np.array(embeddings)
-                    suppressed_records = clustering_suppression.cluster_by_query_similarity_and_aggregate(
-                        valid_records, embeddings_array, distances, cluster_count, target_k
+            if len(candidates):
+                if candidates.embeddings is not None:
+                    self._observe_candidate_distances(self.long_term_collection_name, user_id, candidates.distances)
+                    suppressed = suppression.suppress_candidates(
+                        candidates, cluster_count, target_k,
+                        cache_key=self._centroid_cache_key(self.long_term_collection_name, user_id)
                     )
                 else:
-                    suppressed_records = records[:target_k]
+                    suppressed = candidates.take(np.arange(min(target_k, len(candidates))))
                 
-                # 基于相似度的softmax作为valid_access_count
-                try:
-                    import math
-                    similarities = []
-                    for r in suppressed_records:
-                        d = r.get("distance", None)
-                        try:
-                            # 假设distance为cosine距离：similarity = 1 - distance
-                            sim = 1.0 - float(d) if d is not None else 0.0
-                        except Exception:
-                            sim = 0.0
-                        similarities.append(sim)
-                    
-                    if similarities:
-                        max_sim = max(similarities)
-                        exps = [math.exp(s - max_sim) for s in similarities]
-                        denom = sum(exps) or 1.0
-                        probs = [e / denom for e in exps]
-                        for r, p in zip(suppressed_records, probs):
-                            r["valid_access_count"] = p
-                except Exception as _e:
-                    # 失败时保持原值，不影响主流程
-                    pass
+                # 基于相似度（1 - distance）的softmax作为valid_access_count，只物化最终的记录
+                suppressed_records = suppressed.with_columns(
+                    valid_counts=similarity_softmax(suppressed.distances)
+                ).to_records()
 
                 return suppressed_records
             
@@ -724,12 +1807,13 @@ class LongShortTermMemorySystem:
     #         logger.error(f"从长期记忆库检索失败: {e}")
     #         return []
     
-    def update_short_term_memory(self, records: List[Dict]):
+    def update_short_term_memory(self, records: List[Dict], bump_generation: bool = True):
         """
         更新短期记忆库 - 批量优化版本
         
         Args:
             records: 从长期记忆库检索到的记录列表，包含完整的检索结果
+            bump_generation: 是否递增写代次（检索链路在本轮写入完成后统一递增一次时传False）
         """
         try:
             if not records:
@@ -740,11 +1824,26 @@ class LongShortTermMemorySystem:
             all_doc_ids = [record["doc_id"] for record in records]
             logger.debug(f"批量查询 {len(all_doc_ids)} 个记录的存在性")
             
+            write_collection = self._short_term_write_collection()
             existing_results = self.chroma_service.get_documents(
-                self.short_term_collection_name, ids=all_doc_ids
+                write_collection, ids=all_doc_ids
             )
             existing_ids = set(existing_results.get("ids", []))
             
+            # 纪元模式：当前纪元未命中的记录再查上一纪元，命中的记录更新后迁入当前纪元
+            promoted_ids = set()
+            previous_collection = self._short_term_previous_collection()
+            missing_ids = [doc_id for doc_id in all_doc_ids if doc_id not in existing_ids]
+            if previous_collection and missing_ids:
+                previous_results = self.chroma_service.get_documents(previous_collection, ids=missing_ids)
+                promoted_ids = set(previous_results.get("ids", []))
+                if promoted_ids:
+                    existing_results = {
+                        "ids": list(existing_results.get("ids", [])) + list(previous_results.get("ids", [])),
+                        "metadatas": list(existing_results.get("metadatas") or []) + list(previous_results.get("metadatas") or [])
+                    }
+                    existing_ids |= promoted_ids
+            
             # 2. 分类处理：已存在的记录和需要新增的记录
             existing_records = []
             new_records = []
@@ -763,8 +1862,10 @@ class LongShortTermMemorySystem:
                 logger.debug(f"批量更新 {len(existing_records)} 个已存在记录的访问次数")
                 
                 # 利用前面批量查询的结果，避免重复查询
-                existing_metadatas = existing_results.get("metadatas", [])
                 existing_ids_list = existing_results.get("ids", [])
+                existing_metadatas = self._overlay_counters(
+                    write_collection, existing_ids_list, existing_results.get("metadatas", [])
+                )
                 
                 # 创建id到metadata的映射
                 id_to_metadata = {}
@@ -794,27 +1895,58 @@ class LongShortTermMemorySystem:
                     # 计算衰减后的值
                     decayed_value = self._calculate_decayed_valid_count(metadata, CoolingRate.MINUTES_20)
                     
-                    # 新的有效访问次数 = 衰减值 + 记录传入的valid_access_count
-                    increment = float(record.get("valid_access_count", 1.0))
+                    # 新的有效访问次数 = 衰减值 + 记录传入的valid_access_count（加上写回批次内合并的后续增量）
+                    increment = float(record.get("valid_access_count", 1.0)) + float(record.get("coalesced_increment", 0.0))
                     new_valid_count = decayed_value + increment
                     
                     # 更新元数据
                     updated_metadata = metadata.copy()
+                    now = datetime.now()
                     updated_metadata["valid_access_count"] = new_valid_count
-                    updated_metadata["last_updated"] = datetime.now().isoformat()
+                    updated_metadata["last_updated"] = now.isoformat()
+                    updated_metadata["last_updated_ts"] = now.timestamp()
+                    updated_metadata["expires_at"] = self._calculate_expires_at(new_valid_count, now.timestamp(), CoolingRate.MINUTES_20)
                     updated_metadata["total_access_count"] = metadata.get("total_access_count", 0) + increment
+                    if "created_at_ts" not in updated_metadata:
+                        updated_metadata["created_at_ts"] = self._get_timestamp(metadata, "created_at")
+                    if "user_bucket" not in updated_metadata:
+                        updated_metadata["user_bucket"] = self._user_bucket(record_user_id)
                     
                     updated_metadatas.append(updated_metadata)
                     updated_ids.append(doc_id)
                 
+                # 从上一纪元命中的记录带着更新后的元数据写入当前纪元
+                if promoted_ids:
+                    record_by_id = {record["doc_id"]: record for record in existing_records}
+                    promoted = [i for i, doc_id in enumerate(updated_ids) if doc_id in promoted_ids]
+                    if promoted:
+                        promoted_embeddings = [record_by_id[updated_ids[i]].get("embedding") for i in promoted]
+                        has_embeddings = all(embedding is not None for embedding in promoted_embeddings)
+                        self.chroma_service.add_documents(
+                            write_collection,
+                            documents=[
+                                record_by_id[updated_ids[i]].get("summary_document", record_by_id[updated_ids[i]]["content"])
+                                for i in promoted
+                            ],
+                            embeddings=[
+                                embedding.tolist() if hasattr(embedding, "tolist") else embedding
+                                for embedding in promoted_embeddings
+                            ] if has_embeddings else None,
+                            metadatas=[updated_metadatas[i] for i in promoted],
+                            ids=[updated_ids[i] for i in promoted]
+                        )
+                        logger.debug(f"{len(promoted)} 个记录从上一纪元迁入当前纪元")
+                    updated_metadatas = [m for doc_id, m in zip(updated_ids, updated_metadatas) if doc_id not in promoted_ids]
+                    updated_ids = [doc_id for doc_id in updated_ids if doc_id not in promoted_ids]
+                
                 # 批量更新所有记录
                 if updated_metadatas:
                     logger.debug(f"批量更新 {len(updated_metadatas)} 个记录的访问次数")
-                    self.chroma_service.update_documents(
-                        self.short_term_collection_name,
-                        ids=updated_ids,
-                        metadatas=updated_metadatas
+                    self._persist_counters(
+                        write_collection, updated_ids, updated_metadatas,
+                        previous=[id_to_metadata[doc_id] for doc_id in updated_ids]
                     )
+                    self._track_expiry(write_collection, updated_ids, updated_metadatas)
             
             # 4. 批量添加新记录
             if new_records:
@@ -846,15 +1978,21 @@ class LongShortTermMemorySystem:
                     else:
                         embeddings.append(None)
                     
-                    # 准备元数据
+                    # 准备元数据（初始访问次数1.0，写回批次内合并的后续增量一并计入）
+                    now = datetime.now()
+                    initial_count = 1.0 + float(record.get("coalesced_increment", 0.0))
                     metadata = {
                         "content": content,  # 原始内容
-                        "valid_access_count": 1.0,
-                        "last_updated": datetime.now().isoformat(),
-                        "created_at": datetime.now().isoformat(),
-                        "total_access_count": 1,
+                        "valid_access_count": initial_count,
+                        "last_updated": now.isoformat(),
+                        "created_at": now.isoformat(),
+                        "last_updated_ts": now.timestamp(),
+                        "created_at_ts": now.timestamp(),
+                        "expires_at": self._calculate_expires_at(initial_count, now.timestamp(), CoolingRate.MINUTES_20),
+                        "total_access_count": initial_count,
                         "source_type": record["source_type"],
-                        "user_id": record["user_id"]
+                        "user_id": record["user_id"],
+                        "user_bucket": self._user_bucket(record["user_id"])
                     }
                     metadatas.append(metadata)
                     ids.append(doc_id)
@@ -876,12 +2014,14 @@ class LongShortTermMemorySystem:
                 if valid_embeddings:
                     logger.debug(f"批量添加 {len(valid_embeddings)} 个有embedding的记录")
                     self.chroma_service.add_documents(
-                        self.short_term_collection_name,
+                        write_collection,
                         documents=valid_documents,
                         embeddings=valid_embeddings,
                         metadatas=valid_metadatas,
                         ids=valid_ids
                     )
+                    self._track_expiry(write_collection, valid_ids, valid_metadatas)
+                    self._record_inserts(self.short_term_collection_name, len(valid_ids), valid_metadatas)
                 
                 # 批量添加没有embedding的记录（让ChromaDB自动生成）
                 no_embedding_docs = []
@@ -897,13 +2037,17 @@ class LongShortTermMemorySystem:
                 if no_embedding_docs:
                     logger.debug(f"批量添加 {len(no_embedding_docs)} 个无embedding的记录（自动生成）")
                     self.chroma_service.add_documents(
-                        self.short_term_collection_name,
+                        write_collection,
                         documents=no_embedding_docs,
                         embeddings=None,  # 让ChromaDB自动生成
                         metadatas=no_embedding_metadatas,
                         ids=no_embedding_ids
                     )
+                    self._track_expiry(write_collection, no_embedding_ids, no_embedding_metadatas)
+                    self._record_inserts(self.short_term_collection_name, len(no_embedding_ids), no_embedding_metadatas)
             
+            if bump_generation:
+                self._bump_write_generation([record.get("user_id") for record in records])
             logger.info(f"处理记录: 总计{len(records)}个, 已存在{len(existing_records)}个, 新增{len(new_records)}个")
             
         except Exception as e:
@@ -916,13 +2060,15 @@ class LongShortTermMemorySystem:
                                         target_k: int = None,
                                         cluster_multiplier: int = None,
                                         retrieval_multiplier: int = None,
-                                        query_embedding: List[float] = None) -> List[Dict]:
+                                        query_embedding: List[float] = None,
+                                        pending_records: Optional[List[Dict]] = None) -> List[Dict]:
         """
         短期记忆库检索：
         1) 使用向量检索该用户短期记录（返回距离/相似度与embedding）；
-        2) KMeans聚类，簇内以"与查询最相似（distance最小）"的记录作为代表；
+        2) 按短期抑制策略归并相似记录（默认KMeans聚类），以"与查询最相似（distance最小）"的记录作为代表；
         代表记录的 valid_access_count = 该簇内所有记录的（衰减后）valid_access_count 之和；
         3) 按代表记录的 valid_access_count 排序，返回前 target_k 条。
+        写回模式下 pending_records 为本轮尚未落库的短期更新，在抑制前合并进候选。
         """
         import numpy as np
 
@@ -932,11 +2078,16 @@ class LongShortTermMemorySystem:
             final_cluster_multiplier = cluster_multiplier if cluster_multiplier is not None else self.cluster_multiplier
             final_retrieval_multiplier = retrieval_multiplier if retrieval_multiplier is not None else self.retrieval_multiplier
 
-            clustering_suppression = ClusteringSuppression(
-                cluster_multiplier=final_cluster_multiplier,
-                retrieval_multiplier=final_retrieval_multiplier
+            suppression = self._create_suppression(
+                self.short_term_suppression, final_cluster_multiplier, final_retrieval_multiplier
             )
-            total_retrieval, cluster_count = clustering_suppression.calculate_retrieval_parameters(target_k)
+            total_retrieval, cluster_count = suppression.calculate_retrieval_parameters(target_k)
+            default_retrieval = total_retrieval
+            total_retrieval, cluster_count, suppression = self._plan_retrieval(
+                self.short_term_collection_name, user_id, suppression, total_retrieval, cluster_count
+            )
+            if total_retrieval == 0 and not pending_records:
+                return []
 
             # 用户过滤
             where = {}
@@ -945,76 +2096,45 @@ class LongShortTermMemorySystem:
 
             # 向量检索（拿到 distances 和 embeddings）
             include = ["documents", "metadatas", "distances", "embeddings"]
-            if query_embedding is not None:
-                results = self.chroma_service.query_documents(
-                    self.short_term_collection_name,
+            if total_retrieval == 0:
+                results = {}
+            elif query_embedding is not None:
+                results = self._query_short_term(
+                    total_retrieval,
                     query_embeddings=[query_embedding],
-                    n_results=total_retrieval,
                     where=where if where else None,
                     include=include
                 )
             else:
-                results = self.chroma_service.query_documents(
-                    self.short_term_collection_name,
+                results = self._query_short_term(
+                    total_retrieval,
                     query_texts=[query],
-                    n_results=total_retrieval,
                     where=where if where else None,
                     include=include
                 )
 
-            if not results or "error" in results or not results.get("metadatas"):
+            if results and "error" in results:
+                return []
+            if not (results and results.get("metadatas")) and not pending_records:
                 return []
 
-            # 取第一条查询的扁平结果
-            metadatas_list = results.get("metadatas", [[]])[0] if results.get("metadatas") else []
-            ids_list = results.get("ids", [[]])[0] if results.get("ids") else []
-            documents_list = results.get("documents", [[]])[0] if results.get("documents") else []
-            distances_list = results.get("distances", [[]])[0] if results.get("distances") else []
-            embeddings_list = results.get("embeddings", [[]])[0] if results.get("embeddings") else []
-
-            # 整理为可聚类集合（此处使用“衰减后的 valid_access_count”）
-            valid_records = []
-            embeddings = []
-            distances = []
-
-            for i in range(len(metadatas_list)):
-                metadata = metadatas_list[i]
-                doc_id = ids_list[i] if i < len(ids_list) else f"unknown_{i}"
-                summary_document = documents_list[i] if i < len(documents_list) else ""
-                distance = distances_list[i] if i < len(distances_list) else None
-                raw_embedding = embeddings_list[i] if i < len(embeddings_list) else None
-                embedding = raw_embedding.tolist() if (raw_embedding is not None and hasattr(raw_embedding, 'tolist')) else raw_embedding
-
-                if embedding is None or len(embedding) == 0:
-                    continue
-
-                # 衰减后的 valid_access_count
-                decayed_valid = self._calculate_decayed_valid_count(metadata, CoolingRate.MINUTES_20)
-
-                record = {
-                    "doc_id": doc_id,
-                    "content": metadata.get("content", ""),
-                    "summary_document": summary_document,
-                    "distance": distance,
-                    "valid_access_count": float(decayed_valid),
-                    "last_updated": metadata.get("last_updated", ""),
-                    "source_type": metadata.get("source_type", ""),
-                    "user_id": metadata.get("user_id", ""),
-                    "embedding": embedding
-                }
-                valid_records.append(record)
-                embeddings.append(embedding)
-                distances.append(distance)
-
-            if not valid_records:
+            # 转换为列式候选集合（此处使用“衰减后的 valid_access_count”），没有向量的记录不参与抑制
+            candidates = self._candidates_from_results(
+                results, cooling_rate=CoolingRate.MINUTES_20, collection_name=self.short_term_collection_name
+            )
+            if pending_records:
+                # 自适应规模按落库前的记录数封顶，合并后按默认检索条数截断
+                candidates = self._merge_pending_short_term(candidates, pending_records, default_retrieval)
+            if len(candidates) == 0 or candidates.embeddings is None:
                 return []
 
-            embeddings_array = np.array(embeddings)
+            self._observe_candidate_distances(self.short_term_collection_name, user_id, candidates.distances)
             cluster_count = max(1, cluster_count)
 
-            reps = clustering_suppression.cluster_by_query_similarity_and_aggregate(
-                valid_records, embeddings_array, distances, cluster_count, target_k
-            )
+            reps = suppression.suppress_candidates(
+                candidates, cluster_count, target_k,
+                cache_key=self._centroid_cache_key(self.short_term_collection_name, user_id)
+            ).to_records()
 
             return reps
 
@@ -1036,14 +2156,38 @@ class LongShortTermMemorySystem:
         Returns:
             (短期记忆记录列表, 提示语)
         """
+        cache_key = None
+        cache_generation = None
+        add_future = None
         try:
             logger.info(f"[调试] 开始处理用户消息: {user_content[:50]}...")
             
+            # 检索结果缓存：同一用户的相同内容且期间无任何写入时直接返回
+            if self.retrieval_cache is not None and user_id:
+                cache_key = self._generate_md5(user_content, user_id)
+                cached = self.retrieval_cache.get(user_id, cache_key)
+                if cached is not None:
+                    logger.info(f"检索结果缓存命中: 用户={user_id}")
+                    records, system_prompt, query_embedding = cached[:3]
+                    self._hit_recorder.submit(self._record_cached_access, user_id, cache_key, cached)
+                    return list(records), system_prompt, query_embedding
+                # 在任何写入与读取之前获取代次；本轮自身的写入不单独递增代次，
+                # 而是在写入完成后统一递增一次（见 _cache_retrieval），期间其他请求的写入会使本轮的缓存项失效
+                cache_generation = self.retrieval_cache.generation(user_id)
+            bump_generation = cache_generation is None
+            
+            request_started = time.perf_counter()
+            spans: Dict[str, float] = {}
+            mode = "write_behind" if self.write_behind is not None else (
+                "pipelined" if self._pipeline_executor is not None else "sequential"
+            )
+            
             # 1. 准备用户内容数据（包含embedding计算）
             logger.info("[调试] 步骤1: 准备用户内容数据")
-            document_text, doc_id, metadata, user_embedding = self._prepare_document_data(
-                user_content, SourceType.USER, user_id
-            )
+            with self.stage_timings.stage("prepare", spans):
+                document_text, doc_id, metadata, user_embedding, chunk_records = self._prepare_document_data(
+                    user_content, SourceType.USER, user_id
+                )
             logger.info(f"[调试] 步骤1完成: doc_id={doc_id}, user_embedding类型={type(user_embedding)}")
             
             # 使用用户embedding进行检索
@@ -1052,29 +2196,79 @@ class LongShortTermMemorySystem:
             logger.info(f"[调试] 步骤2完成: query_embedding类型={type(query_embedding)}")
 
             # 2. 将用户内容添加到长期库（使用预计算的完整数据）
+            # 流水线模式下提交到工作线程，与后续检索并行执行
             logger.info("[调试] 步骤3: 添加用户内容到长期库")
-            user_doc_id = self.add_to_long_term_memory(
-                user_content, SourceType.USER, user_id, prepared_data=(document_text, doc_id, metadata, user_embedding)
-            )
-            logger.info(f"[调试] 步骤3完成: user_doc_id={user_doc_id}")
+            prepared_data = (document_text, doc_id, metadata, user_embedding, chunk_records)
+            write_deferred = self._enqueue_long_term_add(user_content, SourceType.USER, user_id, prepared_data, spans)
+            if not write_deferred:
+                add_future = self._submit_long_term_add(
+                    user_content, SourceType.USER, user_id, prepared_data, spans, bump_generation=bump_generation
+                )
+            if add_future is None and not write_deferred:
+                with self.stage_timings.stage("long_term_add", spans):
+                    user_doc_id = self.add_to_long_term_memory(
+                        user_content, SourceType.USER, user_id, prepared_data=prepared_data,
+                        bump_generation=bump_generation
+                    )
+                logger.info(f"[调试] 步骤3完成: user_doc_id={user_doc_id}")
+            
+            # 分级检索：短期记忆已有足够近邻时直接使用，跳过或推迟长期检索
+            if self.tiered_retrieval != "off":
+                with self.stage_timings.stage("short_term_probe", spans):
+                    short_term_records = self._try_short_term_first(
+                        user_content, user_id, query_embedding, document_text, doc_id, metadata,
+                        bump_generation=bump_generation
+                    )
+                if short_term_records is not None:
+                    if add_future is not None:
+                        add_future.result()
+                    short_term_records.sort(key=lambda x: x.get("last_updated_ts", 0.0))
+                    system_prompt = self._generate_system_prompt(short_term_records)
+                    current_record = self._current_message_record(
+                        user_content, user_id, query_embedding, document_text, doc_id, metadata
+                    )
+                    self._cache_retrieval(
+                        user_id, cache_key,
+                        (list(short_term_records), system_prompt, query_embedding, [current_record]),
+                        cache_generation
+                    )
+                    self._record_request_timings(mode, request_started, spans)
+                    return short_term_records, system_prompt, query_embedding
             
             # 3. 使用用户内容检索长期库，获得相关记录
             logger.info("[调试] 步骤4: 检索长期库")
-            long_term_records = self.retrieve_from_long_term_memory(user_content, user_id, query_embedding=query_embedding)
+            with self.stage_timings.stage("long_term_query", spans):
+                long_term_records = self.retrieve_from_long_term_memory(user_content, user_id, query_embedding=query_embedding)
+            if add_future is not None:
+                # 检索与入库并行时可能看不到当前消息，入库完成后再继续，保证写入顺序
+                add_future.result()
+            if add_future is not None or write_deferred:
+                # 检索结果可能不含当前消息，在内存中补上
+                long_term_records = self._inject_current_record(
+                    long_term_records, user_content, user_id, query_embedding, document_text, doc_id, metadata
+                )
             logger.info(f"[调试] 步骤4完成: 检索到{len(long_term_records) if long_term_records else 0}条记录, 类型={type(long_term_records)}")
             
             # 4. 将候选记录更新到短期记忆库
             logger.info("[调试] 步骤5: 更新短期记忆库")
+            pending_short_term = None
             if long_term_records:
                 logger.info(f"[调试] 步骤5: long_term_records长度={len(long_term_records)}")
-                self.update_short_term_memory(long_term_records)
+                with self.stage_timings.stage("short_term_update", spans):
+                    if self._write_short_term(long_term_records, bump_generation=bump_generation):
+                        # 写回模式：短期更新尚未落库，短期检索时在内存中合并
+                        pending_short_term = long_term_records
                 logger.info("[调试] 步骤5: update_short_term_memory调用完成")
             else:
                 logger.info("[调试] 步骤5: long_term_records为空，跳过更新")
             
             # 5. 再用用户内容检索短期记忆库，应用聚类抑制机制
             logger.info("[调试] 步骤6: 检索短期记忆库")
-            short_term_records = self.retrieve_from_short_term_memory(user_content, user_id, target_k=self.max_retrieval_results, query_embedding=query_embedding)
+            with self.stage_timings.stage("short_term_query", spans):
+                short_term_records = self.retrieve_from_short_term_memory(
+                    user_content, user_id, target_k=self.max_retrieval_results, query_embedding=query_embedding,
+                    pending_records=pending_short_term
+                )
             logger.info(f"[调试] 步骤6完成: 检索到{len(short_term_records) if short_term_records else 0}条记录")
             
             # 6. 拼接提示语（按时间排序）
@@ -1082,7 +2276,7 @@ class LongShortTermMemorySystem:
             # short_term_records 中已经包含了所有需要的数据，包括当前用户消息
             # 只需要按时间排序即可
             all_records = short_term_records
-            all_records.sort(key=lambda x: x["last_updated"])
+            all_records.sort(key=lambda x: x.get("last_updated_ts", 0.0))
             
             # 生成系统提示语
             system_prompt = self._generate_system_prompt(all_records)
@@ -1090,10 +2284,21 @@ class LongShortTermMemorySystem:
             # system_prompt = self._generate_system_prompt(all_records)
             logger.info("[调试] 步骤7完成: 系统提示语生成完成")
             
+            self._cache_retrieval(
+                user_id, cache_key,
+                (list(short_term_records), system_prompt, query_embedding, list(long_term_records or [])),
+                cache_generation
+            )
+            self._record_request_timings(mode, request_started, spans)
             return short_term_records, system_prompt, query_embedding
             
         except Exception as e:
             logger.error(f"处理用户消息失败: {e}")
+            if cache_generation is not None:
+                # 本轮已完成的写入没有递增代次，出错时同样补上，使该用户的旧缓存项失效
+                if add_future is not None:
+                    wait([add_future])
+                self._bump_write_generation([user_id])
             raise
 
     async def process_agent_reply_async(self, 
@@ -1108,23 +2313,38 @@ class LongShortTermMemorySystem:
             user_id: 用户ID
         """
         try:
+            # 0. 执行分级检索推迟的长期检索（在回复之后，不占用首字延迟）
+            self.run_deferred_long_term_pass(user_id)
+            
             # 1. 准备AI回复内容数据（包含embedding计算）
-            document_text, doc_id, metadata, reply_embedding = self._prepare_document_data(
+            document_text, doc_id, metadata, reply_embedding, chunk_records = self._prepare_document_data(
                 reply_content, SourceType.AGENT, user_id
             )
             reply_query_embedding = reply_embedding
             
-            # 2. 将回复内容入库（使用预计算的完整数据）
-            reply_doc_id = self.add_to_long_term_memory(
-                reply_content, SourceType.AGENT, user_id, prepared_data=(document_text, doc_id, metadata, reply_embedding)
+            # 2. 将回复内容入库（使用预计算的完整数据），流水线模式下与长期检索并行
+            prepared_data = (document_text, doc_id, metadata, reply_embedding, chunk_records)
+            write_deferred = self._enqueue_long_term_add(reply_content, SourceType.AGENT, user_id, prepared_data)
+            add_future = None if write_deferred else self._submit_long_term_add(
+                reply_content, SourceType.AGENT, user_id, prepared_data
             )
+            if add_future is None and not write_deferred:
+                reply_doc_id = self.add_to_long_term_memory(
+                    reply_content, SourceType.AGENT, user_id, prepared_data=prepared_data
+                )
             
             # 3. 使用回复内容检索长期库，获得相关记录（包含刚存储的AI回复）
             long_term_records = self.retrieve_from_long_term_memory(reply_content, user_id, query_embedding=reply_query_embedding)
+            if add_future is not None:
+                add_future.result()
+            if add_future is not None or write_deferred:
+                long_term_records = self._inject_current_record(
+                    long_term_records, reply_content, user_id, reply_query_embedding, document_text, doc_id, metadata
+                )
             
             # 4. 将检索到的相似记录添加到短期记忆库
             if long_term_records:
-                self.update_short_term_memory(long_term_records)
+                self._write_short_term(long_term_records)
             
                                 
               
@@ -1135,6 +2355,395 @@ class LongShortTermMemorySystem:
 
 
 
+    def _cache_retrieval(self,
+                         user_id: str,
+                         cache_key: Optional[str],
+                         value: Tuple[List[Dict], str, List[float], List[Dict]],
+                         generation: Optional[Tuple[int, int]]):
+        """
+        本轮写入完成后递增一次写代次，并缓存本次检索结果
+        generation 是检索读取之前获取的代次，本轮自身的写入（长期入库、短期更新）没有单独递增代次，
+        缓存项按 generation 加上这一次递增写入：检索期间其他请求对该用户的任何写入都会使其立即失效
+        
+        Args:
+            user_id: 用户ID
+            cache_key: 查询键（当前消息的doc_id）
+            value: (短期记忆记录列表, 提示语, query embedding, 本轮写入短期记忆的记录)
+            generation: 检索读取之前获取的写代次
+        """
+        if self.retrieval_cache is None or cache_key is None or generation is None:
+            return
+        self._bump_write_generation([user_id])
+        global_generation, user_generation = generation
+        self.retrieval_cache.put(user_id, cache_key, value, (global_generation, user_generation + 1))
+    
+    def _record_cached_access(self,
+                              user_id: str,
+                              doc_id: str,
+                              value: Tuple[List[Dict], str, List[float], List[Dict]]):
+        """
+        缓存命中时照常记录本轮访问（在命中记录线程中执行）：长期记录的访问次数加1，并用缓存的记录更新短期记忆，
+        与完整流程的写入一致，重复消息的访问次数与遗忘时刻不受缓存影响。
+        这些写入只刷新访问计数，不递增写代次，命中本身不会使缓存项失效；开启旁路存储时计数只写入旁路。
+        记录失败时递增写代次，下一次请求走完整流程
+        
+        Args:
+            user_id: 用户ID
+            doc_id: 当前消息的doc_id（即查询键）
+            value: 命中的缓存值
+        """
+        short_term_writes = value[3]
+        try:
+            self._update_record_access_count(
+                self.long_term_collection_name, doc_id, CoolingRate.DAYS_31, user_id, bump_generation=False
+            )
+            if short_term_writes:
+                self.update_short_term_memory(short_term_writes, bump_generation=False)
+            self._hit_record_counts["recorded"] += 1
+        except Exception as e:
+            self._hit_record_counts["failed"] += 1
+            logger.error(f"缓存命中时记录访问失败: 用户={user_id}, 错误: {e}")
+            self._bump_write_generation([user_id])
+    
+    def _submit_long_term_add(self,
+                              content: str,
+                              source_type: SourceType,
+                              user_id: str,
+                              prepared_data: Tuple,
+                              spans: Optional[Dict[str, float]] = None,
+                              bump_generation: bool = True):
+        """
+        流水线模式下把长期入库提交到工作线程
+        
+        Returns:
+            入库任务的Future；未开启流水线时返回None（由调用方同步入库）
+        """
+        executor = self._pipeline_executor
+        if executor is None:
+            return None
+        
+        def run():
+            with self.stage_timings.stage("long_term_add", spans):
+                return self.add_to_long_term_memory(
+                    content, source_type, user_id, prepared_data=prepared_data, bump_generation=bump_generation
+                )
+        
+        return executor.submit(run)
+    
+    def _enqueue_long_term_add(self,
+                               content: str,
+                               source_type: SourceType,
+                               user_id: str,
+                               prepared_data: Tuple,
+                               spans: Optional[Dict[str, float]] = None) -> bool:
+        """
+        写回模式下把长期入库放入写回队列
+        
+        Returns:
+            是否已入队（未开启写回模式时返回False，由调用方自行入库）
+        """
+        if self.write_behind is None:
+            return False
+        with self.stage_timings.stage("long_term_enqueue", spans):
+            self.write_behind.submit("long_term_add", (content, source_type, user_id, prepared_data))
+        return True
+    
+    def _write_short_term(self, records: List[Dict], bump_generation: bool = True) -> bool:
+        """
+        写入短期记忆：写回模式下放入写回队列，否则直接批量更新
+        
+        Args:
+            records: 要写入的记录
+            bump_generation: 是否递增写代次（检索链路在本轮写入完成后统一递增一次时传False）
+        
+        Returns:
+            是否为延迟写入（True表示尚未落库，本轮检索需在内存中合并这些记录）
+        """
+        if self.write_behind is None:
+            self.update_short_term_memory(records, bump_generation=bump_generation)
+            return False
+        self.write_behind.submit("short_term_update", list(records))
+        return True
+    
+    def _apply_pending_writes(self, batch: List[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+        """
+        写回线程的批量写入：长期入库按提交顺序逐条执行；
+        同一批次内的短期更新按doc_id合并后一次批量写入：首条之后的增量累加到 coalesced_increment，
+        已存在的记录按首条增量加后续增量更新，尚未入库的新记录按 1.0 加后续增量写入，与逐条写入的结果一致
+        
+        Returns:
+            写入失败、交由写回队列重试的操作（短期更新失败时为本批全部短期更新操作）
+        """
+        short_term_records: Dict[str, Dict] = {}
+        short_term_ops = []
+        failed = []
+        for kind, payload in batch:
+            if kind == "long_term_add":
+                content, source_type, user_id, prepared_data = payload
+                try:
+                    self.add_to_long_term_memory(content, source_type, user_id, prepared_data=prepared_data)
+                except Exception as e:
+                    logger.warning(f"写回长期入库失败: 用户={user_id}, 错误: {e}")
+                    failed.append((kind, payload))
+            elif kind == "short_term_update":
+                short_term_ops.append((kind, payload))
+                for record in payload:
+                    merged = short_term_records.get(record["doc_id"])
+                    if merged is None:
+                        short_term_records[record["doc_id"]] = dict(record)
+                    else:
+                        first_count = merged.get("valid_access_count", 1.0)
+                        coalesced = float(merged.get("coalesced_increment", 0.0)) + float(record.get("valid_access_count", 1.0))
+                        merged.update(record)
+                        merged["valid_access_count"] = first_count
+                        merged["coalesced_increment"] = coalesced
+            else:
+                logger.warning(f"未知的写回操作类型: {kind}")
+        
+        if short_term_records:
+            try:
+                self.update_short_term_memory(list(short_term_records.values()))
+            except Exception as e:
+                logger.warning(f"写回短期更新失败（{len(short_term_records)} 条记录）: {e}")
+                failed.extend(short_term_ops)
+        return failed
+    
+    def _merge_pending_short_term(self,
+                                  candidates: CandidateSet,
+                                  pending_records: List[Dict],
+                                  limit: int) -> CandidateSet:
+        """
+        把尚未落库的短期更新合并进短期检索候选，结果与写入后再检索一致：
+        已存在的记录有效访问次数加上增量，新记录以初始值1.0加入，时间戳均记为当前时刻
+        
+        Args:
+            candidates: 短期检索得到的候选集合
+            pending_records: 写回队列中本轮的短期更新记录
+            limit: 合并后最多保留的候选数（按距离取最近的）
+        """
+        now = time.time()
+        position = {doc_id: i for i, doc_id in enumerate(candidates.ids)}
+        valid_counts = candidates.valid_counts.copy()
+        timestamps = candidates.timestamps.copy()
+        new_records: Dict[str, Dict] = {}
+        for record in pending_records:
+            if record.get("embedding") is None:
+                continue
+            i = position.get(record["doc_id"])
+            if i is not None:
+                valid_counts[i] += float(record.get("valid_access_count", 1.0))
+                timestamps[i] = now
+            elif record["doc_id"] not in new_records:
+                new_records[record["doc_id"]] = record
+        merged = candidates.with_columns(valid_counts=valid_counts, timestamps=timestamps)
+        
+        if new_records:
+            records = list(new_records.values())
+            added = CandidateSet.from_columns(
+                [record["doc_id"] for record in records],
+                [record.get("distance") for record in records],
+                [
+                    {
+                        "content": record.get("content", ""),
+                        "last_updated": datetime.fromtimestamp(now).isoformat(),
+                        "source_type": record.get("source_type", ""),
+                        "user_id": record.get("user_id", "")
+                    }
+                    for record in records
+                ],
+                [record.get("summary_document", record.get("content", "")) for record in records],
+                [record["embedding"] for record in records],
+                valid_counts=[1.0] * len(records),
+                timestamps=[now] * len(records)
+            )
+            merged = added if len(merged) == 0 or merged.embeddings is None else merged.concat(added)
+        
+        if len(merged) > limit:
+            distances = np.where(np.isnan(merged.distances), np.inf, merged.distances)
+            merged = merged.take(stable_topk_indices(distances, limit))
+        return merged
+    
+    def _current_message_record(self,
+                                content: str,
+                                user_id: str,
+                                query_embedding: List[float],
+                                document_text: str,
+                                doc_id: str,
+                                metadata: Dict) -> Dict:
+        """由当前消息的预计算数据构造检索结果格式的记录（与查询距离为0）"""
+        return {
+            "doc_id": doc_id,
+            "content": content,
+            "summary_document": document_text,
+            "distance": 0.0,
+            "valid_access_count": 1.0,
+            "last_updated": metadata.get("last_updated", ""),
+            "last_updated_ts": self._get_timestamp(metadata, "last_updated"),
+            "source_type": metadata.get("source_type", SourceType.USER.value),
+            "user_id": user_id,
+            "embedding": query_embedding
+        }
+    
+    def _inject_current_record(self,
+                               records: List[Dict],
+                               content: str,
+                               user_id: str,
+                               query_embedding: List[float],
+                               document_text: str,
+                               doc_id: str,
+                               metadata: Dict) -> List[Dict]:
+        """
+        流水线模式下长期检索与当前消息入库并行，检索结果可能不含当前消息：
+        在内存中补上当前消息，并按相似度重新计算softmax，与串行流程的结果保持一致
+        """
+        records = records or []
+        if any(record.get("doc_id") == doc_id for record in records):
+            return records
+        
+        records = list(records) + [
+            self._current_message_record(content, user_id, query_embedding, document_text, doc_id, metadata)
+        ]
+        distances = np.asarray(
+            [np.nan if record.get("distance") is None else float(record["distance"]) for record in records],
+            dtype=np.float64
+        )
+        for record, probability in zip(records, similarity_softmax(distances)):
+            record["valid_access_count"] = float(probability)
+        return records
+    
+    def _record_request_timings(self, mode: str, request_started: float, spans: Dict[str, float]):
+        """记录一次消息处理的墙钟耗时（关键路径）与各阶段耗时"""
+        wall_ms = (time.perf_counter() - request_started) * 1000
+        self.stage_timings.record_request(mode, wall_ms, spans)
+        logger.debug(
+            f"消息处理耗时: 关键路径={wall_ms:.1f}ms 阶段之和={sum(spans.values()):.1f}ms "
+            + " ".join(f"{name}={elapsed:.1f}ms" for name, elapsed in spans.items())
+        )
+    
+    def _short_term_similarity(self, record: Dict, query_embedding: Optional[List[float]]) -> float:
+        """
+        将短期记录的检索距离换算为余弦相似度，换算方式取决于集合的 hnsw:space：
+        cosine 为 1 - d；ip 为 1 - 点积，除以两向量模长；l2 为平方欧氏距离，cos = (|q|² + |r|² - d) / (2|q||r|)
+        缺少向量时按单位向量处理（ip 为 1 - d，l2 为 1 - d/2）
+        """
+        if self._short_term_space is None:
+            try:
+                self._short_term_space = self.chroma_service.get_distance_space(self.short_term_collection_name)
+            except Exception as e:
+                logger.warning(f"读取短期集合距离空间失败，按默认l2处理: {e}")
+                self._short_term_space = "l2"
+        distance = float(record["distance"])
+        embedding = record.get("embedding")
+        norms = None
+        if query_embedding is not None and embedding is not None:
+            query_norm = float(np.linalg.norm(query_embedding))
+            record_norm = float(np.linalg.norm(embedding))
+            if query_norm > 0 and record_norm > 0:
+                norms = (query_norm, record_norm)
+        
+        if self._short_term_space == "cosine":
+            return 1.0 - distance
+        if self._short_term_space == "ip":
+            return 1.0 - distance if norms is None else (1.0 - distance) / (norms[0] * norms[1])
+        if norms is None:
+            return 1.0 - distance / 2.0
+        return (norms[0] ** 2 + norms[1] ** 2 - distance) / (2.0 * norms[0] * norms[1])
+    
+    def _try_short_term_first(self,
+                              user_content: str,
+                              user_id: str,
+                              query_embedding: List[float],
+                              document_text: str,
+                              doc_id: str,
+                              metadata: Dict,
+                              bump_generation: bool = True) -> Optional[List[Dict]]:
+        """
+        分级检索：先查短期记忆，命中记录数达到阈值时直接返回结果
+        命中时将当前消息直接写入短期记忆（正常流程中它经由长期检索进入短期记忆），
+        并按配置跳过或推迟长期检索
+        
+        Returns:
+            命中时返回短期记忆记录列表（含当前消息），未命中返回None（回退到完整流程）
+        """
+        short_term_records = self.retrieve_from_short_term_memory(
+            user_content, user_id, target_k=self.max_retrieval_results, query_embedding=query_embedding
+        )
+        hits = sum(
+            1 for record in short_term_records
+            if record.get("doc_id") != doc_id
+            and record.get("distance") is not None
+            and self._short_term_similarity(record, query_embedding) >= self.tiered_similarity_threshold
+        )
+        
+        with self._tiered_lock:
+            self._tiered_counts["requests"] += 1
+            if hits < self.tiered_min_hits:
+                self._tiered_counts["long_term_fallbacks"] += 1
+                return None
+            self._tiered_counts["short_term_hits"] += 1
+        
+        current_record = self._current_message_record(
+            user_content, user_id, query_embedding, document_text, doc_id, metadata
+        )
+        self._write_short_term([current_record], bump_generation=bump_generation)
+        if all(record.get("doc_id") != doc_id for record in short_term_records):
+            short_term_records.append(current_record)
+        
+        if self.tiered_retrieval == "defer":
+            with self._tiered_lock:
+                if user_id in self._deferred_long_term:
+                    # 上一条消息的推迟检索尚未执行，以最新消息为准
+                    self._tiered_counts["deferred_superseded"] += 1
+                self._deferred_long_term[user_id] = (user_content, query_embedding)
+                self._tiered_counts["deferred_scheduled"] += 1
+        
+        logger.info(f"分级检索命中短期记忆: 用户={user_id} 命中={hits} 长期检索={'推迟' if self.tiered_retrieval == 'defer' else '跳过'}")
+        return short_term_records
+    
+    def run_deferred_long_term_pass(self, user_id: str) -> int:
+        """
+        执行分级检索推迟的长期检索：检索长期记忆并把结果写入短期记忆
+        
+        Args:
+            user_id: 用户ID
+        
+        Returns:
+            写入短期记忆的记录数（无推迟任务时为0）
+        """
+        with self._tiered_lock:
+            pending = self._deferred_long_term.pop(user_id, None)
+        if pending is None:
+            return 0
+        
+        user_content, query_embedding = pending
+        long_term_records = self.retrieve_from_long_term_memory(user_content, user_id, query_embedding=query_embedding)
+        if long_term_records:
+            self._write_short_term(long_term_records)
+        with self._tiered_lock:
+            self._tiered_counts["deferred_run"] += 1
+        return len(long_term_records)
+    
+    def _tiered_stats(self) -> Optional[Dict]:
+        """分级检索统计：短期命中率与长期回退率"""
+        if self.tiered_retrieval == "off":
+            return None
+        with self._tiered_lock:
+            counts = dict(self._tiered_counts)
+            pending = len(self._deferred_long_term)
+        requests = counts.get("requests", 0)
+        return {
+            "mode": self.tiered_retrieval,
+            "requests": requests,
+            "short_term_hits": counts.get("short_term_hits", 0),
+            "long_term_fallbacks": counts.get("long_term_fallbacks", 0),
+            "hit_ratio": round(counts.get("short_term_hits", 0) / requests, 4) if requests else 0.0,
+            "fallback_ratio": round(counts.get("long_term_fallbacks", 0) / requests, 4) if requests else 0.0,
+            "deferred_scheduled": counts.get("deferred_scheduled", 0),
+            "deferred_run": counts.get("deferred_run", 0),
+            "deferred_superseded": counts.get("deferred_superseded", 0),
+            "deferred_pending": pending
+        }
+    
     def _generate_system_prompt(self, records: List[Dict]) -> str:
         """
         生成提示语
@@ -1253,16 +2862,16 @@ class LongShortTermMemorySystem:
             else:
                 stats["long_term_memory"]["total_records"] = 0
             
-            # 统计短期记忆
-            short_term_results = self.chroma_service.get_documents(
-                self.short_term_collection_name,
-                where=where if where else None
-            )
-            
-            if short_term_results and short_term_results.get("metadatas"):
-                stats["short_term_memory"]["total_records"] = len(short_term_results["metadatas"])
-            else:
-                stats["short_term_memory"]["total_records"] = 0
+            # 统计短期记忆（纪元模式下汇总所有纪元集合）
+            stats["short_term_memory"]["total_records"] = 0
+            for collection_name in self.get_short_term_collections():
+                short_term_results = self.chroma_service.get_documents(
+                    collection_name,
+                    where=where if where else None,
+                    include=[]
+                )
+                if short_term_results and short_term_results.get("ids"):
+                    stats["short_term_memory"]["total_records"] += len(short_term_results["ids"])
             
             return stats
             
@@ -1273,78 +2882,570 @@ class LongShortTermMemorySystem:
                 "short_term_memory": {"total_records": 0}
             }
     
+    def _estimate_record_bytes(self, metadatas: List[Dict]) -> int:
+        """
+        估算记录占用的存储字节数：元数据JSON + 文档文本（按元数据中的原文计）+ float32向量
+        """
+        embedding_bytes = self.chroma_service.get_embedding_dimension() * 4
+        total = 0
+        for metadata in metadatas:
+            if not metadata:
+                continue
+            total += len(json.dumps(metadata, ensure_ascii=False).encode("utf-8"))
+            total += len(str(metadata.get("content", "")).encode("utf-8"))
+            total += embedding_bytes
+        return total
+    
+    def _delete_expired_records(self,
+                                collection_name: str,
+                                ids: List[str],
+                                metadatas: List[Dict],
+                                report: CleanupReport,
+                                dry_run: bool = False) -> List[str]:
+        """
+        删除过期父记录并级联删除其分块，把删除数、分块数、释放字节与删除耗时累计到report
+        dry_run时只统计不删除
+        
+        Returns:
+            级联的分块记录ID列表
+        """
+        if not ids:
+            return []
+        started = time.perf_counter()
+        
+        # 分块只写入长期记忆，短期记忆集合无需按 parent_id 查找
+        chunks = None if self._is_short_term_collection(collection_name) else self.chroma_service.get_documents(
+            collection_name,
+            where={"parent_id": {"$in": ids}},
+            include=["metadatas"]
+        )
+        chunk_ids = chunks.get("ids", []) if chunks else []
+        report.chunks += len(chunk_ids)
+        report.bytes_freed += self._estimate_record_bytes(metadatas)
+        report.bytes_freed += self._estimate_record_bytes((chunks.get("metadatas") or []) if chunks else [])
+        
+        if not dry_run:
+            self.chroma_service.delete_documents(collection_name, ids=ids)
+            if chunk_ids:
+                self.chroma_service.delete_documents(collection_name, ids=chunk_ids)
+            self._untrack_expiry(collection_name, ids)
+            self._forget_counters(collection_name, ids)
+            self._bump_write_generation([metadata.get("user_id") for metadata in metadatas if metadata])
+            report.deleted += len(ids)
+        
+        report.delete_ms += (time.perf_counter() - started) * 1000
+        return chunk_ids
+    
     def _cleanup_collection(self, 
                            collection_name: str, 
-                           cooling_rate: CoolingRate, 
-                           threshold: float,
-                           user_id: str = None):
+                           user_id: str = None,
+                           dry_run: bool = False) -> CleanupReport:
         """
         清理指定集合
+        记录的遗忘时刻 expires_at 在写入/更新时已按集合的遗忘速率与阈值以闭式解预先算好，
+        清理只需按 expires_at < now 做一次范围查询再按ID删除，代价与过期记录数成正比而非集合大小
         
         Args:
             collection_name: 集合名称
-            cooling_rate: 遗忘速率
-            threshold: 清理阈值
             user_id: 用户ID，如果提供则只清理该用户的记录
+            dry_run: 只统计将被删除的记录，不实际删除
+        
+        Returns:
+            清理报告（范围查询模式下扫描数即命中的过期记录数，无需衰减计算）
         """
+        report = CleanupReport(collection=collection_name, mode="range", dry_run=dry_run,
+                               started_at=datetime.now().isoformat())
+        started = time.perf_counter()
         try:
             # 🔒 安全检查：构建用户过滤条件
-            where = {}
+            where = None
             if user_id:
-                where["user_id"] = {"$eq": user_id}
+                where = {"user_id": {"$eq": user_id}}
                 logger.info(f"清理集合 {collection_name}，仅处理用户 {user_id} 的记录")
             else:
                 logger.info(f"清理集合 {collection_name}，处理所有用户的记录")
             
-            # 获取记录（支持用户过滤）
-            # 注意：ChromaService.get_documents 不支持 include 参数，总是返回 documents 和 metadatas
-            if user_id:
-                # 用户特定查询，使用 where 过滤
-                all_results = self.chroma_service.get_documents(
-                    collection_name, 
-                    where=where
+            _, records_to_delete, expired_metadatas = self._fetch_expired(
+                collection_name, self._expiry_cutoff(datetime.now().timestamp()), where=where
+            )
+            report.fetch_ms = (time.perf_counter() - started) * 1000
+            report.scanned = report.expired = len(records_to_delete)
+            
+            if records_to_delete:
+                self._delete_expired_records(
+                    collection_name, records_to_delete, expired_metadatas, report, dry_run
                 )
+                action = "可删除" if dry_run else "删除"
+                logger.info(f"集合 {collection_name} {action} {len(records_to_delete)} 条过期记录，"
+                            f"级联分块 {report.chunks} 个，约 {report.bytes_freed} 字节")
             else:
-                # 全库清理，获取所有记录
-                all_results = self.chroma_service.get_documents(
-                    collection_name
-                )
+                logger.info(f"集合 {collection_name} 无需清理")
             
-            if not all_results or not all_results.get("metadatas"):
-                logger.info(f"集合 {collection_name} 中{'用户 ' + user_id + ' 的' if user_id else ''}记录为空，无需清理")
-                return
+            report.total_ms = (time.perf_counter() - started) * 1000
+            return report
+                
+        except Exception as e:
+            logger.error(f"清理集合 {collection_name} 失败: {e}")
+            raise
+    
+    def _fetch_expired(self,
+                       collection_name: str,
+                       now_ts: float,
+                       where: Optional[Dict] = None,
+                       limit: Optional[int] = None,
+                       offset: Optional[int] = None) -> Tuple[int, List[str], List[Dict]]:
+        """
+        按 expires_at < now_ts 范围查询过期记录（分块记录没有 expires_at，不会被取到）
+        开启旁路时ChromaDB中的 expires_at 是下界（回写前或回写失败时偏早），再按旁路中的最新计数复核
+        
+        Args:
+            collection_name: 集合名称
+            now_ts: 判定过期的时间点
+            where: 附加的过滤条件
+            limit: 最多取出的记录数，默认不限
+            offset: 在范围查询结果中的起始位置
+        
+        Returns:
+            (范围查询取到的记录数, 复核后仍过期的记录ID, 对应的元数据)
+        """
+        range_where = {"expires_at": {"$lt": now_ts}}
+        if where:
+            range_where = {"$and": [where, range_where]}
+        expired = self.chroma_service.get_documents(
+            collection_name, where=range_where, limit=limit, offset=offset, include=["metadatas"]
+        )
+        ids = expired.get("ids", []) if expired else []
+        metadatas = (expired.get("metadatas") or []) if expired else []
+        fetched = len(ids)
+        if self.access_counters is not None and ids:
+            metadatas = self._overlay_counters(collection_name, ids, metadatas)
+            still_expired = [
+                i for i, metadata in enumerate(metadatas)
+                if metadata and float(metadata.get("expires_at", now_ts)) < now_ts
+            ]
+            ids = [ids[i] for i in still_expired]
+            metadatas = [metadatas[i] for i in still_expired]
+        return fetched, ids, metadatas
+    
+    def estimate_expired_backlog(self, collection_name: str, limit: int) -> int:
+        """
+        估算集合当前的过期积压（最多数到 limit 条）
+        短期记忆开启过期索引时直接按索引中已到期的条数统计；
+        否则按 expires_at 范围查询，开启旁路时再按最新计数复核，不把被访问续命的记录算作积压
+        
+        Args:
+            collection_name: 集合名称
+            limit: 最多数到的条数，控制采样本身的开销
+        """
+        now_ts = self._expiry_cutoff(datetime.now().timestamp())
+        if self.expiry_index is not None and collection_name == self.short_term_collection_name:
+            return self.expiry_index.count_due(collection_name, now_ts, limit)
+        if self.access_counters is None:
+            result = self.chroma_service.get_documents(
+                collection_name, where={"expires_at": {"$lt": now_ts}}, limit=limit, include=[]
+            )
+            return len(result.get("ids", [])) if result else 0
+        _, expired_ids, _ = self._fetch_expired(collection_name, now_ts, limit=limit)
+        return len(expired_ids)
+    
+    def _find_expired_ids(self,
+                          ids: List[str],
+                          metadatas: List[Dict],
+                          cooling_rate: CoolingRate,
+                          threshold: float,
+                          now_ts: float = None) -> List[str]:
+        """
+        向量化判定一批记录中已过期的记录
+        优先使用预先计算的 expires_at，缺失时（尚未回填的历史记录）按衰减值判定；分块记录跳过
+        
+        Args:
+            ids: 记录ID列表
+            metadatas: 与ids对齐的元数据列表
+            cooling_rate: 遗忘速率
+            threshold: 清理阈值
+            now_ts: 当前时间（epoch秒），默认取当前时间
+        
+        Returns:
+            已过期的记录ID列表
+        """
+        candidate_ids = []
+        expires_values = []
+        valid_counts = []
+        last_updated_values = []
+        for doc_id, metadata in zip(ids, metadatas):
+            # 分块记录随父记录一起清理
+            if not metadata or metadata.get("parent_id"):
+                continue
+            candidate_ids.append(doc_id)
+            expires_at = metadata.get("expires_at")
+            expires_values.append(float(expires_at) if isinstance(expires_at, (int, float)) else np.nan)
+            valid_counts.append(metadata.get("valid_access_count", 1.0))
+            last_updated_values.append(self._timestamp_value(metadata))
+        
+        if not candidate_ids:
+            return []
+        
+        if now_ts is None:
+            now_ts = datetime.now().timestamp()
+        expires_array = np.asarray(expires_values, dtype=np.float64)
+        _, decay_expired = self.newton_helper.calculate_decay_array(
+            valid_counts,
+            self.newton_helper.to_epoch_seconds(last_updated_values),
+            current_time=now_ts,
+            cooling_rate=cooling_rate,
+            threshold=threshold
+        )
+        expired_mask = np.where(np.isnan(expires_array), decay_expired, expires_array < now_ts)
+        return [candidate_ids[i] for i in np.flatnonzero(expired_mask)]
+    
+    def _cleanup_collection_page(self,
+                                 collection_name: str,
+                                 offset: int,
+                                 limit: int,
+                                 dry_run: bool = False) -> Tuple[int, int, CleanupReport]:
+        """
+        增量清理：处理过期范围（expires_at < now）查询结果中 [offset, offset+limit) 的一页记录
+        只访问过期候选而不是整个集合；删除的记录随即离开过期范围，
+        后续页的起点只需跳过复核后仍存活（或dry-run未删除）的记录
+        
+        Args:
+            collection_name: 集合名称
+            offset: 在过期范围中的起始位置
+            limit: 页大小
+            dry_run: 只统计将被删除的记录，不实际删除
+        
+        Returns:
+            (本页取到的过期候选数, 本页保留在过期范围内的记录数, 本页清理报告)
+        """
+        report = CleanupReport(collection=collection_name, mode="page", dry_run=dry_run,
+                               started_at=datetime.now().isoformat())
+        started = time.perf_counter()
+        try:
+            fetched, records_to_delete, metadatas = self._fetch_expired(
+                collection_name, self._expiry_cutoff(datetime.now().timestamp()), limit=limit, offset=offset
+            )
+            report.fetch_ms = (time.perf_counter() - started) * 1000
+            report.scanned = fetched
+            report.expired = len(records_to_delete)
+            
+            if records_to_delete:
+                self._delete_expired_records(collection_name, records_to_delete, metadatas, report, dry_run)
+            kept = fetched if dry_run else fetched - len(records_to_delete)
             
-            records_to_delete = []
+            report.total_ms = (time.perf_counter() - started) * 1000
+            return fetched, kept, report
             
-            for i, metadata in enumerate(all_results["metadatas"]):
-                if not metadata:
-                    continue
+        except Exception as e:
+            logger.error(f"增量清理集合 {collection_name} 失败 (offset={offset}): {e}")
+            raise
+    
+    def _cleanup_partition(self,
+                           collection_name: str,
+                           cooling_rate: CoolingRate,
+                           threshold: float,
+                           buckets: List[int],
+                           page_size: int = 1000,
+                           delete_batch_size: int = 500,
+                           dry_run: bool = False) -> Dict[str, Any]:
+        """
+        清理一个分片（若干用户分桶）内的过期记录
+        先分页只读扫描并向量化判定，扫描结束后再分批删除，避免边删边翻页导致跳页
+        
+        Args:
+            collection_name: 集合名称
+            cooling_rate: 遗忘速率
+            threshold: 清理阈值
+            buckets: 本分片包含的用户分桶编号
+            page_size: 扫描页大小
+            delete_batch_size: 每批删除的记录数
+            dry_run: 只统计将被删除的记录，不实际删除
+        
+        Returns:
+            分片统计：清理报告字段及分桶范围、耗时（毫秒）
+        """
+        report = CleanupReport(collection=collection_name, mode="partition", dry_run=dry_run,
+                               started_at=datetime.now().isoformat())
+        started = time.perf_counter()
+        where = {"user_bucket": {"$in": list(buckets)}}
+        now_ts = self._expiry_cutoff(datetime.now().timestamp())
+        expired_ids = []
+        expired_metadatas = []
+        offset = 0
+        
+        while True:
+            fetch_started = time.perf_counter()
+            page = self.chroma_service.get_documents(
+                collection_name,
+                limit=page_size,
+                offset=offset,
+                where=where,
+                include=["metadatas"]
+            )
+            report.fetch_ms += (time.perf_counter() - fetch_started) * 1000
+            ids = page.get("ids", []) if page else []
+            if not ids:
+                break
+            report.scanned += len(ids)
+            
+            metadatas = self._overlay_counters(collection_name, ids, page.get("metadatas") or [])
+            decay_started = time.perf_counter()
+            page_expired = self._find_expired_ids(ids, metadatas, cooling_rate, threshold, now_ts)
+            report.decay_ms += (time.perf_counter() - decay_started) * 1000
+            if page_expired:
+                metadata_by_id = dict(zip(ids, metadatas))
+                expired_ids.extend(page_expired)
+                expired_metadatas.extend(metadata_by_id[doc_id] for doc_id in page_expired)
+            
+            if len(ids) < page_size:
+                break
+            offset += page_size
+        
+        report.expired = len(expired_ids)
+        for i in range(0, len(expired_ids), delete_batch_size):
+            self._delete_expired_records(
+                collection_name,
+                expired_ids[i:i + delete_batch_size],
+                expired_metadatas[i:i + delete_batch_size],
+                report,
+                dry_run
+            )
+        
+        report.total_ms = (time.perf_counter() - started) * 1000
+        result = report.to_dict()
+        result.update({
+            "buckets": [min(buckets), max(buckets)] if buckets else [],
+            "duration_ms": result["total_ms"]
+        })
+        return result
+    
+    def migrate_timestamp_fields(self, collection_name: str, batch_size: int = 500) -> int:
+        """
+        为历史记录回填数值时间戳字段（last_updated_ts / created_at_ts）、遗忘时刻（expires_at）与用户分桶（user_bucket）
+        分批读取与更新，只改动缺少这些字段的记录，可重复执行
+        
+        Args:
+            collection_name: 集合名称
+            batch_size: 每批处理的记录数
+        
+        Returns:
+            回填的记录数
+        """
+        migrated = 0
+        offset = 0
+        cooling_rate = self._collection_cooling_rate(collection_name)
+        try:
+            while True:
+                page = self.chroma_service.get_documents(
+                    collection_name,
+                    limit=batch_size,
+                    offset=offset,
+                    include=["metadatas"]
+                )
+                ids = page.get("ids", []) if page else []
+                if not ids:
+                    break
                 
-                # 🔒 额外安全检查：确保只处理指定用户的记录（全库清理时跳过此检查）
-                if user_id and not self._validate_user_access(metadata.get("user_id"), user_id, "清理"):
-                    logger.warning(f"发现用户ID不匹配的记录，跳过: {metadata.get('user_id')} != {user_id}")
-                    continue
+                updated_ids = []
+                updated_metadatas = []
+                for doc_id, metadata in zip(ids, page.get("metadatas") or []):
+                    if not metadata:
+                        continue
+                    # 分块记录随父记录级联清理，不需要expires_at
+                    needs_expiry = not metadata.get("parent_id")
+                    if isinstance(metadata.get("last_updated_ts"), (int, float)) and \
+                       isinstance(metadata.get("created_at_ts"), (int, float)) and \
+                       isinstance(metadata.get("user_bucket"), int) and \
+                       (not needs_expiry or isinstance(metadata.get("expires_at"), (int, float))):
+                        continue
+                    updated_metadata = metadata.copy()
+                    updated_metadata["user_bucket"] = self._user_bucket(metadata.get("user_id", ""))
+                    updated_metadata["last_updated_ts"] = self._get_timestamp(metadata, "last_updated")
+                    updated_metadata["created_at_ts"] = self._get_timestamp(metadata, "created_at")
+                    if needs_expiry:
+                        updated_metadata["expires_at"] = self._calculate_expires_at(
+                            metadata.get("valid_access_count", 1.0),
+                            updated_metadata["last_updated_ts"],
+                            cooling_rate
+                        )
+                    updated_ids.append(doc_id)
+                    updated_metadatas.append(updated_metadata)
                 
-                # 计算衰减后的有效访问次数
-                decayed_value = self._calculate_decayed_valid_count(metadata, cooling_rate)
+                if updated_ids:
+                    self.chroma_service.update_documents(
+                        collection_name,
+                        ids=updated_ids,
+                        metadatas=updated_metadatas
+                    )
+                    self._track_expiry(collection_name, updated_ids, updated_metadatas)
+                    migrated += len(updated_ids)
                 
-                # 如果低于阈值，标记为删除
-                if decayed_value < threshold:
-                    doc_id = all_results.get("ids", [])[i] if all_results.get("ids") and i < len(all_results["ids"]) else f"unknown_{i}"
-                    records_to_delete.append(doc_id)
+                if len(ids) < batch_size:
+                    break
+                offset += batch_size
             
-            # 删除标记的记录
-            if records_to_delete:
-                logger.info(f"集合 {collection_name} 需要删除 {len(records_to_delete)} 条记录")
-                self.chroma_service.delete_documents(collection_name, ids=records_to_delete)
-            else:
-                logger.info(f"集合 {collection_name} 无需清理")
+            logger.info(f"集合 {collection_name} 时间戳字段回填完成，共 {migrated} 条")
+            return migrated
+            
+        except Exception as e:
+            logger.error(f"集合 {collection_name} 时间戳字段回填失败（已回填 {migrated} 条）: {e}")
+            raise
+    
+    def rebuild_expiry_index(self, batch_size: int = 1000) -> int:
+        """
+        从存储重建短期记忆过期索引（启动时调用，进程内索引不随重启保留）
+        
+        Args:
+            batch_size: 每批读取的记录数
+        
+        Returns:
+            登记到索引的记录数
+        """
+        if self.expiry_index is None:
+            return 0
+        
+        try:
+            collection_name = self.short_term_collection_name
+            self.expiry_index.clear(collection_name)
+            indexed = 0
+            offset = 0
+            
+            while True:
+                page = self.chroma_service.get_documents(
+                    collection_name,
+                    limit=batch_size,
+                    offset=offset,
+                    include=["metadatas"]
+                )
+                ids = page.get("ids", []) if page else []
+                if not ids:
+                    break
+                
+                metadatas = self._overlay_counters(collection_name, ids, page.get("metadatas") or [])
+                self._track_expiry(collection_name, ids, metadatas)
+                indexed += sum(
+                    1 for metadata in metadatas
+                    if metadata and isinstance(metadata.get("expires_at"), (int, float))
+                )
                 
+                if len(ids) < batch_size:
+                    break
+                offset += batch_size
+            
+            logger.info(f"短期记忆过期索引重建完成: {indexed} 条记录")
+            return indexed
+            
         except Exception as e:
-            logger.error(f"清理集合 {collection_name} 失败: {e}")
+            logger.error(f"重建短期记忆过期索引失败: {e}")
+            raise
+    
+    def sync_expiry_index(self, horizon_seconds: float, batch_size: int = 1000) -> int:
+        """
+        从存储补登记即将到期的短期记忆（expires_at <= now + horizon_seconds）
+        多worker部署时各进程只把自己写入的记录登记到本进程索引，leader定期按遗忘时刻范围查询补齐，
+        其他worker写入的记录同样能在到期后及时删除，而不必等待兜底扫描
+        
+        Args:
+            horizon_seconds: 向前看的时间窗口（秒），应不小于同步间隔
+            batch_size: 每批读取的记录数
+        
+        Returns:
+            新登记或刷新的记录数
+        """
+        if self.expiry_index is None:
+            return 0
+        
+        try:
+            collection_name = self.short_term_collection_name
+            where = {"expires_at": {"$lte": datetime.now().timestamp() + horizon_seconds}}
+            synced = 0
+            offset = 0
+            
+            while True:
+                page = self.chroma_service.get_documents(
+                    collection_name,
+                    where=where,
+                    limit=batch_size,
+                    offset=offset,
+                    include=["metadatas"]
+                )
+                ids = page.get("ids", []) if page else []
+                if not ids:
+                    break
+                
+                # ChromaDB中的expires_at是下界，登记旁路中的最新值
+                metadatas = self._overlay_counters(collection_name, ids, page.get("metadatas") or [])
+                synced += self._track_expiry(collection_name, ids, metadatas)
+                
+                if len(ids) < batch_size:
+                    break
+                offset += batch_size
+            
+            if synced:
+                logger.debug(f"短期记忆过期索引从存储补登记 {synced} 条")
+            return synced
+            
+        except Exception as e:
+            logger.error(f"同步短期记忆过期索引失败: {e}")
+            raise
+    
+    def expire_due_records(self, limit: int = 100) -> List[str]:
+        """
+        删除过期索引中已到期的一批短期记忆记录
+        删除前按存储中的最新元数据复核（其他进程可能已刷新访问），未过期的记录按新的遗忘时刻重新登记
+        
+        Args:
+            limit: 本批最多处理的记录数
+        
+        Returns:
+            被删除的记录ID列表
+        """
+        if self.expiry_index is None:
+            return []
+        
+        collection_name = self.short_term_collection_name
+        due_ids = self.expiry_index.pop_due(limit=limit).get(collection_name, [])
+        if not due_ids:
+            return []
+        
+        now_ts = self._expiry_cutoff(datetime.now().timestamp())
+        try:
+            current = self.chroma_service.get_documents(
+                collection_name,
+                ids=due_ids,
+                include=["metadatas"]
+            )
+            ids = current.get("ids", []) if current else []
+            metadatas = self._overlay_counters(collection_name, ids, (current.get("metadatas") or []) if current else [])
+            
+            expired_ids = self._find_expired_ids(
+                ids, metadatas, CoolingRate.MINUTES_20, self.short_term_threshold, now_ts
+            )
+            
+            if expired_ids:
+                metadata_by_id = dict(zip(ids, metadatas))
+                self._delete_expired_records(
+                    collection_name,
+                    expired_ids,
+                    [metadata_by_id[doc_id] for doc_id in expired_ids],
+                    CleanupReport(collection=collection_name, mode="expiry")
+                )
+                logger.debug(f"过期索引触发删除 {len(expired_ids)} 条短期记忆")
+            
+            # 复核未过期的记录重新登记
+            expired_set = set(expired_ids)
+            self._track_expiry(
+                collection_name,
+                [doc_id for doc_id in ids if doc_id not in expired_set],
+                [metadata for doc_id, metadata in zip(ids, metadatas) if doc_id not in expired_set]
+            )
+            return expired_ids
+            
+        except Exception as e:
+            # 删除失败时放回索引，下一轮重试
+            self.expiry_index.push_many(collection_name, [(doc_id, now_ts) for doc_id in due_ids])
+            logger.error(f"过期索引批量删除失败: {e}")
             raise
     
- 
     def clear_user_history(self, user_id: str) -> Dict[str, int]:
         """
         清空指定用户的所有历史记录
@@ -1355,9 +3456,17 @@ class LongShortTermMemorySystem:
         Returns:
             删除记录统计信息
         """
+        # 先写完写回队列，避免清空后排队中的写入又把记录写回来
+        self.flush_pending_writes()
         try:
             logger.info(f"开始清空用户 {user_id} 的所有历史记录")
             
+            for collection_name in (self.long_term_collection_name, self.short_term_collection_name):
+                if self.centroid_cache is not None:
+                    self.centroid_cache.invalidate(self._centroid_cache_key(collection_name, user_id))
+                if self.retrieval_sizer is not None:
+                    self.retrieval_sizer.invalidate(f"{collection_name}:{user_id}")
+            
             # 构建用户过滤条件
             where = {"user_id": {"$eq": user_id}}
             
@@ -1375,6 +3484,7 @@ class LongShortTermMemorySystem:
                     where=where
                 )
                 logger.info(f"长期记忆库清理结果: 删除了 {len(long_term_deleted_ids)} 条记录")
+                self._forget_counters(self.long_term_collection_name, long_term_deleted_ids)
                 
                 # 获取删除前的记录数量
                 long_term_count_result = self.chroma_service.get_documents(
@@ -1387,25 +3497,23 @@ class LongShortTermMemorySystem:
             except Exception as e:
                 logger.error(f"清空长期记忆库失败: {e}")
             
-            # 2. 清空短期记忆库中该用户的记录
+            # 2. 清空短期记忆库中该用户的记录（纪元模式下逐个纪元集合清空）
             try:
-                short_term_deleted_ids = self.chroma_service.delete_documents(
-                    self.short_term_collection_name,
-                    where=where
-                )
-                logger.info(f"短期记忆库清理结果: 删除了 {len(short_term_deleted_ids)} 条记录")
-                
-                # 获取删除前的记录数量
-                short_term_count_result = self.chroma_service.get_documents(
-                    self.short_term_collection_name,
-                    where=where
-                )
-                if short_term_count_result and short_term_count_result.get("metadatas"):
-                    stats["short_term_deleted"] = len(short_term_count_result["metadatas"])
+                for collection_name in self.get_short_term_collections():
+                    short_term_deleted_ids = self.chroma_service.delete_documents(
+                        collection_name,
+                        where=where
+                    )
+                    logger.info(f"短期记忆库 {collection_name} 清理结果: 删除了 {len(short_term_deleted_ids)} 条记录")
+                    self._untrack_expiry(collection_name, short_term_deleted_ids)
+                    self._forget_counters(collection_name, short_term_deleted_ids)
+                    stats["short_term_deleted"] += len(short_term_deleted_ids)
                 
             except Exception as e:
                 logger.error(f"清空短期记忆库失败: {e}")
             
+            self._bump_write_generation([user_id])
+            
             # 计算总删除数量
             stats["total_deleted"] = stats["long_term_deleted"] + stats["short_term_deleted"]
             
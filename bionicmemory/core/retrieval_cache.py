@@ -0,0 +1,144 @@
+"""
+检索结果缓存
+重试请求、重新生成回复与短时间内的重复提问会重复执行整条检索链路（长期检索、聚类、短期写入、短期检索、聚类）
+按 (用户, 内容哈希) 缓存抑制后的记录列表与生成的提示语；query embedding 由内容确定性计算，内容哈希即可唯一确定查询
+
+失效依赖写代次（generation）：该用户的任意新增、更新或删除都会递增其代次，
+无法确定归属用户的批量删除（如纪元轮换、清空短期记忆）递增全局代次；
+缓存项记录写入时的 (全局代次, 用户代次)，读取时不一致即视为过期，另有TTL与LRU容量上限兜底
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class RetrievalCache:
+    """
+    检索结果缓存（LRU + TTL + 写代次失效）
+    线程安全
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        """
+        初始化检索结果缓存
+
+        Args:
+            max_entries: 最多缓存的条目数，超出时淘汰最久未使用的
+            ttl_seconds: 缓存项有效期（秒）
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Tuple[int, int], float, Any]]" = OrderedDict()
+        self._user_generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def generation(self, user_id: str) -> Tuple[int, int]:
+        """
+        获取用户当前的写代次
+
+        Returns:
+            (全局代次, 用户代次)
+        """
+        with self._lock:
+            return self._global_generation, self._user_generations.get(user_id, 0)
+
+    def bump(self, user_ids: Iterable[Optional[str]]):
+        """
+        递增用户写代次（该用户的缓存项随即失效）
+
+        Args:
+            user_ids: 发生写入的用户ID
+        """
+        with self._lock:
+            for user_id in set(user_ids):
+                if user_id:
+                    self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+
+    def bump_all(self):
+        """递增全局写代次（全部缓存项随即失效）"""
+        with self._lock:
+            self._global_generation += 1
+
+    def get(self, user_id: str, key: str) -> Optional[Any]:
+        """
+        读取缓存项，写代次不一致或超过TTL时返回None
+
+        Args:
+            user_id: 用户ID
+            key: 查询键（内容哈希）
+        """
+        with self._lock:
+            cache_key = (user_id, key)
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            generation, stored_at, value = entry
+            current = (self._global_generation, self._user_generations.get(user_id, 0))
+            if generation != current:
+                del self._entries[cache_key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[cache_key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return value
+
+    def put(self, user_id: str, key: str, value: Any, generation: Tuple[int, int]):
+        """
+        写入缓存项
+
+        Args:
+            user_id: 用户ID
+            key: 查询键（内容哈希）
+            value: 缓存值
+            generation: 计算结果所对应的写代次（需在检索链路自身的写入完成后获取）
+        """
+        with self._lock:
+            self._entries[(user_id, key)] = (generation, time.monotonic(), value)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存统计
+
+        Returns:
+            条目数、命中/未命中次数、因写代次或TTL失效的次数与命中率
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidated_by_write": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "global_generation": self._global_generation
+            }
@@ -0,0 +1,197 @@
+"""
+自适应检索规模
+按用户在集合中的记录数收缩检索条数与聚类数：用户记录很少时不再向ChromaDB请求固定的 t*k*n 条，
+候选数低于阈值时跳过聚类；并根据候选距离分布的离散度（EMA）下调检索倍数——
+候选与查询的距离越分散，说明候选之间冗余越少，无需大量超额检索再做抑制
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class RetrievalSizer:
+    """
+    自适应检索规模规划器
+    维护按 (集合, 用户) 的记录数缓存（带TTL，写入时增量累加）与候选距离离散度EMA
+    """
+
+    def __init__(self,
+                 count_ttl_seconds: float = 300.0,
+                 min_cluster_candidates: int = 12,
+                 diversity_target: float = 0.08,
+                 min_scale: float = 0.5,
+                 ema_alpha: float = 0.3,
+                 max_keys: int = 4096):
+        """
+        初始化规划器
+
+        Args:
+            count_ttl_seconds: 记录数缓存有效期（秒），过期后重新统计
+            min_cluster_candidates: 候选数不超过该值时跳过聚类
+            diversity_target: 距离标准差的参考值，EMA超过该值时按比例下调检索倍数
+            min_scale: 检索倍数的最小缩放比例
+            ema_alpha: 离散度EMA的平滑系数
+            max_keys: 最多跟踪的 (集合, 用户) 数，超出时按LRU淘汰
+        """
+        self.count_ttl_seconds = count_ttl_seconds
+        self.min_cluster_candidates = min_cluster_candidates
+        self.diversity_target = diversity_target
+        self.min_scale = min_scale
+        self.ema_alpha = ema_alpha
+        self.max_keys = max(1, max_keys)
+
+        self._counts: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._diversity: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.plans = 0
+        self.capped = 0
+        self.scaled = 0
+        self.clustering_skipped = 0
+        self.count_refreshes = 0
+        self.candidates_requested = 0
+        self.candidates_baseline = 0
+
+    def get_count(self, key: str) -> Optional[int]:
+        """
+        获取缓存的记录数，未缓存或已过期返回None
+
+        Args:
+            key: 集合名:用户ID
+        """
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is None:
+                return None
+            count, refreshed_at = cached
+            if time.monotonic() - refreshed_at > self.count_ttl_seconds:
+                del self._counts[key]
+                return None
+            self._counts.move_to_end(key)
+            return count
+
+    def set_count(self, key: str, count: int):
+        """写入重新统计得到的记录数"""
+        with self._lock:
+            self._counts[key] = (max(0, int(count)), time.monotonic())
+            self._counts.move_to_end(key)
+            self.count_refreshes += 1
+            while len(self._counts) > self.max_keys:
+                self._counts.popitem(last=False)
+
+    def increment(self, key: str, delta: int):
+        """写入新记录时累加缓存的记录数（未缓存时忽略，等下次统计）"""
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None:
+                self._counts[key] = (max(0, cached[0] + delta), cached[1])
+
+    def invalidate(self, key: Optional[str] = None):
+        """
+        失效记录数与离散度
+
+        Args:
+            key: 指定键，默认清空全部
+        """
+        with self._lock:
+            if key is None:
+                self._counts.clear()
+                self._diversity.clear()
+            else:
+                self._counts.pop(key, None)
+                self._diversity.pop(key, None)
+
+    def observe_distances(self, key: str, distances: List[Optional[float]]):
+        """
+        以本次候选的距离标准差更新离散度EMA
+
+        Args:
+            key: 集合名:用户ID
+            distances: 候选与查询的距离列表
+        """
+        values = np.asarray([d for d in distances if d is not None], dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) < 2:
+            return
+        spread = float(values.std())
+        with self._lock:
+            previous = self._diversity.get(key)
+            self._diversity[key] = spread if previous is None else (1 - self.ema_alpha) * previous + self.ema_alpha * spread
+            self._diversity.move_to_end(key)
+            while len(self._diversity) > self.max_keys:
+                self._diversity.popitem(last=False)
+
+    def diversity_scale(self, key: str) -> float:
+        """离散度对应的检索倍数缩放比例（1.0表示不缩放）"""
+        with self._lock:
+            ema = self._diversity.get(key)
+        if ema is None or ema <= self.diversity_target:
+            return 1.0
+        return max(self.min_scale, self.diversity_target / ema)
+
+    def plan(self,
+             key: str,
+             record_count: Optional[int],
+             total_retrieval: int,
+             cluster_count: int,
+             cluster_multiplier: int) -> Tuple[int, int, bool]:
+        """
+        规划本次检索规模
+
+        Args:
+            key: 集合名:用户ID
+            record_count: 用户在集合中的记录数（未知时为None）
+            total_retrieval: 默认检索条数
+            cluster_count: 默认聚类数
+            cluster_multiplier: 每簇期望记录数
+
+        Returns:
+            (检索条数, 聚类数, 是否跳过聚类)
+        """
+        scale = self.diversity_scale(key)
+        n_results = max(1, int(math.ceil(total_retrieval * scale)))
+        clusters = max(1, int(math.ceil(cluster_count * scale)))
+        capped = record_count is not None and record_count < n_results
+        if capped:
+            n_results = record_count
+            clusters = min(clusters, max(1, int(math.ceil(n_results / max(1, cluster_multiplier)))))
+        skip_clustering = n_results <= self.min_cluster_candidates
+
+        with self._lock:
+            self.plans += 1
+            self.candidates_requested += n_results
+            self.candidates_baseline += total_retrieval
+            if capped:
+                self.capped += 1
+            if scale < 1.0:
+                self.scaled += 1
+            if skip_clustering:
+                self.clustering_skipped += 1
+        return n_results, clusters, skip_clustering
+
+    def get_stats(self) -> Dict:
+        """
+        获取规划统计
+
+        Returns:
+            规划次数、按记录数封顶/按离散度缩放/跳过聚类的次数，以及实际与默认请求的候选总数
+        """
+        with self._lock:
+            return {
+                "plans": self.plans,
+                "capped_by_count": self.capped,
+                "scaled_by_diversity": self.scaled,
+                "clustering_skipped": self.clustering_skipped,
+                "count_refreshes": self.count_refreshes,
+                "tracked_counts": len(self._counts),
+                "candidates_requested": self.candidates_requested,
+                "candidates_baseline": self.candidates_baseline
+            }
@@ -0,0 +1,119 @@
+"""
+消息处理分阶段耗时统计
+按阶段记录最近若干次的耗时（毫秒），并记录整条请求的墙钟耗时（关键路径）与各阶段耗时之和：
+串行执行时两者接近，流水线并行时墙钟耗时小于阶段之和，差值即为重叠掉的时间
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+import numpy as np
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class StageTimings:
+    """
+    分阶段耗时统计（每个阶段保留最近 window 个样本）
+    线程安全：流水线中的后台阶段在工作线程内记录
+    """
+
+    def __init__(self, window: int = 512):
+        """
+        初始化耗时统计
+
+        Args:
+            window: 每个阶段保留的最近样本数
+        """
+        self.window = max(1, window)
+        self._stages: Dict[str, Deque[float]] = {}
+        self._requests: Dict[str, Dict[str, Deque[float]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, elapsed_ms: float):
+        """记录一个阶段的耗时"""
+        with self._lock:
+            samples = self._stages.get(stage)
+            if samples is None:
+                samples = self._stages[stage] = deque(maxlen=self.window)
+            samples.append(elapsed_ms)
+
+    @contextmanager
+    def stage(self, stage: str, spans: Optional[Dict[str, float]] = None):
+        """
+        计时上下文：退出时记录该阶段耗时
+
+        Args:
+            stage: 阶段名
+            spans: 可选的本次请求阶段耗时字典，同时写入其中（用于累计阶段之和）
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.record(stage, elapsed_ms)
+            if spans is not None:
+                spans[stage] = spans.get(stage, 0.0) + elapsed_ms
+
+    def record_request(self, mode: str, wall_ms: float, spans: Dict[str, float]):
+        """
+        记录一次完整请求
+
+        Args:
+            mode: 执行方式（sequential / pipelined / write_behind）
+            wall_ms: 请求的墙钟耗时（关键路径）
+            spans: 本次请求各阶段耗时
+        """
+        with self._lock:
+            series = self._requests.get(mode)
+            if series is None:
+                series = self._requests[mode] = {
+                    "wall": deque(maxlen=self.window),
+                    "stage_sum": deque(maxlen=self.window)
+                }
+            series["wall"].append(wall_ms)
+            series["stage_sum"].append(sum(spans.values()))
+
+    @staticmethod
+    def _summarize(samples) -> Dict:
+        values = np.asarray(samples, dtype=np.float64)
+        return {
+            "count": int(len(values)),
+            "p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p95_ms": round(float(np.percentile(values, 95)), 3),
+            "mean_ms": round(float(values.mean()), 3)
+        }
+
+    def get_stats(self) -> Dict:
+        """
+        获取耗时统计
+
+        Returns:
+            各阶段的 p50/p95/均值，以及按执行方式统计的墙钟耗时、阶段耗时之和与重叠比例
+        """
+        with self._lock:
+            stages = {name: list(samples) for name, samples in self._stages.items() if samples}
+            requests = {
+                mode: {key: list(samples) for key, samples in series.items()}
+                for mode, series in self._requests.items() if series["wall"]
+            }
+
+        request_stats = {}
+        for mode, series in requests.items():
+            wall = self._summarize(series["wall"])
+            stage_sum = self._summarize(series["stage_sum"])
+            total_sum = sum(series["stage_sum"])
+            request_stats[mode] = {
+                "critical_path": wall,
+                "stage_sum": stage_sum,
+                "overlap_ratio": round(1.0 - sum(series["wall"]) / total_sum, 4) if total_sum > 0 else 0.0
+            }
+        return {
+            "stages": {name: self._summarize(samples) for name, samples in stages.items()},
+            "requests": request_stats
+        }
@@ -0,0 +1,193 @@
+"""
+记忆写入的后台写回（write-behind）队列
+聊天轮次中的长期入库与短期批量更新只需对后续轮次可见，不必计入本轮延迟：
+写操作进入有界队列，由后台线程批量取出交给处理函数（处理函数负责合并同批次内的写入）；
+队列满时提交方阻塞等待（背压），关闭时先写完队列中的全部操作再退出
+
+写入失败的操作按退避间隔有限次重试（处理函数返回失败的操作时只重试这些，抛出异常时重试整批），
+仍失败的操作计入 failed 后丢弃；重试是至少一次语义，部分写入成功的批次重试时访问计数可能多累加一次
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class WriteBehindQueue:
+    """
+    有界写回队列 + 单个后台刷写线程
+    写操作为 (类型, 数据) 二元组，按提交顺序成批交给 apply_batch
+    """
+
+    def __init__(self,
+                 apply_batch: Callable[[List[Tuple[str, Any]]], Optional[List[Tuple[str, Any]]]],
+                 max_pending: int = 1024,
+                 batch_size: int = 64,
+                 max_retries: int = 2,
+                 retry_delay_seconds: float = 0.5,
+                 name: str = "memory-write-behind"):
+        """
+        初始化写回队列并启动刷写线程
+
+        Args:
+            apply_batch: 批量执行写操作的函数（按提交顺序接收一批 (类型, 数据)），
+                         返回写入失败的操作列表（全部成功时返回None或空列表），抛出异常视为整批失败
+            max_pending: 队列容量，满时提交方阻塞
+            batch_size: 每批最多取出的写操作数
+            max_retries: 失败操作的最大重试次数（0为不重试）
+            retry_delay_seconds: 首次重试前的等待秒数，之后每次翻倍
+            name: 刷写线程名
+        """
+        self.apply_batch = apply_batch
+        self.max_pending = max(1, max_pending)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max(0, max_retries)
+        self.retry_delay_seconds = retry_delay_seconds
+
+        self._pending: Deque[Tuple[str, Any]] = deque()
+        self._in_flight = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._counts = Counter()
+        self._flush_ms_total = 0.0
+        self._last_error: Optional[str] = None
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, payload: Any):
+        """
+        提交一个写操作（队列满时阻塞直到有空位）
+
+        Args:
+            kind: 写操作类型
+            payload: 写操作数据
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("写回队列已关闭")
+            if len(self._pending) >= self.max_pending:
+                self._counts["blocked"] += 1
+                while len(self._pending) >= self.max_pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    raise RuntimeError("写回队列已关闭")
+            self._pending.append((kind, payload))
+            self._counts["submitted"] += 1
+            self._condition.notify_all()
+
+    def _run(self):
+        """刷写线程：成批取出写操作并执行，失败的操作有限次重试后记录日志并继续"""
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending and self._closed:
+                    return
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                self._in_flight = len(batch)
+                self._condition.notify_all()
+
+            started = time.perf_counter()
+            failed = self._apply_with_retry(batch)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with self._condition:
+                self._in_flight = 0
+                self._counts["batches"] += 1
+                self._counts["applied"] += len(batch) - len(failed)
+                self._counts["failed"] += len(failed)
+                self._flush_ms_total += elapsed_ms
+                self._condition.notify_all()
+
+    def _apply_with_retry(self, batch: List[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+        """
+        执行一批写操作，失败的操作按退避间隔重试
+
+        Returns:
+            重试耗尽后仍失败（被丢弃）的写操作
+        """
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.retry_delay_seconds * (2 ** (attempt - 1)))
+                with self._condition:
+                    self._counts["retried"] += len(pending)
+            try:
+                pending = list(self.apply_batch(pending) or [])
+            except Exception as e:
+                with self._condition:
+                    self._last_error = str(e)
+                logger.warning(f"写回队列批量写入失败（{len(pending)} 个写操作，第 {attempt + 1} 次）: {e}")
+                continue
+            if not pending:
+                return []
+            with self._condition:
+                self._last_error = f"{len(pending)} 个写操作写入失败"
+            logger.warning(f"写回队列 {len(pending)} 个写操作写入失败（第 {attempt + 1} 次）")
+        logger.error(f"写回队列 {len(pending)} 个写操作重试 {self.max_retries} 次后仍失败，已丢弃")
+        return pending
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待队列中已提交的写操作全部执行完
+
+        Args:
+            timeout: 最长等待秒数，默认一直等待
+
+        Returns:
+            是否在超时前写完
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: float = None):
+        """
+        关闭队列：不再接受新写操作，写完剩余操作后停止刷写线程
+
+        Args:
+            timeout: 最长等待秒数，默认一直等待
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"写回队列关闭超时，仍有 {len(self._pending)} 个写操作未写入")
+        else:
+            logger.info("写回队列已写完并关闭")
+
+    def get_stats(self) -> Dict:
+        """
+        获取队列统计
+
+        Returns:
+            待写入数、已提交/已写入/重试/失败（重试耗尽后丢弃）的写操作数、最近一次错误、
+            批次数、平均批大小、背压阻塞次数与平均每批耗时
+        """
+        with self._condition:
+            batches = self._counts["batches"]
+            done = self._counts["applied"] + self._counts["failed"]
+            return {
+                "pending": len(self._pending) + self._in_flight,
+                "max_pending": self.max_pending,
+                "submitted": self._counts["submitted"],
+                "applied": self._counts["applied"],
+                "retried": self._counts["retried"],
+                "failed": self._counts["failed"],
+                "last_error": self._last_error,
+                "batches": batches,
+                "avg_batch_size": round(done / batches, 2) if batches else 0.0,
+                "blocked_submits": self._counts["blocked"],
+                "avg_flush_ms": round(self._flush_ms_total / batches, 3) if batches else 0.0
+            }
@@ -0,0 +1,258 @@
+"""
+ChromaDB写入合并（group commit）
+并发请求各自发出的小批量 add / update / 按ID delete 先进入按集合划分的待写队列，
+由后台线程在短暂等待（或待写记录数达到阈值）后合并成少量批量调用，降低持久化存储的写入次数
+
+顺序保证：同一集合内的写操作被分为若干段，每段只含同一种写操作且段内ID不重复，各段按顺序执行；
+写操作只会被放在其ID此前所有写操作所在段之后，因此同一ID上的写操作顺序与提交顺序一致；
+调用方通过返回的Future等待完成或获取异常
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class PendingWrite:
+    """待合并的单个写操作"""
+
+    __slots__ = ("operation", "ids", "documents", "embeddings", "metadatas", "future", "enqueued_at")
+
+    def __init__(self,
+                 operation: str,
+                 ids: List[str],
+                 documents: Optional[List[str]],
+                 embeddings: Optional[List[List[float]]],
+                 metadatas: Optional[List[Dict[str, Any]]]):
+        self.operation = operation
+        self.ids = list(ids)
+        self.documents = documents
+        self.embeddings = embeddings
+        self.metadatas = metadatas
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def signature(self) -> Tuple[str, bool, bool, bool]:
+        """可合并进同一次调用的写操作签名（操作类型与各可选列是否提供必须一致）"""
+        return (
+            self.operation,
+            self.documents is not None,
+            self.embeddings is not None,
+            self.metadatas is not None
+        )
+
+class WriteCoalescer:
+    """
+    按集合合并写操作的后台线程
+    execute(collection_name, operation, columns) 执行一次批量写入，columns 含 ids / documents / embeddings / metadatas
+    """
+
+    def __init__(self,
+                 execute: Callable[[str, str, Dict[str, Optional[list]]], None],
+                 max_delay_ms: float = 5.0,
+                 max_batch_records: int = 256):
+        """
+        初始化写入合并器并启动后台线程
+
+        Args:
+            execute: 执行一次批量写入的函数
+            max_delay_ms: 写操作最长等待合并的时间（毫秒）
+            max_batch_records: 单次批量调用的最大记录数，某集合待写记录数达到该值时立即写入
+        """
+        self.execute = execute
+        self.max_delay = max(0.0, max_delay_ms) / 1000.0
+        self.max_batch_records = max(1, max_batch_records)
+
+        self._pending: Dict[str, List[PendingWrite]] = {}
+        self._pending_records: Counter = Counter()
+        self._in_flight = 0
+        self._force = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._counts = Counter()
+
+        self._thread = threading.Thread(target=self._run, name="chroma-write-coalescer", daemon=True)
+        self._thread.start()
+
+    def submit(self,
+               collection_name: str,
+               operation: str,
+               ids: List[str],
+               documents: Optional[List[str]] = None,
+               embeddings: Optional[List[List[float]]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None) -> Future:
+        """
+        提交一个写操作
+
+        Args:
+            collection_name: 集合名称
+            operation: 写操作类型（add / update / delete）
+            ids: 文档ID列表
+            documents: 文档内容列表
+            embeddings: embedding列表
+            metadatas: 元数据列表
+
+        Returns:
+            写入完成时结束的Future（失败时携带异常）
+        """
+        write = PendingWrite(operation, ids, documents, embeddings, metadatas)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("写入合并器已关闭")
+            self._pending.setdefault(collection_name, []).append(write)
+            self._pending_records[collection_name] += len(write.ids)
+            self._counts["submitted"] += 1
+            self._counts["submitted_records"] += len(write.ids)
+            self._condition.notify_all()
+        return write.future
+
+    def _due_collections(self, now: float) -> List[str]:
+        """已到期（等待超时、记录数达到阈值、被要求刷写或正在关闭）的集合"""
+        return [
+            name for name, writes in self._pending.items()
+            if writes and (
+                self._closed or self._force
+                or self._pending_records[name] >= self.max_batch_records
+                or now - writes[0].enqueued_at >= self.max_delay
+            )
+        ]
+
+    def _run(self):
+        """后台线程：等待到期的集合，取出其待写操作并按段执行"""
+        while True:
+            with self._condition:
+                while True:
+                    due = self._due_collections(time.monotonic())
+                    if due:
+                        break
+                    if self._closed and not any(self._pending.values()):
+                        return
+                    waiting = [writes[0].enqueued_at for writes in self._pending.values() if writes]
+                    timeout = max(0.0, min(waiting) + self.max_delay - time.monotonic()) if waiting else None
+                    self._condition.wait(timeout)
+
+                batches = [(name, self._pending.pop(name)) for name in due]
+                for name in due:
+                    self._in_flight += self._pending_records.pop(name, 0)
+
+            for collection_name, writes in batches:
+                for segment in self._segments(writes):
+                    self._execute_segment(collection_name, segment)
+
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def _segments(self, writes: List[PendingWrite]) -> List[List[PendingWrite]]:
+        """
+        把待写操作分段：每段签名一致、段内ID不重复、记录数不超过上限，各段按顺序执行
+        写操作放入其ID最后一次出现的段之后、签名相同且有容量的第一个段，没有则新开一段，
+        因此同一ID上的写操作仍按提交顺序执行，不同ID的同类写操作可跨越其他类型合并
+        """
+        segments: List[List[PendingWrite]] = []
+        segment_records: List[int] = []
+        last_segment: Dict[str, int] = {}
+        for write in writes:
+            after = max((last_segment.get(doc_id, -1) for doc_id in write.ids), default=-1)
+            target = None
+            for index in range(after + 1, len(segments)):
+                if (segments[index][0].signature == write.signature
+                        and segment_records[index] + len(write.ids) <= self.max_batch_records):
+                    target = index
+                    break
+            if target is None:
+                segments.append([])
+                segment_records.append(0)
+                target = len(segments) - 1
+            segments[target].append(write)
+            segment_records[target] += len(write.ids)
+            for doc_id in write.ids:
+                last_segment[doc_id] = target
+        return segments
+
+    @staticmethod
+    def _columns(writes: List[PendingWrite]) -> Dict[str, Optional[list]]:
+        """把一段写操作的各列拼接为一次批量调用的参数"""
+        first = writes[0]
+        return {
+            "ids": [doc_id for write in writes for doc_id in write.ids],
+            "documents": [d for write in writes for d in write.documents] if first.documents is not None else None,
+            "embeddings": [e for write in writes for e in write.embeddings] if first.embeddings is not None else None,
+            "metadatas": [m for write in writes for m in write.metadatas] if first.metadatas is not None else None
+        }
+
+    def _execute_segment(self, collection_name: str, segment: List[PendingWrite]):
+        """执行一段写操作；合并调用失败时逐个重试，使异常只落在出错的写操作上"""
+        try:
+            self.execute(collection_name, segment[0].operation, self._columns(segment))
+            for write in segment:
+                write.future.set_result(write.ids)
+            with self._condition:
+                self._counts["calls"] += 1
+                self._counts["coalesced"] += len(segment)
+            return
+        except Exception as e:
+            if len(segment) == 1:
+                logger.error(f"合并写入失败: 集合={collection_name} 操作={segment[0].operation}, 错误: {e}")
+                segment[0].future.set_exception(e)
+                with self._condition:
+                    self._counts["calls"] += 1
+                    self._counts["failed"] += 1
+                return
+            logger.warning(f"合并写入失败，逐个重试 {len(segment)} 个写操作: 集合={collection_name}, 错误: {e}")
+
+        for write in segment:
+            self._execute_segment(collection_name, [write])
+
+    def flush(self, collection_name: Optional[str] = None):
+        """
+        立即写入并等待完成
+
+        Args:
+            collection_name: 只等待该集合的待写操作，默认等待全部
+        """
+        with self._condition:
+            self._force += 1
+            self._condition.notify_all()
+            try:
+                while self._in_flight or (
+                    self._pending.get(collection_name) if collection_name is not None
+                    else any(self._pending.values())
+                ):
+                    self._condition.wait()
+            finally:
+                self._force -= 1
+
+    def close(self):
+        """写完全部待写操作后停止后台线程"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        logger.info("Chroma写入合并器已关闭")
+
+    def get_stats(self) -> Dict:
+        """
+        获取合并统计
+
+        Returns:
+            提交的写操作数与记录数、实际批量调用次数、平均每次调用合并的写操作数、失败数与待写记录数
+        """
+        with self._condition:
+            calls = self._counts["calls"]
+            return {
+                "max_delay_ms": round(self.max_delay * 1000, 3),
+                "max_batch_records": self.max_batch_records,
+                "submitted_writes": self._counts["submitted"],
+                "submitted_records": self._counts["submitted_records"],
+                "store_calls": calls,
+                "writes_per_call": round(self._counts["coalesced"] / calls, 2) if calls else 0.0,
+                "failed": self._counts["failed"],
+                "pending_records": sum(self._pending_records.values()) + self._in_flight
+            }
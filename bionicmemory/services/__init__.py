@@ -3,8 +3,10 @@
 
 包含仿生记忆系统的各种服务：
 - 摘要生成服务
+- 抽取式摘要服务
 - 话题摘要服务
 - 本地Embedding服务
 - 聊天助手服务
 - 记忆清理调度器
+- 清理任务选主
 """
@@ -0,0 +1,119 @@
+"""
+抽取式摘要服务
+基于本地embedding模型对句子做中心度打分，挑选最具代表性的句子组成摘要
+不依赖网络与大模型，可作为主摘要引擎或LLM摘要的降级方案
+"""
+
+import os
+import numpy as np
+from typing import List, Optional
+from dotenv import load_dotenv
+
+from bionicmemory.services.local_embedding_service import get_embedding_service
+from bionicmemory.utils.text_splitter import split_sentences, join_sentences
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+# 加载环境变量
+load_dotenv()
+
+class ExtractiveSummaryService:
+    """抽取式摘要服务（本地、离线）"""
+
+    def __init__(self, embedding_service=None, max_sentences: int = 64):
+        """
+        初始化抽取式摘要服务
+
+        Args:
+            embedding_service: embedding服务实例，默认复用全局已加载的本地模型
+            max_sentences: 参与打分的最大句子数，超出时相邻句子合并，保证一次批量编码的规模可控
+        """
+        self.embedding_service = embedding_service or get_embedding_service()
+        self.max_sentences = max_sentences
+        self.summary_max_length = int(os.getenv('SUMMARY_MAX_LENGTH', '500'))
+
+        logger.info(f"抽取式摘要服务初始化完成，最大打分句数: {self.max_sentences}")
+
+    def generate_summary(self, content: str, max_length: Optional[int] = None) -> str:
+        """
+        生成抽取式摘要
+
+        Args:
+            content: 原始内容
+            max_length: 摘要最大长度，如果不提供则使用环境变量配置
+
+        Returns:
+            str: 按原文顺序拼接的摘要句子，长度不超过max_length
+        """
+        max_length = max_length or self.summary_max_length
+        if not content:
+            return ""
+        if len(content) <= max_length:
+            return content
+
+        sentences = self._merge_sentences(split_sentences(content))
+        if len(sentences) <= 1:
+            return content[:max_length]
+
+        try:
+            scores = self._score_sentences(sentences)
+        except Exception as e:
+            logger.warning(f"句子打分失败，按原文顺序选句: {e}")
+            scores = np.linspace(1.0, 0.0, len(sentences))
+
+        # 按中心度从高到低贪心装箱，装不下的句子跳过
+        selected = []
+        total_length = 0
+        for idx in np.argsort(-scores, kind="stable"):
+            sentence_length = len(sentences[idx])
+            if total_length + sentence_length <= max_length:
+                selected.append(int(idx))
+                total_length += sentence_length
+
+        if not selected:
+            # 最核心的句子本身就超长，只能截断它
+            best = sentences[int(np.argmax(scores))]
+            return best[:max_length]
+
+        summary = join_sentences([sentences[i] for i in sorted(selected)])
+        logger.info(f"抽取式摘要生成成功: {len(content)} -> {len(summary)} 字符，选中 {len(selected)}/{len(sentences)} 句")
+        return summary[:max_length]
+
+    def _merge_sentences(self, sentences: List[str]) -> List[str]:
+        """
+        句子数超过max_sentences时，将相邻句子两两合并，直至不超过上限
+
+        Args:
+            sentences: 句子列表
+
+        Returns:
+            合并后的句子列表
+        """
+        while len(sentences) > self.max_sentences:
+            sentences = [
+                join_sentences(sentences[i:i + 2])
+                for i in range(0, len(sentences), 2)
+            ]
+        return sentences
+
+    def _score_sentences(self, sentences: List[str]) -> np.ndarray:
+        """
+        计算句子中心度：句向量与全文质心的余弦相似度
+        等价于相似度矩阵的行均值（度中心度），但只需一次矩阵向量乘
+
+        Args:
+            sentences: 句子列表
+
+        Returns:
+            np.ndarray: 每个句子的中心度得分
+        """
+        embeddings = np.asarray(self.embedding_service.encode_texts(sentences), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        centroid = embeddings.mean(axis=0)
+        centroid = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+
+        return embeddings @ centroid
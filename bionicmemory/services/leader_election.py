@@ -0,0 +1,115 @@
+"""
+清理任务选主服务
+多个worker进程共享同一把本地文件锁，只有持有锁的进程（leader）执行清理任务
+锁随进程退出由操作系统自动释放，其余进程（follower）定期重试抢锁实现故障切换
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 使用统一日志配置
+from bionicmemory.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+class FileLeaderLock:
+    """
+    基于文件锁的单机选主
+    POSIX 使用 fcntl.flock，Windows 使用 msvcrt.locking，均为非阻塞抢锁
+    """
+
+    def __init__(self, lock_path: str):
+        """
+        初始化文件锁
+
+        Args:
+            lock_path: 锁文件路径（同一主机上的所有worker需指向同一路径）
+        """
+        self.lock_path = os.path.abspath(lock_path)
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+        self.acquired_at: Optional[str] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """当前进程是否持有锁"""
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """
+        尝试以非阻塞方式获取锁
+
+        Returns:
+            是否为leader（已持有锁时直接返回True）
+        """
+        with self._lock:
+            if self._fd is not None:
+                return True
+
+            fd = None
+            try:
+                os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            except OSError:
+                # 锁已被其他进程持有
+                if fd is not None:
+                    os.close(fd)
+                return False
+
+            # 写入持有者信息，便于排查
+            try:
+                os.ftruncate(fd, 0)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, f"{os.getpid()}\n".encode("utf-8"))
+            except OSError as e:
+                logger.warning(f"写入选主锁文件失败: {e}")
+
+            self._fd = fd
+            self.acquired_at = datetime.now().isoformat()
+            logger.info(f"进程 {os.getpid()} 成为清理任务leader: {self.lock_path}")
+            return True
+
+    def release(self):
+        """释放锁（进程退出时操作系统也会自动释放）"""
+        with self._lock:
+            if self._fd is None:
+                return
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            except OSError as e:
+                logger.warning(f"释放选主锁失败: {e}")
+            finally:
+                os.close(self._fd)
+                self._fd = None
+                self.acquired_at = None
+                logger.info(f"进程 {os.getpid()} 已释放清理任务leader身份")
+
+    def get_status(self) -> dict:
+        """
+        获取选主状态
+
+        Returns:
+            角色、进程号、锁文件路径及成为leader的时间
+        """
+        return {
+            "role": "leader" if self.is_leader else "follower",
+            "pid": os.getpid(),
+            "lock_path": self.lock_path,
+            "acquired_at": self.acquired_at
+        }
@@ -3,37 +3,200 @@
 使用 apscheduler 定期清理长短期记忆库
 """
 
+import json
 import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
 
-from bionicmemory.core.memory_system import LongShortTermMemorySystem
+from bionicmemory.core.memory_system import LongShortTermMemorySystem, CleanupReport, USER_BUCKET_COUNT
 from bionicmemory.algorithms.newton_cooling_helper import CoolingRate
+from bionicmemory.services.leader_election import FileLeaderLock
 
 # 使用统一日志配置
 from bionicmemory.utils.logging_config import get_logger
 logger = get_logger(__name__)
 
+class CleanupCursorStore:
+    """
+    增量清理游标存储
+    以JSON文件持久化每个集合在过期范围查询结果中的偏移（即本轮已复核仍存活的记录数），进程重启后从上次位置继续
+    """
+    
+    def __init__(self, path: str):
+        """
+        初始化游标存储
+        
+        Args:
+            path: 游标文件路径
+        """
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._cursors = self._load()
+    
+    def _load(self) -> Dict[str, int]:
+        """从文件加载游标，文件不存在或损坏时从头开始"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    return {k: int(v) for k, v in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"加载清理游标失败，从头开始: {e}")
+        return {}
+    
+    def get(self, collection_name: str) -> int:
+        """获取集合的当前游标"""
+        with self._lock:
+            return self._cursors.get(collection_name, 0)
+    
+    def set(self, collection_name: str, offset: int):
+        """更新集合游标并落盘（先写临时文件再替换，避免写坏）"""
+        with self._lock:
+            self._cursors[collection_name] = int(offset)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._cursors, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.warning(f"保存清理游标失败: {e}")
+
 class MemoryCleanupScheduler:
     """
     记忆库定时清理调度器
     负责定期清理长短期记忆库中的过期记录
+    
+    支持两种清理模式：
+    - full: 短期每10分钟、长期每天4点各执行一次整库清理
+    - incremental: 每个tick在时间预算内分页清理过期范围（expires_at < now），游标持久化，只访问过期候选
+    
+    短期记忆可选事件驱动过期（short_term_expiry_mode="event"）：按过期索引在到期后数秒内小批量删除，
+    原短期清理任务降为低频兜底扫描
+    
+    full模式可开启自适应调度（adaptive=True）：按写入速率、集合增长与过期积压在上下限内动态调整清理间隔
+    
+    配置 leader_lock_path 后，多个worker进程通过文件锁选主，只有leader执行清理任务，follower定期重试抢锁
+    
+    记忆系统开启短期记忆纪元轮换时，短期清理任务替换为纪元轮换任务（整集合删除过期纪元）
     """
     
-    def __init__(self, memory_system: LongShortTermMemorySystem):
+    def __init__(self,
+                 memory_system: LongShortTermMemorySystem,
+                 cleanup_mode: str = "full",
+                 page_size: int = 500,
+                 time_budget_ms: int = 200,
+                 tick_seconds: int = 60,
+                 page_pause_ms: int = 10,
+                 cursor_path: str = "./data/cleanup_cursor.json",
+                 cleanup_workers: int = 1,
+                 cleanup_partitions: int = 8,
+                 short_term_expiry_mode: str = "poll",
+                 expiry_tick_seconds: int = 5,
+                 expiry_batch_size: int = 100,
+                 expiry_sync_seconds: int = 30,
+                 safety_sweep_minutes: int = 60,
+                 adaptive: bool = False,
+                 adapt_tick_seconds: int = 60,
+                 backlog_target: int = 500,
+                 short_term_min_minutes: int = 1,
+                 short_term_max_minutes: int = 30,
+                 long_term_min_hours: int = 1,
+                 long_term_max_hours: int = 24,
+                 leader_lock_path: Optional[str] = None,
+                 leader_retry_seconds: int = 15,
+                 report_history: int = 20):
         """
         初始化清理调度器
         
         Args:
             memory_system: 长短期记忆系统实例
+            cleanup_mode: 清理模式，"full"（整库）或 "incremental"（增量分页）
+            page_size: 增量模式每页处理的记录数
+            time_budget_ms: 增量模式每个tick的时间预算（毫秒）
+            tick_seconds: 增量模式的tick间隔（秒）
+            page_pause_ms: 增量模式页与页之间让出的时间（毫秒），释放写锁给在线请求
+            cursor_path: 增量模式游标持久化文件路径
+            cleanup_workers: 整库清理的并行线程数，大于1时按用户分桶分片并行清理
+            cleanup_partitions: 整库清理的分片数（用户分桶被均分到各分片）
+            short_term_expiry_mode: 短期记忆过期方式，"poll"（定时轮询）或 "event"（过期索引驱动）
+            expiry_tick_seconds: 事件驱动模式检查到期记录的间隔（秒）
+            expiry_batch_size: 事件驱动模式每批删除的最大记录数
+            expiry_sync_seconds: 事件驱动模式从存储补登记即将到期记录的间隔（秒），覆盖其他worker写入的记录
+            safety_sweep_minutes: 事件驱动模式下短期记忆兜底扫描的间隔（分钟）
+            adaptive: 是否按负载自适应调整整库清理间隔（仅full模式）
+            adapt_tick_seconds: 自适应调度的采样与决策间隔（秒）
+            backlog_target: 期望的过期积压上限（条），积压超过该值时收紧清理间隔
+            short_term_min_minutes: 短期记忆清理间隔下限（分钟）
+            short_term_max_minutes: 短期记忆清理间隔上限（分钟）
+            long_term_min_hours: 长期记忆清理间隔下限（小时）
+            long_term_max_hours: 长期记忆清理间隔上限（小时）
+            leader_lock_path: 选主锁文件路径，为空时不选主（单进程部署）
+            leader_retry_seconds: follower重试抢锁的间隔（秒）
+            report_history: 保留最近多少份清理报告
         """
+        if cleanup_mode not in ("full", "incremental"):
+            raise ValueError(f"不支持的清理模式: {cleanup_mode}")
+        if short_term_expiry_mode not in ("poll", "event"):
+            raise ValueError(f"不支持的短期记忆过期方式: {short_term_expiry_mode}")
+        if short_term_expiry_mode == "event" and memory_system.expiry_index is None:
+            logger.warning("记忆系统未开启过期索引，短期记忆回退为定时轮询清理")
+            short_term_expiry_mode = "poll"
+        
         self.memory_system = memory_system
         self.scheduler = BackgroundScheduler()
         self.is_running = False
         
-        logger.info("记忆库清理调度器初始化完成")
+        self.cleanup_mode = cleanup_mode
+        self.page_size = page_size
+        self.time_budget_ms = time_budget_ms
+        self.tick_seconds = tick_seconds
+        self.page_pause_ms = page_pause_ms
+        self.cursor_store = CleanupCursorStore(cursor_path) if cleanup_mode == "incremental" else None
+        
+        self.cleanup_workers = max(1, cleanup_workers)
+        self.cleanup_partitions = max(1, min(cleanup_partitions, USER_BUCKET_COUNT))
+        self.last_partition_reports = {}
+        
+        self.short_term_expiry_mode = short_term_expiry_mode
+        self.expiry_tick_seconds = max(1, expiry_tick_seconds)
+        self.expiry_batch_size = max(1, expiry_batch_size)
+        self.expiry_sync_seconds = max(1, expiry_sync_seconds)
+        self.expiry_synced_total = 0
+        self.safety_sweep_minutes = max(1, safety_sweep_minutes)
+        self.expiry_deleted_total = 0
+        
+        if adaptive and cleanup_mode != "full":
+            logger.warning("自适应调度仅支持full清理模式，已忽略")
+        self.adaptive = adaptive and cleanup_mode == "full"
+        self.adapt_tick_seconds = max(10, adapt_tick_seconds)
+        self.backlog_target = max(1, backlog_target)
+        # 各集合清理间隔的上下限与当前值（秒）
+        self.interval_bounds = {
+            memory_system.short_term_collection_name: (short_term_min_minutes * 60, short_term_max_minutes * 60),
+            memory_system.long_term_collection_name: (long_term_min_hours * 3600, long_term_max_hours * 3600),
+        }
+        self.current_intervals = {}
+        self._load_samples = {}
+        self.backlog_estimates = {}
+        self.adaptive_decisions = deque(maxlen=50)
+        
+        self.leader_lock = FileLeaderLock(leader_lock_path) if leader_lock_path else None
+        self.leader_retry_seconds = max(1, leader_retry_seconds)
+        
+        # 最近的清理报告（扫描/过期/删除数、释放字节与各阶段耗时）
+        self.cleanup_reports = deque(maxlen=max(1, report_history))
+        
+        logger.info(f"记忆库清理调度器初始化完成，清理模式: {cleanup_mode}，短期记忆过期方式: {short_term_expiry_mode}，"
+                    f"自适应调度: {self.adaptive}")
     
     def start(self):
         """启动定时清理服务"""
@@ -42,6 +205,10 @@ class MemoryCleanupScheduler:
                 logger.warning("清理调度器已经在运行")
                 return
             
+            # 选主：抢不到锁也照常注册任务，任务执行时按角色跳过，便于leader退出后接管
+            if self.leader_lock is not None:
+                self._refresh_leadership()
+            
             # 添加定时清理任务
             self._add_cleanup_jobs()
             
@@ -66,6 +233,9 @@ class MemoryCleanupScheduler:
             self.scheduler.shutdown()
             self.is_running = False
             
+            if self.leader_lock is not None:
+                self.leader_lock.release()
+            
             logger.info("记忆库清理调度器已停止")
             
         except Exception as e:
@@ -75,37 +245,384 @@ class MemoryCleanupScheduler:
     def _add_cleanup_jobs(self):
         """添加定时清理任务"""
         try:
-            # 1. 短期记忆库清理任务 - 每10分钟执行一次
+            if self.cleanup_mode == "incremental":
+                self._add_incremental_cleanup_jobs()
+            else:
+                self._add_full_cleanup_jobs()
+            
+            if self.short_term_expiry_mode == "event":
+                self._add_expiry_event_jobs()
+            
+            if self.memory_system.short_term_epochs:
+                self._add_epoch_rotation_job()
+            
+            if self.adaptive:
+                self._add_adaptive_tuning_job()
+            
+            if self.leader_lock is not None:
+                self.scheduler.add_job(
+                    func=self._refresh_leadership,
+                    trigger=IntervalTrigger(seconds=self.leader_retry_seconds),
+                    id="leader_election",
+                    name="清理任务选主",
+                    max_instances=1,
+                    coalesce=True
+                )
+            
+            # 时间戳字段回填任务 - 启动后在后台执行一次
+            # 为历史记录补写数值时间戳与expires_at，使衰减计算与过期清理都走数值范围过滤
+            self.scheduler.add_job(
+                func=self._leader_only(self._migrate_timestamp_fields),
+                trigger=DateTrigger(run_date=datetime.now()),
+                id="timestamp_migration",
+                name="时间戳字段回填",
+                max_instances=1,
+                coalesce=True
+            )
+            
+            logger.info("定时清理任务添加完成")
+            
+        except Exception as e:
+            logger.error(f"添加定时清理任务失败: {e}")
+            raise
+    
+    def _refresh_leadership(self) -> bool:
+        """
+        刷新选主状态：follower尝试抢锁，抢到后补做leader启动时的一次性任务
+        
+        Returns:
+            当前进程是否应执行清理任务（未配置选主时恒为True）
+        """
+        if self.leader_lock is None:
+            return True
+        
+        was_leader = self.leader_lock.is_leader
+        is_leader = self.leader_lock.try_acquire()
+        if is_leader and not was_leader and self.is_running:
+            self._schedule_promotion_jobs()
+        return is_leader
+    
+    def _schedule_promotion_jobs(self):
+        """接管leader后立即补做一次时间戳回填与过期索引重建"""
+        self.scheduler.add_job(
+            func=self._on_promoted,
+            trigger=DateTrigger(run_date=datetime.now()),
+            id="leader_promotion",
+            name="leader接管初始化",
+            max_instances=1,
+            replace_existing=True
+        )
+    
+    def _on_promoted(self):
+        """leader接管初始化：回填时间戳字段，事件驱动模式下重建过期索引"""
+        logger.info("成为清理任务leader，执行接管初始化")
+        self._migrate_timestamp_fields()
+        if self.short_term_expiry_mode == "event":
+            self._rebuild_expiry_index()
+    
+    def _leader_only(self, func: Callable, follower_func: Optional[Callable] = None) -> Callable:
+        """
+        包装任务函数：只有leader执行，follower跳过（或执行follower_func）
+        
+        Args:
+            func: leader执行的任务函数
+            follower_func: follower执行的替代函数
+        """
+        def run():
+            if self._refresh_leadership():
+                func()
+            elif follower_func is not None:
+                follower_func()
+        run.__name__ = func.__name__
+        return run
+    
+    def _drop_due_expiry_entries(self):
+        """follower丢弃本进程过期索引中的到期项（leader从存储补登记后负责删除），避免索引无限增长"""
+        if self.memory_system.expiry_index is not None:
+            self.memory_system.expiry_index.pop_due(limit=10000)
+    
+    def get_role(self) -> str:
+        """
+        获取当前进程的清理角色
+        
+        Returns:
+            "standalone"（未配置选主）、"leader" 或 "follower"
+        """
+        if self.leader_lock is None:
+            return "standalone"
+        return "leader" if self.leader_lock.is_leader else "follower"
+    
+    def _add_full_cleanup_jobs(self):
+        """添加整库清理任务"""
+        # 1. 短期记忆库清理任务 - 每10分钟执行一次（纪元模式下由纪元轮换代替）
+        if not self.memory_system.short_term_epochs:
             # 短期记忆使用 MINUTES_20 遗忘速率，需要更频繁的清理
-            short_term_trigger = IntervalTrigger(minutes=10)
+            # 事件驱动模式下到期删除由过期索引负责，这里只做低频兜底
+            if self.short_term_expiry_mode == "event":
+                short_term_interval = self.safety_sweep_minutes * 60
+            else:
+                short_term_interval = 10 * 60
+            if self.adaptive:
+                short_term_interval = self._clamp_interval(self.memory_system.short_term_collection_name, short_term_interval)
+                self.current_intervals[self.memory_system.short_term_collection_name] = short_term_interval
+            short_term_trigger = IntervalTrigger(seconds=short_term_interval)
             self.scheduler.add_job(
-                func=self._cleanup_short_term_memory,
+                func=self._leader_only(self._cleanup_short_term_memory),
                 trigger=short_term_trigger,
                 id="short_term_cleanup",
                 name="短期记忆库清理",
                 max_instances=1,
                 coalesce=True
             )
-            
-            # 2. 长期记忆库清理任务 - 每天夜里4点执行
-            # 长期记忆使用 DAYS_31 遗忘速率，可以每天清理一次
+        
+        # 2. 长期记忆库清理任务 - 每天夜里4点执行
+        # 长期记忆使用 DAYS_31 遗忘速率，可以每天清理一次
+        # 自适应调度时改为从间隔上限起步的固定间隔，再按负载收紧
+        if self.adaptive:
+            long_term_interval = self.interval_bounds[self.memory_system.long_term_collection_name][1]
+            self.current_intervals[self.memory_system.long_term_collection_name] = long_term_interval
+            long_term_trigger = IntervalTrigger(seconds=long_term_interval)
+        else:
             long_term_trigger = CronTrigger(hour=4, minute=0)
+        self.scheduler.add_job(
+            func=self._leader_only(self._cleanup_long_term_memory),
+            trigger=long_term_trigger,
+            id="long_term_cleanup",
+            name="长期记忆库清理",
+            max_instances=1,
+            coalesce=True
+        )
+    
+    def _add_adaptive_tuning_job(self):
+        """添加自适应调度任务：定期采样负载并调整整库清理间隔"""
+        self.scheduler.add_job(
+            func=self._leader_only(self._adapt_cleanup_intervals),
+            trigger=IntervalTrigger(seconds=self.adapt_tick_seconds),
+            id="adaptive_tuning",
+            name="清理间隔自适应调整",
+            max_instances=1,
+            coalesce=True
+        )
+    
+    def _clamp_interval(self, collection_name: str, interval_seconds: float) -> int:
+        """将清理间隔限制在集合配置的上下限内"""
+        low, high = self.interval_bounds[collection_name]
+        return int(min(max(interval_seconds, low), high))
+    
+    def _estimate_expired_backlog(self, collection_name: str) -> int:
+        """
+        估算集合当前的过期积压（有过期索引时按索引统计，开启旁路时按最新计数复核）
+        最多数到 4 * backlog_target 条，控制采样本身的开销
+        """
+        return self.memory_system.estimate_expired_backlog(collection_name, self.backlog_target * 4)
+    
+    def _count_inserts_since(self, collection_name: str, since_ts: float) -> int:
+        """
+        统计集合中 created_at_ts >= since_ts 的记录数（来自存储，包含所有worker的写入）
+        只取ID且最多数到 4 * backlog_target 条，控制采样本身的开销
+        """
+        result = self.memory_system.chroma_service.get_documents(
+            collection_name,
+            where={"created_at_ts": {"$gte": since_ts}},
+            limit=self.backlog_target * 4,
+            include=[]
+        )
+        return len(result.get("ids", [])) if result else 0
+    
+    def _sample_collection_load(self, collection_name: str) -> Dict:
+        """
+        采样集合负载：写入速率、集合增长速率（条/分钟）、集合大小与过期积压
+        写入速率按上次采样以来新建的记录数（created_at_ts）计算，多worker部署时同样反映全部写入
+        首次采样没有上一个样本，速率记为0
+        """
+        now_ts = datetime.now().timestamp()
+        size = self.memory_system.chroma_service.count_documents(collection_name)
+        previous = self._load_samples.get(collection_name)
+        self._load_samples[collection_name] = (now_ts, size)
+        
+        insert_rate = 0.0
+        growth_rate = 0.0
+        if previous is not None:
+            elapsed_minutes = max((now_ts - previous[0]) / 60.0, 1e-6)
+            insert_rate = self._count_inserts_since(collection_name, previous[0]) / elapsed_minutes
+            growth_rate = (size - previous[1]) / elapsed_minutes
+        
+        backlog = self._estimate_expired_backlog(collection_name)
+        self.backlog_estimates[collection_name] = backlog
+        return {
+            "size": size,
+            "insert_rate_per_min": round(insert_rate, 2),
+            "growth_per_min": round(growth_rate, 2),
+            "backlog": backlog
+        }
+    
+    def _decide_interval(self, collection_name: str, load: Dict) -> Tuple[int, str]:
+        """
+        根据负载决定新的清理间隔
+        - 积压超过目标：按积压/目标的倍数收紧（至少减半）
+        - 否则：取写入速率下积压增长到目标所需的时间，每次最多放宽一倍，避免抖动
+        
+        写入速率是过期速率的代理：每条记录终将过期，稳态下单位时间新过期的记录数约等于写入数，
+        访问只推迟遗忘时刻而不改变数量（检索命中的短期写入同样计入写入速率）。
+        流量突变时两者会暂时偏离，偏离造成的积压由下一次采样的积压项纠正
+        
+        Returns:
+            (新的间隔秒数, 决策原因)
+        """
+        current = self.current_intervals[collection_name]
+        backlog = load["backlog"]
+        insert_rate = load["insert_rate_per_min"]
+        
+        if backlog >= self.backlog_target:
+            proposed = min(current / 2.0, current * self.backlog_target / backlog)
+            reason = f"过期积压 {backlog} 超过目标 {self.backlog_target}"
+        elif insert_rate > 0:
+            proposed = min(self.backlog_target / insert_rate * 60.0, current * 2.0)
+            reason = f"写入 {insert_rate}/分钟，积压 {backlog}"
+        else:
+            proposed = current * 2.0
+            reason = f"无新写入，积压 {backlog}"
+        
+        return self._clamp_interval(collection_name, proposed), reason
+    
+    def _adapt_cleanup_intervals(self):
+        """采样长短期记忆库负载并按需重设清理任务的间隔"""
+        for job_id, collection_name in (
+            ("short_term_cleanup", self.memory_system.short_term_collection_name),
+            ("long_term_cleanup", self.memory_system.long_term_collection_name),
+        ):
+            if self.scheduler.get_job(job_id) is None:
+                # 纪元模式下没有短期清理任务
+                continue
+            try:
+                load = self._sample_collection_load(collection_name)
+                current = self.current_intervals[collection_name]
+                new_interval, reason = self._decide_interval(collection_name, load)
+                
+                # 变化不足10%时保持不变，避免频繁重设任务
+                if abs(new_interval - current) < current * 0.1:
+                    action = "hold"
+                else:
+                    action = "tighten" if new_interval < current else "relax"
+                    self.scheduler.reschedule_job(job_id, trigger=IntervalTrigger(seconds=new_interval))
+                    self.current_intervals[collection_name] = new_interval
+                    logger.info(f"集合 {collection_name} 清理间隔调整: {current}s -> {new_interval}s ({reason})")
+                
+                self.adaptive_decisions.append({
+                    "time": datetime.now().isoformat(),
+                    "collection": collection_name,
+                    **load,
+                    "old_interval_s": current,
+                    "new_interval_s": self.current_intervals[collection_name],
+                    "action": action,
+                    "reason": reason
+                })
+                
+            except Exception as e:
+                logger.error(f"集合 {collection_name} 自适应调度失败: {e}")
+    
+    def _add_incremental_cleanup_jobs(self):
+        """添加增量清理任务：长短期记忆库各自按tick在时间预算内推进游标（纪元模式下短期由纪元轮换代替）"""
+        if not self.memory_system.short_term_epochs:
+            if self.short_term_expiry_mode == "event":
+                short_term_trigger = IntervalTrigger(minutes=self.safety_sweep_minutes)
+            else:
+                short_term_trigger = IntervalTrigger(seconds=self.tick_seconds)
             self.scheduler.add_job(
-                func=self._cleanup_long_term_memory,
-                trigger=long_term_trigger,
-                id="long_term_cleanup",
-                name="长期记忆库清理",
+                func=self._leader_only(self._incremental_cleanup_short_term_memory),
+                trigger=short_term_trigger,
+                id="short_term_cleanup",
+                name="短期记忆库增量清理",
                 max_instances=1,
                 coalesce=True
             )
+        self.scheduler.add_job(
+            func=self._leader_only(self._incremental_cleanup_long_term_memory),
+            trigger=IntervalTrigger(seconds=self.tick_seconds),
+            id="long_term_cleanup",
+            name="长期记忆库增量清理",
+            max_instances=1,
+            coalesce=True
+        )
+    
+    def _add_epoch_rotation_job(self):
+        """添加短期记忆纪元轮换任务：每分钟检查一次，纪元切换后删除过期纪元集合"""
+        self.scheduler.add_job(
+            func=self._leader_only(self._rotate_short_term_epochs),
+            trigger=IntervalTrigger(seconds=60),
+            id="short_term_rotation",
+            name="短期记忆纪元轮换",
+            max_instances=1,
+            coalesce=True
+        )
+    
+    def _rotate_short_term_epochs(self):
+        """执行短期记忆纪元轮换"""
+        try:
+            self.memory_system.rotate_short_term_epochs()
+        except Exception as e:
+            logger.error(f"短期记忆纪元轮换失败: {e}")
+    
+    def _add_expiry_event_jobs(self):
+        """添加事件驱动过期任务：启动后从存储重建过期索引，之后定期从存储补登记即将到期的记录并按短间隔删除到期记录"""
+        self.scheduler.add_job(
+            func=self._leader_only(self._rebuild_expiry_index),
+            trigger=DateTrigger(run_date=datetime.now()),
+            id="expiry_index_rebuild",
+            name="短期记忆过期索引重建",
+            max_instances=1,
+            coalesce=True
+        )
+        self.scheduler.add_job(
+            func=self._leader_only(self._sync_expiry_index),
+            trigger=IntervalTrigger(seconds=self.expiry_sync_seconds),
+            id="expiry_index_sync",
+            name="短期记忆过期索引同步",
+            max_instances=1,
+            coalesce=True
+        )
+        self.scheduler.add_job(
+            func=self._leader_only(self._expire_due_short_term_memory, self._drop_due_expiry_entries),
+            trigger=IntervalTrigger(seconds=self.expiry_tick_seconds),
+            id="short_term_expiry",
+            name="短期记忆到期删除",
+            max_instances=1,
+            coalesce=True
+        )
+    
+    def _rebuild_expiry_index(self):
+        """从存储重建短期记忆过期索引 - 启动后执行一次"""
+        try:
+            self.memory_system.rebuild_expiry_index()
+        except Exception as e:
+            logger.error(f"重建短期记忆过期索引失败: {e}")
+    
+    def _sync_expiry_index(self):
+        """从存储补登记两个同步间隔内到期的短期记忆（含其他worker写入的记录）"""
+        try:
+            self.expiry_synced_total += self.memory_system.sync_expiry_index(
+                horizon_seconds=2 * self.expiry_sync_seconds
+            )
+        except Exception as e:
+            logger.error(f"同步短期记忆过期索引失败: {e}")
+    
+    def _expire_due_short_term_memory(self):
+        """删除过期索引中已到期的短期记忆，逐批处理直至没有到期记录"""
+        try:
+            deleted_total = 0
+            while True:
+                deleted_ids = self.memory_system.expire_due_records(limit=self.expiry_batch_size)
+                deleted_total += len(deleted_ids)
+                next_deadline = self.memory_system.expiry_index.next_deadline()
+                if next_deadline is None or next_deadline > datetime.now().timestamp():
+                    break
             
-
-            
-            logger.info("定时清理任务添加完成")
-            
+            if deleted_total:
+                self.expiry_deleted_total += deleted_total
+                logger.info(f"短期记忆到期删除 {deleted_total} 条")
+                
         except Exception as e:
-            logger.error(f"添加定时清理任务失败: {e}")
-            raise
+            logger.error(f"短期记忆到期删除失败: {e}")
     
     def _cleanup_short_term_memory(self):
         """清理短期记忆库 - 每10分钟执行一次"""
@@ -114,13 +631,14 @@ class MemoryCleanupScheduler:
             
             # 🔒 注意：定时清理是系统级操作，清理所有用户的过期记录
             # 这是合理的，因为系统需要维护整体性能
-            self.memory_system._cleanup_collection(
+            report = self._run_full_cleanup(
                 self.memory_system.short_term_collection_name,
                 CoolingRate.MINUTES_20,
                 self.memory_system.short_term_threshold
             )
             
-            logger.info(f"短期记忆库定时清理完成")
+            logger.info(f"短期记忆库定时清理完成: 扫描 {report['scanned']} 条, 删除 {report['deleted']} 条, "
+                        f"释放约 {report['bytes_freed']} 字节, 耗时 {report['total_ms']}ms")
             
         except Exception as e:
             logger.error(f"短期记忆库定时清理失败: {e}")
@@ -132,18 +650,193 @@ class MemoryCleanupScheduler:
             
             # 🔒 注意：定时清理是系统级操作，清理所有用户的过期记录
             # 这是合理的，因为系统需要维护整体性能
-            self.memory_system._cleanup_collection(
+            report = self._run_full_cleanup(
                 self.memory_system.long_term_collection_name,
                 CoolingRate.DAYS_31,
                 self.memory_system.long_term_threshold
             )
             
-            logger.info(f"长期记忆库定时清理完成")
+            logger.info(f"长期记忆库定时清理完成: 扫描 {report['scanned']} 条, 删除 {report['deleted']} 条, "
+                        f"释放约 {report['bytes_freed']} 字节, 耗时 {report['total_ms']}ms")
             
         except Exception as e:
             logger.error(f"长期记忆库定时清理失败: {e}")
     
-
+    def _run_full_cleanup(self,
+                          collection_name: str,
+                          cooling_rate: CoolingRate,
+                          threshold: float,
+                          dry_run: bool = False) -> Dict:
+        """
+        执行一次整库清理：单线程时走expires_at范围删除，多线程时按用户分桶分片并行清理
+        
+        Args:
+            collection_name: 集合名称
+            cooling_rate: 遗忘速率（仅分片清理对缺少expires_at的记录按衰减判定时使用）
+            threshold: 清理阈值（同上；范围删除直接使用写入时算好的expires_at）
+            dry_run: 只统计将被删除的记录，不实际删除
+        
+        Returns:
+            本次清理报告（同时记入最近报告列表）
+        """
+        if self.cleanup_workers > 1:
+            started = time.monotonic()
+            report = CleanupReport(collection=collection_name, mode="partition", dry_run=dry_run,
+                                   started_at=datetime.now().isoformat())
+            for partition_report in self._run_sharded_cleanup(collection_name, cooling_rate, threshold, dry_run):
+                if "error" not in partition_report:
+                    report.merge(CleanupReport(**{
+                        key: value for key, value in partition_report.items()
+                        if key in CleanupReport.__dataclass_fields__
+                    }))
+            report.total_ms = (time.monotonic() - started) * 1000
+        else:
+            report = self.memory_system._cleanup_collection(collection_name, dry_run=dry_run)
+        
+        return self._record_report(report)
+    
+    def _record_report(self, report: CleanupReport) -> Dict:
+        """保存一份清理报告并返回其字典形式"""
+        report_dict = report.to_dict()
+        self.cleanup_reports.append(report_dict)
+        return report_dict
+    
+    def get_cleanup_reports(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        获取最近的清理报告（按时间从新到旧）
+        
+        Args:
+            limit: 最多返回的报告数
+        """
+        reports = list(reversed(self.cleanup_reports))
+        return reports[:limit] if limit else reports
+    
+    def _partition_buckets(self) -> List[List[int]]:
+        """将用户分桶均分为cleanup_partitions个分片"""
+        return [
+            list(range(USER_BUCKET_COUNT))[i::self.cleanup_partitions]
+            for i in range(self.cleanup_partitions)
+        ]
+    
+    def _run_sharded_cleanup(self,
+                             collection_name: str,
+                             cooling_rate: CoolingRate,
+                             threshold: float,
+                             dry_run: bool = False) -> List[Dict]:
+        """
+        按用户分桶分片，在线程池中并行清理集合
+        每个分片内分页向量化判定过期、批量删除，并汇报各分片的耗时与删除数
+        
+        Args:
+            collection_name: 集合名称
+            cooling_rate: 遗忘速率
+            threshold: 清理阈值
+            dry_run: 只统计将被删除的记录，不实际删除
+        
+        Returns:
+            各分片的统计报告
+        """
+        started = time.monotonic()
+        partitions = self._partition_buckets()
+        
+        def run_partition(index_and_buckets):
+            index, buckets = index_and_buckets
+            try:
+                report = self.memory_system._cleanup_partition(
+                    collection_name, cooling_rate, threshold, buckets, dry_run=dry_run
+                )
+            except Exception as e:
+                logger.error(f"集合 {collection_name} 分片 {index} 清理失败: {e}")
+                report = {"scanned": 0, "deleted": 0, "duration_ms": 0.0, "error": str(e)}
+            report["partition"] = index
+            return report
+        
+        with ThreadPoolExecutor(max_workers=self.cleanup_workers, thread_name_prefix="memory-cleanup") as executor:
+            reports = list(executor.map(run_partition, enumerate(partitions)))
+        
+        total_ms = round((time.monotonic() - started) * 1000, 2)
+        for report in reports:
+            logger.info(f"集合 {collection_name} 分片 {report['partition']}: 扫描 {report['scanned']} 条, "
+                        f"删除 {report['deleted']} 条, 耗时 {report['duration_ms']}ms")
+        logger.info(f"集合 {collection_name} 分片并行清理完成: {len(partitions)} 个分片, {self.cleanup_workers} 个线程, "
+                    f"共删除 {sum(r['deleted'] for r in reports)} 条, 总耗时 {total_ms}ms")
+        
+        self.last_partition_reports[collection_name] = {
+            "finished_at": datetime.now().isoformat(),
+            "total_ms": total_ms,
+            "partitions": reports
+        }
+        return reports
+    
+    def _incremental_cleanup_short_term_memory(self):
+        """短期记忆库增量清理 - 每个tick执行一次"""
+        try:
+            self._run_incremental_cleanup(self.memory_system.short_term_collection_name)
+        except Exception as e:
+            logger.error(f"短期记忆库增量清理失败: {e}")
+    
+    def _incremental_cleanup_long_term_memory(self):
+        """长期记忆库增量清理 - 每个tick执行一次"""
+        try:
+            self._run_incremental_cleanup(self.memory_system.long_term_collection_name)
+        except Exception as e:
+            logger.error(f"长期记忆库增量清理失败: {e}")
+    
+    def _run_incremental_cleanup(self, collection_name: str):
+        """
+        在时间预算内从持久化游标处分页清理集合的过期范围
+        每页处理完立即保存游标并让出一小段时间，预算用完即返回，下个tick继续
+        
+        Args:
+            collection_name: 集合名称
+        """
+        started = time.monotonic()
+        deadline = started + self.time_budget_ms / 1000.0
+        pages = 0
+        report = CleanupReport(collection=collection_name, mode="incremental",
+                               started_at=datetime.now().isoformat())
+        
+        while True:
+            offset = self.cursor_store.get(collection_name)
+            fetched, kept, page_report = self.memory_system._cleanup_collection_page(
+                collection_name, offset, self.page_size
+            )
+            pages += 1
+            report.merge(page_report)
+            
+            if fetched < self.page_size:
+                # 已处理完当前全部过期候选，游标归零（期间新过期的记录下一轮从头取到）
+                self.cursor_store.set(collection_name, 0)
+                logger.info(f"集合 {collection_name} 增量清理处理完当前过期记录")
+                break
+            
+            # 删除的记录已离开过期范围，下一页起点只需跳过本页保留下来的记录
+            self.cursor_store.set(collection_name, offset + kept)
+            
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(self.page_pause_ms / 1000.0)
+        
+        report.total_ms = (time.monotonic() - started) * 1000
+        self._record_report(report)
+        logger.info(f"集合 {collection_name} 增量清理: {pages} 页, 扫描 {report.scanned} 条, 删除 {report.deleted} 条")
+    
+    def _migrate_timestamp_fields(self):
+        """回填长短期记忆库的数值时间戳与遗忘时刻字段 - 启动后执行一次"""
+        try:
+            logger.info("开始回填时间戳字段")
+            
+            long_term_count = self.memory_system.migrate_timestamp_fields(
+                self.memory_system.long_term_collection_name
+            )
+            short_term_count = self.memory_system.migrate_timestamp_fields(
+                self.memory_system.short_term_collection_name
+            )
+            
+            logger.info(f"时间戳字段回填完成: 长期 {long_term_count} 条, 短期 {short_term_count} 条")
+            
+        except Exception as e:
+            logger.error(f"时间戳字段回填失败: {e}")
     
     def get_scheduler_status(self) -> dict:
         """
@@ -172,7 +865,18 @@ class MemoryCleanupScheduler:
             
             return {
                 "status": "running",
+                "role": self.get_role(),
+                "leader": self.leader_lock.get_status() if self.leader_lock is not None else None,
                 "jobs": jobs,
+                "partition_reports": self.last_partition_reports,
+                "short_term_expiry": self._expiry_status(),
+                "reports": self.get_cleanup_reports(),
+                "adaptive": {
+                    "enabled": self.adaptive,
+                    "intervals_s": self.current_intervals,
+                    "backlog_estimates": self.backlog_estimates,
+                    "decisions": list(self.adaptive_decisions)
+                },
                 "message": "调度器运行正常"
             }
             
@@ -184,6 +888,20 @@ class MemoryCleanupScheduler:
                 "message": f"获取状态失败: {e}"
             }
     
+    def _expiry_status(self) -> dict:
+        """短期记忆过期方式及过期索引状态"""
+        status = {"mode": self.short_term_expiry_mode}
+        expiry_index = self.memory_system.expiry_index
+        if self.short_term_expiry_mode == "event" and expiry_index is not None:
+            next_deadline = expiry_index.next_deadline()
+            status.update({
+                "indexed": len(expiry_index),
+                "next_deadline": datetime.fromtimestamp(next_deadline).isoformat() if next_deadline else None,
+                "deleted_total": self.expiry_deleted_total,
+                "synced_total": self.expiry_synced_total
+            })
+        return status
+    
     def add_custom_cleanup_job(self, 
                                func, 
                                trigger, 
@@ -288,24 +1006,45 @@ class MemoryCleanupScheduler:
             logger.error(f"恢复任务失败: {e}")
             return False
     
-    def run_cleanup_now(self):
-        """立即执行一次清理任务"""
+    def run_cleanup_now(self, dry_run: bool = False) -> List[Dict]:
+        """
+        立即执行一次清理任务
+        
+        Args:
+            dry_run: 只统计将被删除的记录，不实际删除
+        
+        Returns:
+            长短期记忆库的清理报告
+        """
         try:
-            logger.info("开始执行立即清理任务")
+            logger.info(f"开始执行立即清理任务{'（dry-run）' if dry_run else ''}")
             
-            # 执行清理 - 同时清理长短期记忆库
-            self.memory_system._cleanup_collection(
-                self.memory_system.short_term_collection_name,
-                CoolingRate.MINUTES_20,
-                self.memory_system.short_term_threshold
-            )
-            self.memory_system._cleanup_collection(
+            # 执行清理 - 同时清理长短期记忆库（纪元模式下短期记忆改为纪元轮换）
+            reports = []
+            if self.memory_system.short_term_epochs:
+                if not dry_run:
+                    rotation = self.memory_system.rotate_short_term_epochs()
+                    reports.append({
+                        "collection": self.memory_system.short_term_collection_name,
+                        "mode": "epoch_rotation",
+                        **rotation
+                    })
+            else:
+                reports.append(self._run_full_cleanup(
+                    self.memory_system.short_term_collection_name,
+                    CoolingRate.MINUTES_20,
+                    self.memory_system.short_term_threshold,
+                    dry_run=dry_run
+                ))
+            reports.append(self._run_full_cleanup(
                 self.memory_system.long_term_collection_name,
                 CoolingRate.DAYS_31,
-                self.memory_system.long_term_threshold
-            )
+                self.memory_system.long_term_threshold,
+                dry_run=dry_run
+            ))
             
-            logger.info("立即清理任务执行完成")
+            logger.info(f"立即清理任务执行完成: {reports}")
+            return reports
             
         except Exception as e:
             logger.error(f"立即清理任务执行失败: {e}")
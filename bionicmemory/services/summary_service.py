@@ -42,6 +42,9 @@ class SummaryService:
             base_url=self.base_url
         )
         
+        # 抽取式摘要服务（降级方案，按需初始化）
+        self._extractive_service = None
+        
         logger.info(f"摘要服务初始化完成")
         logger.info(f"使用模型: {self.model_name}")
         logger.info(f"摘要最大长度: {self.summary_max_length}")
@@ -143,15 +146,27 @@ class SummaryService:
     
     def _fallback_summary(self, content: str, max_length: int) -> str:
         """
-        降级摘要方案（简单截断）
+        降级摘要方案
+        优先使用本地抽取式摘要，失败时再简单截断
         
         Args:
             content: 原始内容
             max_length: 最大长度
             
         Returns:
-            str: 截断后的内容
+            str: 降级生成的摘要
         """
+        try:
+            if self._extractive_service is None:
+                from bionicmemory.services.extractive_summary_service import ExtractiveSummaryService
+                self._extractive_service = ExtractiveSummaryService()
+            summary = self._extractive_service.generate_summary(content, max_length)
+            if summary:
+                logger.warning("使用降级摘要方案：本地抽取式摘要")
+                return summary
+        except Exception as e:
+            logger.warning(f"抽取式摘要失败: {e}")
+        
         logger.warning("使用降级摘要方案：简单截断")
         
         # 尝试在句号处截断
@@ -3,5 +3,6 @@
 
 包含仿生记忆系统的工具函数：
 - 授权验证
+- 文本切分
 - 其他辅助工具
 """
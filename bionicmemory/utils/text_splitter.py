@@ -0,0 +1,108 @@
+"""
+文本切分工具
+提供中英文混合文本的分句功能
+"""
+
+import re
+from typing import List
+
+# 句末标点：中文句号/问号/感叹号/分号/省略号，英文 .!?; 后需跟空白或结尾，换行同样视为句子边界
+_SENTENCE_END_PATTERN = re.compile(
+    r'.*?(?:[。！？；!?;]+[”’"\'）)]*|…{1,2}[”’"\'）)]*|\.+[”’"\'）)]*(?=\s|$)|\n+|$)',
+    re.S
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    按中英文标点将文本切分为句子
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        句子列表（已去除首尾空白，保留句末标点，过滤空句）
+    """
+    if not text:
+        return []
+
+    sentences = []
+    for match in _SENTENCE_END_PATTERN.finditer(text):
+        sentence = match.group(0).strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def join_sentences(sentences: List[str]) -> str:
+    """
+    将句子重新拼接为文本
+    英文句子之间补一个空格，中文句子直接相连
+
+    Args:
+        sentences: 句子列表
+
+    Returns:
+        拼接后的文本
+    """
+    text = ""
+    for sentence in sentences:
+        if text and text[-1].isascii() and sentence[0].isascii():
+            text += " "
+        text += sentence
+    return text
+
+
+def split_into_chunks(text: str, chunk_size: int, overlap: int = 0) -> List[str]:
+    """
+    将长文本切分为相互重叠的片段
+    优先在句子边界处切分，单句超长时按字符硬切
+
+    Args:
+        text: 原始文本
+        chunk_size: 每个片段的最大字符数
+        overlap: 相邻片段间的重叠字符数（按整句回溯，不超过该值）
+
+    Returns:
+        片段列表
+    """
+    if not text:
+        return []
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size必须大于0: {chunk_size}")
+    overlap = max(0, min(overlap, chunk_size // 2))
+
+    # 超长单句先硬切，保证每个单元都能放进一个片段
+    units = []
+    for sentence in split_sentences(text):
+        if len(sentence) <= chunk_size:
+            units.append(sentence)
+        else:
+            step = chunk_size - overlap
+            for start in range(0, len(sentence), step):
+                units.append(sentence[start:start + chunk_size])
+                if start + chunk_size >= len(sentence):
+                    break
+
+    chunks = []
+    current = []
+    current_length = 0
+    for unit in units:
+        if current and current_length + len(unit) > chunk_size:
+            chunks.append(join_sentences(current))
+            # 从当前片段尾部回溯整句作为下一片段的重叠部分
+            carried = []
+            carried_length = 0
+            for prev in reversed(current):
+                if carried_length + len(prev) > overlap or carried_length + len(prev) + len(unit) > chunk_size:
+                    break
+                carried.insert(0, prev)
+                carried_length += len(prev)
+            current = carried
+            current_length = carried_length
+        current.append(unit)
+        current_length += len(unit)
+
+    if current:
+        chunks.append(join_sentences(current))
+    return chunks
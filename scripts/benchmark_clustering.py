@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+聚类抑制基准测试
+对比 sklearn KMeans(n_init=10) 与内置球面k-means 在检索候选规模上的耗时与聚类一致性（ARI）
+
+用法：
+    python scripts/benchmark_clustering.py --samples 84 --dim 1024 --clusters 28 --repeat 50
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from bionicmemory.algorithms.spherical_kmeans import SphericalKMeans, normalize_rows
+
+try:
+    from sklearn.cluster import KMeans
+except ImportError:
+    KMeans = None
+
+def make_candidates(samples: int, dim: int, topics: int, noise: float, seed: int) -> np.ndarray:
+    """生成模拟检索候选：围绕若干话题方向的带噪单位向量"""
+    rng = np.random.default_rng(seed)
+    directions = normalize_rows(rng.standard_normal((topics, dim)))
+    assignment = rng.integers(topics, size=samples)
+    points = directions[assignment] + noise * rng.standard_normal((samples, dim)).astype(np.float32)
+    return normalize_rows(points)
+
+def adjusted_rand_index(labels_a: np.ndarray, labels_b: np.ndarray) -> float:
+    """调整兰德指数（不依赖sklearn.metrics）"""
+    _, a = np.unique(labels_a, return_inverse=True)
+    _, b = np.unique(labels_b, return_inverse=True)
+    contingency = np.zeros((a.max() + 1, b.max() + 1), dtype=np.int64)
+    np.add.at(contingency, (a, b), 1)
+
+    def pairs(x):
+        return (x * (x - 1) // 2).sum()
+
+    sum_cells = pairs(contingency)
+    sum_a = pairs(contingency.sum(axis=1))
+    sum_b = pairs(contingency.sum(axis=0))
+    total = pairs(np.array([len(a)]))
+    expected = sum_a * sum_b / total if total else 0.0
+    maximum = (sum_a + sum_b) / 2
+    if maximum == expected:
+        return 1.0
+    return float((sum_cells - expected) / (maximum - expected))
+
+def time_runs(func, repeat: int):
+    """重复执行并返回 (p50毫秒, p95毫秒, 最后一次的结果)"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return float(np.percentile(durations, 50)), float(np.percentile(durations, 95)), result
+
+def main():
+    parser = argparse.ArgumentParser(description="聚类抑制基准测试")
+    parser.add_argument("--samples", type=int, default=84, help="候选记录数")
+    parser.add_argument("--dim", type=int, default=1024, help="向量维度")
+    parser.add_argument("--clusters", type=int, default=28, help="聚类簇数")
+    parser.add_argument("--topics", type=int, default=20, help="模拟数据的话题数")
+    parser.add_argument("--noise", type=float, default=0.03, help="话题内噪声强度")
+    parser.add_argument("--n-init", type=int, default=1, help="球面k-means的初始化次数")
+    parser.add_argument("--repeat", type=int, default=30, help="每种实现的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    X = make_candidates(args.samples, args.dim, args.topics, args.noise, args.seed)
+    print(f"候选矩阵: {X.shape}, 簇数: {args.clusters}, 重复: {args.repeat}")
+
+    spherical_p50, spherical_p95, spherical_model = time_runs(
+        lambda: SphericalKMeans(n_clusters=args.clusters, n_init=args.n_init, random_state=42).fit(X, normalized=True),
+        args.repeat
+    )
+    print(f"spherical  n_init={args.n_init:<2d} p50={spherical_p50:8.2f}ms  p95={spherical_p95:8.2f}ms  迭代={spherical_model.n_iter_}")
+
+    if KMeans is None:
+        print("未安装scikit-learn，跳过对比")
+        return
+
+    sklearn_p50, sklearn_p95, sklearn_model = time_runs(
+        lambda: KMeans(n_clusters=args.clusters, random_state=42, n_init=10).fit(X),
+        args.repeat
+    )
+    print(f"sklearn    n_init=10 p50={sklearn_p50:8.2f}ms  p95={sklearn_p95:8.2f}ms  迭代={sklearn_model.n_iter_}")
+
+    ari = adjusted_rand_index(spherical_model.labels_, sklearn_model.labels_)
+    print(f"加速比(p50): {sklearn_p50 / max(spherical_p50, 1e-9):.1f}x  聚类一致性ARI: {ari:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+双路topK与相似度softmax微基准
+对比原实现（两次完整排序 + seen集合合并、math.exp 循环）与向量化实现（argpartition + 掩码并集、NumPy softmax），
+并校验两者结果一致
+
+用法：
+    python scripts/benchmark_topk.py --candidates 28 --target-k 14 --repeat 2000
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from bionicmemory.algorithms.suppression_strategy import dual_topk_indices, similarity_softmax
+
+def make_representatives(n: int, seed: int):
+    """生成模拟代表记录：距离带并列值，计数为小整数（大量并列）"""
+    rng = np.random.default_rng(seed)
+    distances = np.round(rng.random(n), 3)
+    counts = rng.integers(1, 6, size=n).astype(np.float64)
+    records = [
+        {"doc_id": f"doc_{i}", "distance": float(distances[i]), "valid_access_count": float(counts[i])}
+        for i in range(n)
+    ]
+    return records, distances, counts
+
+def legacy_dual_topk(representatives, target_k):
+    """原实现：两次完整排序后按doc_id合并去重"""
+    top_by_relevance = sorted(representatives, key=lambda x: float(x.get("distance", float("inf"))))[:target_k]
+    top_by_count = sorted(representatives, key=lambda x: float(x.get("valid_access_count", 0.0)), reverse=True)[:target_k]
+    seen_ids = set()
+    final_selection = []
+    for r in top_by_relevance + top_by_count:
+        rid = r.get("doc_id")
+        if rid not in seen_ids:
+            seen_ids.add(rid)
+            final_selection.append(r)
+    return final_selection
+
+def legacy_softmax(records):
+    """原实现：逐条 math.exp"""
+    similarities = [1.0 - float(r["distance"]) if r.get("distance") is not None else 0.0 for r in records]
+    max_sim = max(similarities)
+    exps = [math.exp(s - max_sim) for s in similarities]
+    denom = sum(exps) or 1.0
+    return [e / denom for e in exps]
+
+def time_runs(func, repeat: int):
+    """重复执行并返回 (p50微秒, p95微秒, 最后一次的结果)"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append((time.perf_counter() - started) * 1e6)
+    return float(np.percentile(durations, 50)), float(np.percentile(durations, 95)), result
+
+def main():
+    parser = argparse.ArgumentParser(description="双路topK与softmax微基准")
+    parser.add_argument("--candidates", type=int, default=28, help="代表记录数（默认等于长期检索的聚类数）")
+    parser.add_argument("--target-k", type=int, default=14, help="每一路取的条数")
+    parser.add_argument("--repeat", type=int, default=2000, help="每种实现的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    records, distances, counts = make_representatives(args.candidates, args.seed)
+    print(f"代表记录数: {args.candidates}, target_k: {args.target_k}, 重复: {args.repeat}")
+
+    legacy_p50, legacy_p95, legacy = time_runs(lambda: legacy_dual_topk(records, args.target_k), args.repeat)
+    vector_p50, vector_p95, indices = time_runs(lambda: dual_topk_indices(distances, counts, args.target_k), args.repeat)
+    same = [r["doc_id"] for r in legacy] == [records[i]["doc_id"] for i in indices]
+    print(f"双路topK  原实现 p50={legacy_p50:8.1f}us p95={legacy_p95:8.1f}us")
+    print(f"双路topK  向量化 p50={vector_p50:8.1f}us p95={vector_p95:8.1f}us  结果一致: {same}")
+
+    selected = [records[i] for i in indices]
+    selected_distances = distances[indices]
+    legacy_p50, legacy_p95, legacy_probs = time_runs(lambda: legacy_softmax(selected), args.repeat)
+    vector_p50, vector_p95, probs = time_runs(lambda: similarity_softmax(selected_distances), args.repeat)
+    close = bool(np.allclose(legacy_probs, probs))
+    print(f"softmax   原实现 p50={legacy_p50:8.1f}us p95={legacy_p95:8.1f}us")
+    print(f"softmax   向量化 p50={vector_p50:8.1f}us p95={vector_p95:8.1f}us  结果一致: {close}")
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,9 @@ setup(
     python_requires=">=3.8",
     install_requires=read_requirements(),
     extras_require={
+        "sklearn": [
+            "scikit-learn>=1.3.0",
+        ],
         "dev": [
             "pytest>=6.0",
             "pytest-asyncio",
@@ -0,0 +1,103 @@
+"""
+基于临时 PersistentClient 的记忆系统测试夹具
+embedding 服务替换为按文本哈希生成的确定性单位向量，不加载本地模型
+"""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+
+class FakeEmbeddingService:
+    """确定性的假embedding服务：相同文本得到相同的单位向量"""
+
+    dimension = 16
+
+    def encode_text(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).normal(size=self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def encode_texts(self, texts):
+        return [self.encode_text(text) for text in texts]
+
+    def get_model_info(self):
+        return {"model_name": "fake", "embedding_dimension": self.dimension}
+
+
+@pytest.fixture
+def make_memory_system(tmp_path, monkeypatch):
+    """
+    构造使用临时ChromaDB目录的记忆系统，测试结束时关闭
+    返回工厂函数，关键字参数透传给 LongShortTermMemorySystem；写入记录时需显式传入embedding
+    """
+    pytest.importorskip("chromadb")
+    pytest.importorskip("sentence_transformers")
+    from bionicmemory.core import chroma_service as chroma_module
+    from bionicmemory.core import memory_system as memory_module
+    from bionicmemory.services import local_embedding_service
+
+    monkeypatch.setattr(local_embedding_service, "_global_embedding_service", FakeEmbeddingService())
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    created = []
+
+    def factory(**kwargs):
+        chroma = chroma_module.ChromaService(client_type="persistent", path=str(tmp_path / "chroma"))
+        kwargs.setdefault("summary_engine", "extractive")
+        system = memory_module.LongShortTermMemorySystem(chroma_service=chroma, **kwargs)
+        created.append(system)
+        return system
+
+    yield factory
+    for system in created:
+        system.close()
+
+
+@pytest.fixture
+def seed_records():
+    """
+    直接向集合写入带完整元数据的记录，返回写入函数 seed(system, collection_name, records)
+    records 为字典列表：必填 id，expires_in 为距当前的遗忘秒数（负数表示已过期），其余键覆盖默认元数据
+    """
+    from datetime import datetime
+
+    embedder = FakeEmbeddingService()
+
+    def seed(system, collection_name, records):
+        now = datetime.now()
+        ids, documents, metadatas = [], [], []
+        for record in records:
+            record = dict(record)
+            doc_id = record.pop("id")
+            expires_in = record.pop("expires_in", 3600.0)
+            user_id = record.get("user_id", "user-a")
+            metadata = {
+                "user_id": user_id,
+                "content": f"content of {doc_id}",
+                "valid_access_count": 1.0,
+                "total_access_count": 1.0,
+                "created_at": now.isoformat(),
+                "created_at_ts": now.timestamp(),
+                "last_updated": now.isoformat(),
+                "last_updated_ts": now.timestamp(),
+                "expires_at": now.timestamp() + expires_in,
+                "user_bucket": system._user_bucket(user_id),
+            }
+            metadata.update({key: value for key, value in record.items() if value is not None})
+            for key in [key for key, value in record.items() if value is None]:
+                metadata.pop(key, None)
+            ids.append(doc_id)
+            documents.append(metadata["content"])
+            metadatas.append(metadata)
+        system.chroma_service.add_documents(
+            collection_name,
+            documents=documents,
+            embeddings=embedder.encode_texts(documents),
+            ids=ids,
+            metadatas=metadatas
+        )
+        return ids
+
+    return seed
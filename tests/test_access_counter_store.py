@@ -0,0 +1,171 @@
+"""
+访问计数旁路存储测试
+"""
+
+import time
+
+import pytest
+
+from bionicmemory.core.access_counter_store import AccessCounterStore
+
+
+def _counters(valid, ts, expires_at):
+    return {
+        "valid_access_count": valid,
+        "total_access_count": valid,
+        "last_updated": "",
+        "last_updated_ts": ts,
+        "expires_at": expires_at,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AccessCounterStore(str(tmp_path / "counters.db"), flush_size=100, flush_interval_seconds=3600)
+    yield store
+    store.close()
+
+
+def test_reads_see_unflushed_writes(store):
+    store.upsert("short", ["a"], [_counters(2.0, 10.0, 100.0)])
+    assert store.get_stats()["dirty"] == 1
+    assert store.get_many("short", ["a", "b"])["a"]["valid_access_count"] == 2.0
+    store.flush()
+    assert store.get_stats()["dirty"] == 0
+    assert store.get_many("short", ["a"])["a"]["expires_at"] == 100.0
+    assert store.get_many("long", ["a"]) == {}
+
+
+def test_flush_size_triggers_flush(tmp_path):
+    store = AccessCounterStore(str(tmp_path / "counters.db"), flush_size=2, flush_interval_seconds=3600)
+    store.upsert("short", ["a", "b"], [_counters(1.0, 1.0, 1.0)] * 2)
+    stats = store.get_stats()
+    assert stats["dirty"] == 0
+    assert stats["rows"] == 2
+    store.close()
+
+
+def test_overlay_precedence(store):
+    store.upsert("short", ["a", "b"], [_counters(5.0, 20.0, 200.0), _counters(5.0, 20.0, 200.0)])
+    metadatas = [
+        # 旁路更新晚于元数据：以旁路为准
+        {"content": "A", "valid_access_count": 1.0, "last_updated_ts": 10.0, "expires_at": 50.0},
+        # 记录在旁路之后被重新写入：以元数据为准
+        {"content": "B", "valid_access_count": 1.0, "last_updated_ts": 30.0, "expires_at": 80.0},
+        # 旁路中没有该记录
+        {"content": "C", "valid_access_count": 1.0, "last_updated_ts": 10.0, "expires_at": 50.0},
+        None,
+    ]
+    merged = store.overlay("short", ["a", "b", "c", "d"], metadatas)
+    assert merged[0]["valid_access_count"] == 5.0
+    assert merged[0]["expires_at"] == 200.0
+    assert merged[0]["content"] == "A"
+    assert merged[1] is metadatas[1]
+    assert merged[2] is metadatas[2]
+    assert merged[3] is None
+    # 不修改传入的字典
+    assert metadatas[0]["valid_access_count"] == 1.0
+
+
+def test_overlay_keeps_metadata_values_for_missing_fields(store):
+    store.upsert("short", ["a"], [{"valid_access_count": 3.0, "last_updated_ts": 20.0}])
+    merged = store.overlay("short", ["a"], [{"valid_access_count": 1.0, "last_updated_ts": 10.0, "expires_at": 50.0}])
+    assert merged[0]["valid_access_count"] == 3.0
+    assert merged[0]["expires_at"] == 50.0
+
+
+def test_concurrent_flushes_merge_instead_of_overwrite(tmp_path):
+    # 两个进程各自基于同一旧值累加一次访问，后落盘的一方按 merge 叠加而不是覆盖
+    def merge(namespace, current, base, latest):
+        merged = dict(latest)
+        merged["valid_access_count"] = current["valid_access_count"] + latest["valid_access_count"] - base["valid_access_count"]
+        return merged
+
+    path = str(tmp_path / "counters.db")
+    first = AccessCounterStore(path, flush_size=100, flush_interval_seconds=3600, merge=merge)
+    second = AccessCounterStore(path, flush_size=100, flush_interval_seconds=3600, merge=merge)
+    base = _counters(1.0, 10.0, 100.0)
+    first.upsert("short", ["a"], [base])
+    first.flush()
+
+    first.upsert("short", ["a"], [_counters(2.0, 20.0, 200.0)], previous=[base])
+    first.upsert("short", ["a"], [_counters(3.0, 21.0, 210.0)], previous=[_counters(2.0, 20.0, 200.0)])
+    second.upsert("short", ["a"], [_counters(2.0, 22.0, 220.0)], previous=[base])
+    first.flush()
+    second.flush()
+
+    assert first.get_many("short", ["a"])["a"]["valid_access_count"] == 4.0
+    assert second.get_stats()["merged"] == 1
+    first.close()
+    second.close()
+
+
+def test_flush_writes_expiry_back_and_marks_synced(tmp_path):
+    written = []
+    store = AccessCounterStore(
+        str(tmp_path / "counters.db"), flush_size=100, flush_interval_seconds=3600,
+        on_flush=lambda collection, ids, expires: written.append((collection, ids, expires))
+    )
+    store.upsert("short", ["a"], [_counters(1.0, 1.0, 300.0)], collection_name="short_term_memory_e7")
+    store.upsert("short", ["b"], [_counters(1.0, 1.0, 300.0)])
+    store.flush()
+    assert written == [("short_term_memory_e7", ["a"], [300.0])]
+    # 只有未回写的记录需要在纪元轮换时找回
+    assert store.live_ids("short", now_ts=200.0) == ["b"]
+    assert store.get_stats()["unsynced"] == 1
+    store.close()
+
+
+def test_failed_write_back_leaves_rows_unsynced(tmp_path):
+    def fail(collection, ids, expires):
+        raise RuntimeError("chroma down")
+
+    store = AccessCounterStore(str(tmp_path / "counters.db"), flush_size=100, flush_interval_seconds=3600, on_flush=fail)
+    store.upsert("short", ["a"], [_counters(1.0, 1.0, 300.0)], collection_name="short_term_memory")
+    store.flush()
+    assert store.live_ids("short", now_ts=200.0) == ["a"]
+    assert store.get_stats()["write_back_failures"] == 1
+    store.close()
+
+
+def test_background_flusher_publishes_dirty_rows(tmp_path):
+    path = str(tmp_path / "counters.db")
+    writer = AccessCounterStore(path, flush_size=100, flush_interval_seconds=0.05)
+    reader = AccessCounterStore(path, flush_size=100, flush_interval_seconds=3600)
+    writer.upsert("short", ["a"], [_counters(1.0, 1.0, 300.0)])
+    deadline = time.monotonic() + 5
+    while not reader.get_many("short", ["a"]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "a" in reader.get_many("short", ["a"])
+    writer.close()
+    reader.close()
+
+
+def test_live_ids_and_purge_expired(store):
+    store.upsert("short", ["old", "live"], [_counters(1.0, 1.0, 100.0), _counters(1.0, 1.0, 300.0)])
+    store.upsert("long", ["old"], [_counters(1.0, 1.0, 100.0)])
+    assert store.live_ids("short", now_ts=200.0) == ["live"]
+    assert store.purge_expired("short", before_ts=200.0) == 1
+    assert set(store.get_many("short", ["old", "live"])) == {"live"}
+    # 其他命名空间不受影响
+    assert "old" in store.get_many("long", ["old"])
+
+
+def test_delete_and_clear(store):
+    store.upsert("short", ["a", "b"], [_counters(1.0, 1.0, 1.0)] * 2)
+    store.flush()
+    store.upsert("short", ["c"], [_counters(1.0, 1.0, 1.0)])
+    store.delete("short", ["a", "c"])
+    assert set(store.get_many("short", ["a", "b", "c"])) == {"b"}
+    store.clear("short")
+    assert store.get_many("short", ["b"]) == {}
+
+
+def test_persists_across_reopen(tmp_path):
+    path = str(tmp_path / "counters.db")
+    store = AccessCounterStore(path, flush_size=100, flush_interval_seconds=3600)
+    store.upsert("short", ["a"], [_counters(4.0, 1.0, 1.0)])
+    store.close()
+    reopened = AccessCounterStore(path)
+    assert reopened.get_many("short", ["a"])["a"]["valid_access_count"] == 4.0
+    reopened.close()
@@ -0,0 +1,51 @@
+"""
+自适应清理间隔测试：过期积压估算与间隔决策
+"""
+
+from datetime import datetime
+
+from bionicmemory.services.memory_cleanup_scheduler import MemoryCleanupScheduler
+
+
+def test_backlog_excludes_records_kept_alive_by_sidecar(make_memory_system, seed_records, tmp_path):
+    system = make_memory_system(access_counter_path=str(tmp_path / "counters.db"), access_counter_flush_seconds=0)
+    collection = system.long_term_collection_name
+    seed_records(system, collection, [{"id": f"expired-{i}", "expires_in": -60} for i in range(3)]
+                 + [{"id": f"revived-{i}", "expires_in": -60} for i in range(2)]
+                 + [{"id": "live"}])
+    now_ts = datetime.now().timestamp()
+    system.access_counters.upsert(collection, ["revived-0", "revived-1"], [{
+        "valid_access_count": 5.0, "total_access_count": 5.0, "last_updated": datetime.now().isoformat(),
+        "last_updated_ts": now_ts + 1, "expires_at": now_ts + 3600,
+    }] * 2)
+
+    scheduler = MemoryCleanupScheduler(system, adaptive=True, backlog_target=2)
+    assert scheduler._estimate_expired_backlog(collection) == 3
+    # 计数上限为 4 * backlog_target
+    assert system.estimate_expired_backlog(collection, limit=2) <= 2
+
+
+def test_backlog_uses_expiry_index_when_enabled(make_memory_system):
+    system = make_memory_system(expiry_index=True)
+    collection = system.short_term_collection_name
+    now_ts = datetime.now().timestamp()
+    system.expiry_index.push_many(collection, [("a", now_ts - 10), ("b", now_ts - 5), ("c", now_ts + 600)])
+    assert system.estimate_expired_backlog(collection, limit=100) == 2
+
+
+def test_decide_interval_tightens_on_backlog_and_relaxes_by_insert_rate(make_memory_system):
+    system = make_memory_system()
+    short_term = system.short_term_collection_name
+    scheduler = MemoryCleanupScheduler(system, adaptive=True, backlog_target=100,
+                                       short_term_min_minutes=1, short_term_max_minutes=30)
+    scheduler.current_intervals[short_term] = 1200
+
+    # 积压超过目标：至少减半
+    interval, _ = scheduler._decide_interval(short_term, {"backlog": 300, "insert_rate_per_min": 0.0})
+    assert interval == 400
+    # 写入速率作为过期速率的代理：积压增长到目标约需 100 / 20 = 5 分钟
+    interval, _ = scheduler._decide_interval(short_term, {"backlog": 0, "insert_rate_per_min": 20.0})
+    assert interval == 300
+    # 无写入时每次最多放宽一倍，并受上限约束
+    interval, _ = scheduler._decide_interval(short_term, {"backlog": 0, "insert_rate_per_min": 0.0})
+    assert interval == 1800
@@ -0,0 +1,44 @@
+"""
+管理接口鉴权测试：所有 /admin/* 接口都需要管理接口密钥
+"""
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sentence_transformers")
+
+from fastapi.testclient import TestClient
+
+from bionicmemory.api import proxy_server
+
+ADMIN_REQUESTS = [
+    ("get", "/admin/cleanup/reports"),
+    ("post", "/admin/cleanup/run"),
+    ("post", "/admin/cleanup/run?dry_run=false"),
+    ("get", "/admin/retrieval/stats"),
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(proxy_server, "ADMIN_API_KEY", "secret")
+    # 不进入lifespan，记忆系统与调度器保持未初始化
+    return TestClient(proxy_server.app)
+
+
+@pytest.mark.parametrize("method, url", ADMIN_REQUESTS)
+def test_admin_endpoints_reject_missing_or_wrong_key(client, method, url):
+    assert getattr(client, method)(url).status_code == 403
+    assert getattr(client, method)(url, headers={"Authorization": "Bearer wrong"}).status_code == 403
+
+
+@pytest.mark.parametrize("method, url", ADMIN_REQUESTS)
+def test_admin_endpoints_accept_admin_key(client, method, url):
+    # 鉴权通过后才检查初始化状态
+    response = getattr(client, method)(url, headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 503
+
+
+def test_admin_endpoints_disabled_without_configured_key(client, monkeypatch):
+    monkeypatch.setattr(proxy_server, "ADMIN_API_KEY", "")
+    assert client.get("/admin/retrieval/stats", headers={"Authorization": "Bearer "}).status_code == 403
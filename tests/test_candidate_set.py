@@ -0,0 +1,88 @@
+"""
+列式检索候选集合测试
+"""
+
+import numpy as np
+import pytest
+
+from bionicmemory.algorithms.candidate_set import CandidateSet
+
+
+def _candidates(embeddings=None):
+    ids = ["a", "b", "c"]
+    metadatas = [
+        {"valid_access_count": 2.0, "content": "A", "user_id": "u1"},
+        {"valid_access_count": 1.0, "content": "B", "user_id": "u1", "parent_id": "p"},
+        {"content": "C", "user_id": "u1"},
+    ]
+    if embeddings is None:
+        embeddings = [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]]
+    return CandidateSet.from_columns(ids, [0.1, None, 0.3], metadatas, ["sa", "sb", "sc"], embeddings)
+
+
+def test_from_columns_defaults():
+    candidates = _candidates()
+    assert len(candidates) == 3
+    assert candidates.embeddings.dtype == np.float32
+    assert candidates.embeddings.shape == (3, 2)
+    assert np.isnan(candidates.distances[1])
+    # 元数据缺少 valid_access_count 时默认为1
+    assert candidates.valid_counts.tolist() == [2.0, 1.0, 1.0]
+    assert np.isnan(candidates.timestamps).all()
+
+
+def test_from_columns_drops_records_without_embedding():
+    candidates = _candidates(embeddings=[[1.0, 0.0], None, [1.0, 1.0]])
+    assert candidates.ids == ["a", "c"]
+    assert candidates.documents == ["sa", "sc"]
+    assert candidates.valid_counts.tolist() == [2.0, 1.0]
+    assert candidates.embeddings.shape == (2, 2)
+
+
+def test_from_columns_without_embeddings():
+    candidates = _candidates(embeddings=[])
+    assert candidates.embeddings is None
+    assert len(candidates) == 3
+
+
+def test_take_keeps_order_and_aligns_columns():
+    subset = _candidates().take([2, 0])
+    assert subset.ids == ["c", "a"]
+    assert subset.documents == ["sc", "sa"]
+    assert subset.distances.tolist() == [0.3, 0.1]
+    assert np.array_equal(subset.embeddings, np.asarray([[1.0, 1.0], [1.0, 0.0]], dtype=np.float32))
+
+
+def test_with_columns_returns_new_set():
+    candidates = _candidates()
+    replaced = candidates.with_columns(valid_counts=[5.0, 6.0, 7.0], cluster_sizes=[1, 2, 3])
+    assert replaced.valid_counts.tolist() == [5.0, 6.0, 7.0]
+    assert replaced.cluster_sizes.dtype == np.int64
+    assert candidates.valid_counts.tolist() == [2.0, 1.0, 1.0]
+    assert candidates.cluster_sizes is None
+    assert replaced.ids is candidates.ids
+
+
+def test_concat_and_mismatched_embeddings():
+    candidates = _candidates()
+    combined = candidates.concat(candidates.take([0]))
+    assert combined.ids == ["a", "b", "c", "a"]
+    assert combined.embeddings.shape == (4, 2)
+    with pytest.raises(ValueError):
+        candidates.concat(_candidates(embeddings=[]))
+
+
+def test_to_records():
+    candidates = _candidates().with_columns(cluster_sizes=[1, 2, 1], timestamps=[100.0, np.nan, 300.0])
+    records = candidates.to_records(include_embedding=False)
+    assert [r["doc_id"] for r in records] == ["a", "b", "c"]
+    assert records[0]["content"] == "A"
+    assert records[0]["summary_document"] == "sa"
+    assert records[0]["last_updated_ts"] == 100.0
+    assert records[0]["embedding"] is None
+    assert records[1]["distance"] is None
+    assert records[1]["last_updated_ts"] == 0.0
+    assert records[1]["parent_id"] == "p"
+    assert "parent_id" not in records[0]
+    assert [r["cluster_size"] for r in records] == [1, 2, 1]
+    assert candidates.to_records()[2]["embedding"] == [1.0, 1.0]
@@ -0,0 +1,79 @@
+"""
+清理报告与dry-run测试：dry-run只统计不删除，报告按时间从新到旧保留
+"""
+
+import pytest
+
+from bionicmemory.services.memory_cleanup_scheduler import MemoryCleanupScheduler
+
+
+def _seed(system, seed_records):
+    seed_records(system, system.short_term_collection_name, [
+        {"id": "short-expired", "expires_in": -60},
+        {"id": "short-live"},
+    ])
+    seed_records(system, system.long_term_collection_name, [
+        {"id": "long-expired", "expires_in": -60},
+        {"id": "long-expired_chunk_0", "parent_id": "long-expired", "expires_at": None},
+        {"id": "long-live"},
+    ])
+
+
+def _ids(system, collection_name):
+    return set(system.chroma_service.get_documents(collection_name, include=[])["ids"])
+
+
+def test_dry_run_reports_without_deleting(make_memory_system, seed_records):
+    system = make_memory_system()
+    _seed(system, seed_records)
+    scheduler = MemoryCleanupScheduler(system, report_history=3)
+
+    short_report, long_report = scheduler.run_cleanup_now(dry_run=True)
+
+    assert short_report["dry_run"] and long_report["dry_run"]
+    assert (short_report["expired"], short_report["deleted"]) == (1, 0)
+    assert (long_report["expired"], long_report["chunks"], long_report["deleted"]) == (1, 1, 0)
+    assert long_report["bytes_freed"] > 0
+    assert _ids(system, system.short_term_collection_name) == {"short-expired", "short-live"}
+    assert len(_ids(system, system.long_term_collection_name)) == 3
+
+    scheduler.run_cleanup_now()
+    assert _ids(system, system.short_term_collection_name) == {"short-live"}
+    assert _ids(system, system.long_term_collection_name) == {"long-live"}
+
+    # 最近的报告在前，只保留 report_history 份
+    reports = scheduler.get_cleanup_reports()
+    assert len(reports) == 3
+    assert [report["dry_run"] for report in reports] == [False, False, True]
+    assert reports[0]["collection"] == system.long_term_collection_name
+    assert reports[0]["deleted"] == 1
+    assert scheduler.get_cleanup_reports(limit=1) == reports[:1]
+
+
+def test_cleanup_endpoint_defaults_to_dry_run(make_memory_system, seed_records, tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from bionicmemory.api import proxy_server
+
+    system = make_memory_system()
+    _seed(system, seed_records)
+    lock_path = str(tmp_path / "cleanup.lock")
+    leader = MemoryCleanupScheduler(system, leader_lock_path=lock_path)
+    assert leader.leader_lock.try_acquire()
+    follower = MemoryCleanupScheduler(system, leader_lock_path=lock_path)
+    monkeypatch.setattr(proxy_server, "ADMIN_API_KEY", "secret")
+    monkeypatch.setattr(proxy_server, "memory_cleanup_scheduler", follower)
+    client = TestClient(proxy_server.app)
+    headers = {"Authorization": "Bearer secret"}
+
+    # follower上允许dry-run，真实删除只能由leader执行
+    response = client.post("/admin/cleanup/run", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["dry_run"] is True
+    assert client.post("/admin/cleanup/run?dry_run=false", headers=headers).status_code == 409
+    assert len(_ids(system, system.long_term_collection_name)) == 3
+
+    reports = client.get("/admin/cleanup/reports", headers=headers).json()
+    assert reports["role"] == "follower"
+    assert len(reports["reports"]) == 2
+    leader.leader_lock.release()
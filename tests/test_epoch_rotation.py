@@ -0,0 +1,49 @@
+"""
+短期记忆纪元轮换测试：删除旧纪元集合前把存活记录（含旁路计数续命的记录）转入当前纪元
+"""
+
+from datetime import datetime
+
+
+def test_rotation_carries_survivors_and_drops_old_epochs(make_memory_system, seed_records, tmp_path, monkeypatch):
+    system = make_memory_system(
+        short_term_epochs=True, access_counter_path=str(tmp_path / "counters.db"), access_counter_flush_seconds=0
+    )
+    current = system._current_epoch()
+    # 固定当前纪元，避免测试跨越纪元边界
+    monkeypatch.setattr(system, "_current_epoch", lambda: current)
+    old = system._epoch_collection_name(current - 3)
+    previous = system._epoch_collection_name(current - 1)
+    write_collection = system._short_term_write_collection()
+
+    seed_records(system, old, [
+        {"id": "survivor"},
+        {"id": "expired", "expires_in": -60},
+        {"id": "revived", "expires_in": -60},
+        {"id": "already-current"},
+    ])
+    seed_records(system, previous, [{"id": "previous-expired", "expires_in": -60}])
+    seed_records(system, write_collection, [{"id": "already-current", "content": "newer copy"}])
+    # 旁路计数显示仍存活、但尚未回写ChromaDB的记录同样需要转入当前纪元
+    now_ts = datetime.now().timestamp()
+    system.access_counters.upsert(system.short_term_collection_name, ["revived"], [{
+        "valid_access_count": 5.0, "total_access_count": 5.0, "last_updated": datetime.now().isoformat(),
+        "last_updated_ts": now_ts + 1, "expires_at": now_ts + 3600,
+    }])
+
+    result = system.rotate_short_term_epochs()
+
+    assert result == {"dropped": [old], "carried": 2}
+    assert set(system._list_epoch_collections().values()) == {previous, write_collection}
+    carried = system.chroma_service.get_documents(
+        write_collection, ids=["survivor", "revived", "already-current"], include=["metadatas"]
+    )
+    metadata_by_id = dict(zip(carried["ids"], carried["metadatas"]))
+    assert set(metadata_by_id) == {"survivor", "revived", "already-current"}
+    # 转入的记录带上旁路中的最新计数；当前纪元已有的版本不被旧纪元覆盖
+    assert metadata_by_id["revived"]["valid_access_count"] == 5.0
+    assert metadata_by_id["revived"]["expires_at"] > now_ts
+    assert metadata_by_id["already-current"]["content"] == "newer copy"
+
+    # 没有更早的纪元时轮换不做任何事
+    assert system.rotate_short_term_epochs() == {"dropped": [], "carried": 0}
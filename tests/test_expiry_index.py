@@ -0,0 +1,108 @@
+"""
+短期记忆过期索引测试
+"""
+
+import threading
+
+from bionicmemory.core.expiry_index import ExpiryIndex
+
+
+def test_pop_due_in_deadline_order_and_grouped():
+    index = ExpiryIndex()
+    index.push("short", "b", 20.0)
+    index.push("short", "a", 10.0)
+    index.push("other", "c", 15.0)
+    index.push("short", "d", 99.0)
+    assert index.next_deadline() == 10.0
+    assert index.pop_due(now_ts=20.0) == {"short": ["a", "b"], "other": ["c"]}
+    assert len(index) == 1
+    assert index.next_deadline() == 99.0
+
+
+def test_pop_due_respects_limit():
+    index = ExpiryIndex()
+    index.push_many("short", [(str(i), float(i)) for i in range(10)])
+    assert index.pop_due(now_ts=100.0, limit=4) == {"short": ["0", "1", "2", "3"]}
+    assert len(index) == 6
+
+
+def test_refresh_uses_latest_deadline():
+    index = ExpiryIndex()
+    index.push("short", "a", 10.0)
+    index.push("short", "a", 50.0)
+    assert index.pop_due(now_ts=20.0) == {}
+    assert index.next_deadline() == 50.0
+    assert index.pop_due(now_ts=50.0) == {"short": ["a"]}
+    assert index.next_deadline() is None
+
+
+def test_discard_and_clear():
+    index = ExpiryIndex()
+    index.push_many("short", [("a", 1.0), ("b", 2.0)])
+    index.push("other", "c", 3.0)
+    index.discard("short", ["a"])
+    assert index.next_deadline() == 2.0
+    index.clear("short")
+    assert index.pop_due(now_ts=10.0) == {"other": ["c"]}
+    index.push("short", "d", 1.0)
+    index.clear()
+    assert len(index) == 0
+    assert index.next_deadline() is None
+
+
+def test_push_many_counts_only_changed_deadlines():
+    index = ExpiryIndex()
+    assert index.push_many("short", [("a", 1.0), ("b", 2.0)]) == 2
+    assert index.push_many("short", [("a", 1.0), ("b", 3.0), ("c", 4.0)]) == 2
+    assert len(index) == 3
+
+
+def test_compaction_bounds_heap_growth():
+    index = ExpiryIndex()
+    for i in range(5000):
+        index.push("short", "a", float(i))
+    assert len(index) == 1
+    assert len(index._heap) <= 2 * len(index) + 1024 + 1
+    assert index.pop_due(now_ts=4999.0) == {"short": ["a"]}
+
+
+def test_concurrent_pushes():
+    index = ExpiryIndex()
+
+    def worker(offset):
+        for i in range(500):
+            index.push("short", f"{offset}-{i}", float(i))
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(index) == 2000
+    due = index.pop_due(now_ts=1000.0, limit=5000)
+    assert len(due["short"]) == 2000
+
+
+def test_expire_due_records_rechecks_and_deletes(make_memory_system, seed_records):
+    system = make_memory_system(expiry_index=True)
+    collection = system.short_term_collection_name
+    seed_records(system, collection, [
+        {"id": "due", "expires_in": -60},
+        {"id": "refreshed", "expires_in": 600},
+    ])
+    # 索引中的到期时刻早于存储：复核后按存储中的遗忘时刻重新登记，而不是删除
+    system.expiry_index.push_many(collection, [("due", 1.0), ("refreshed", 1.0)])
+
+    assert system.expire_due_records(limit=10) == ["due"]
+    remaining = system.chroma_service.get_documents(collection, include=[])["ids"]
+    assert remaining == ["refreshed"]
+    assert system.expiry_index.next_deadline() > 1.0
+
+
+def test_count_due_does_not_pop():
+    index = ExpiryIndex()
+    index.push_many("short", [("a", 1.0), ("b", 2.0), ("c", 30.0)])
+    index.push("other", "d", 1.0)
+    assert index.count_due("short", now_ts=10.0) == 2
+    assert index.count_due("short", now_ts=10.0, limit=1) == 1
+    assert len(index) == 4
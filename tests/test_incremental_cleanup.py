@@ -0,0 +1,61 @@
+"""
+增量清理测试：按过期范围分页、游标持久化与重启后续扫
+"""
+
+import json
+from datetime import datetime
+
+from bionicmemory.services.memory_cleanup_scheduler import MemoryCleanupScheduler
+
+
+def _incremental_scheduler(system, cursor_path):
+    # 时间预算为0：每个tick只处理一页
+    return MemoryCleanupScheduler(
+        system, cleanup_mode="incremental", page_size=2, time_budget_ms=0, page_pause_ms=0, cursor_path=cursor_path
+    )
+
+
+def test_pages_only_expired_range_and_resumes_from_cursor(make_memory_system, seed_records, tmp_path):
+    system = make_memory_system(access_counter_path=str(tmp_path / "counters.db"), access_counter_flush_seconds=0)
+    collection = system.long_term_collection_name
+    seed_records(system, collection, [
+        {"id": "revived-1", "expires_in": -60},
+        {"id": "expired-1", "expires_in": -60},
+        {"id": "revived-2", "expires_in": -60},
+        {"id": "expired-2", "expires_in": -60},
+        {"id": "expired-3", "expires_in": -60},
+        {"id": "live-1"},
+        {"id": "live-2"},
+    ])
+    # 旁路计数显示仍存活、但尚未回写ChromaDB：留在过期范围内，复核后保留，游标需要跳过
+    now_ts = datetime.now().timestamp()
+    system.access_counters.upsert(collection, ["revived-1", "revived-2"], [{
+        "valid_access_count": 5.0, "total_access_count": 5.0, "last_updated": datetime.now().isoformat(),
+        "last_updated_ts": now_ts + 1, "expires_at": now_ts + 3600,
+    }] * 2)
+
+    cursor_path = str(tmp_path / "cursor.json")
+    scheduler = _incremental_scheduler(system, cursor_path)
+    scheduler._run_incremental_cleanup(collection)
+    first = scheduler.get_cleanup_reports()[0]
+    cursor = scheduler.cursor_store.get(collection)
+    assert first["scanned"] == 2
+    assert cursor == 2 - first["deleted"]
+    with open(cursor_path, encoding="utf-8") as f:
+        assert json.load(f) == {collection: cursor}
+
+    # 重启后从持久化的游标继续，直到处理完过期范围，游标归零
+    scheduler = _incremental_scheduler(system, cursor_path)
+    assert scheduler.cursor_store.get(collection) == cursor
+    for _ in range(5):
+        scheduler._run_incremental_cleanup(collection)
+        if scheduler.cursor_store.get(collection) == 0:
+            break
+    assert scheduler.cursor_store.get(collection) == 0
+
+    remaining = set(system.chroma_service.get_documents(collection, include=[])["ids"])
+    assert remaining == {"revived-1", "revived-2", "live-1", "live-2"}
+    reports = [first] + scheduler.get_cleanup_reports()
+    # 只读取过期范围内的候选，未过期的记录从未被读取
+    assert sum(report["scanned"] for report in reports) <= 5 + 2
+    assert sum(report["deleted"] for report in reports) == 3
@@ -0,0 +1,67 @@
+"""
+选主测试：同一锁文件上只有一个清理调度器执行清理任务，leader释放后follower接管
+"""
+
+from bionicmemory.services.leader_election import FileLeaderLock
+from bionicmemory.services.memory_cleanup_scheduler import MemoryCleanupScheduler
+
+
+def test_file_leader_lock_is_exclusive(tmp_path):
+    lock_path = str(tmp_path / "locks" / "cleanup.lock")
+    first = FileLeaderLock(lock_path)
+    second = FileLeaderLock(lock_path)
+
+    assert first.try_acquire()
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert not second.is_leader
+
+    first.release()
+    assert not first.is_leader
+    assert second.try_acquire()
+    second.release()
+
+
+def test_only_leader_runs_cleanup_jobs(make_memory_system, tmp_path):
+    system = make_memory_system()
+    lock_path = str(tmp_path / "cleanup.lock")
+    leader = MemoryCleanupScheduler(system, leader_lock_path=lock_path)
+    follower = MemoryCleanupScheduler(system, leader_lock_path=lock_path)
+    standalone = MemoryCleanupScheduler(system)
+    assert standalone.get_role() == "standalone"
+
+    calls = []
+    leader_job = leader._leader_only(lambda: calls.append("leader"), lambda: calls.append("leader-skipped"))
+    follower_job = follower._leader_only(lambda: calls.append("follower"), lambda: calls.append("follower-skipped"))
+    leader_job()
+    follower_job()
+
+    assert calls == ["leader", "follower-skipped"]
+    assert leader.get_role() == "leader"
+    assert follower.get_role() == "follower"
+
+    # leader退出后，follower在下一次任务执行时抢到锁并接管
+    leader.leader_lock.release()
+    follower_job()
+    assert calls[-1] == "follower"
+    assert follower.get_role() == "leader"
+    follower.leader_lock.release()
+
+
+def test_follower_promotion_schedules_takeover(make_memory_system, tmp_path, monkeypatch):
+    system = make_memory_system()
+    lock_path = str(tmp_path / "cleanup.lock")
+    holder = FileLeaderLock(lock_path)
+    assert holder.try_acquire()
+    scheduler = MemoryCleanupScheduler(system, leader_lock_path=lock_path)
+    promotions = []
+    monkeypatch.setattr(scheduler, "_schedule_promotion_jobs", lambda: promotions.append(True))
+    scheduler.is_running = True
+
+    assert not scheduler._refresh_leadership()
+    holder.release()
+    assert scheduler._refresh_leadership()
+    # 只有从follower变为leader时补做一次接管初始化
+    assert scheduler._refresh_leadership()
+    assert promotions == [True]
+    scheduler.leader_lock.release()
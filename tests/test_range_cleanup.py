@@ -0,0 +1,51 @@
+"""
+范围清理测试：按 expires_at 范围删除过期父记录并级联删除分块
+"""
+
+
+def _chunks(parent_id, count, user_id="user-a"):
+    # 分块记录没有 expires_at，只能随父记录一起清理
+    return [
+        {"id": f"{parent_id}_chunk_{i}", "parent_id": parent_id, "chunk_index": i, "chunk_count": count,
+         "user_id": user_id, "expires_at": None}
+        for i in range(count)
+    ]
+
+
+def test_range_cleanup_deletes_expired_parents_and_their_chunks(make_memory_system, seed_records):
+    system = make_memory_system()
+    collection = system.long_term_collection_name
+    seed_records(system, collection, [
+        {"id": "expired", "expires_in": -60, "chunk_count": 2},
+        *_chunks("expired", 2),
+        {"id": "live", "chunk_count": 2},
+        *_chunks("live", 2),
+        {"id": "expired-plain", "expires_in": -60},
+    ])
+
+    report = system._cleanup_collection(collection)
+
+    assert report.mode == "range"
+    # 范围查询只取到过期父记录，分块和未过期记录不在扫描范围内
+    assert report.scanned == report.expired == report.deleted == 2
+    assert report.chunks == 2
+    assert report.bytes_freed > 0
+    remaining = set(system.chroma_service.get_documents(collection, include=[])["ids"])
+    assert remaining == {"live", "live_chunk_0", "live_chunk_1"}
+
+
+def test_range_cleanup_scoped_to_user(make_memory_system, seed_records):
+    system = make_memory_system()
+    collection = system.long_term_collection_name
+    seed_records(system, collection, [
+        {"id": "a-expired", "expires_in": -60},
+        {"id": "b-expired", "expires_in": -60, "user_id": "user-b"},
+        *_chunks("b-expired", 1, user_id="user-b"),
+    ])
+
+    report = system._cleanup_collection(collection, user_id="user-b")
+
+    assert report.deleted == 1
+    assert report.chunks == 1
+    remaining = set(system.chroma_service.get_documents(collection, include=[])["ids"])
+    assert remaining == {"a-expired"}
@@ -0,0 +1,91 @@
+"""
+检索结果缓存测试
+"""
+
+import time
+
+from bionicmemory.core.retrieval_cache import RetrievalCache
+
+
+def test_hit_and_miss():
+    cache = RetrievalCache()
+    assert cache.get("u1", "k") is None
+    cache.put("u1", "k", "value", cache.generation("u1"))
+    assert cache.get("u1", "k") == "value"
+    assert cache.get("u2", "k") is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_user_bump_invalidates_only_that_user():
+    cache = RetrievalCache()
+    cache.put("u1", "k", "v1", cache.generation("u1"))
+    cache.put("u2", "k", "v2", cache.generation("u2"))
+    cache.bump(["u1", None])
+    assert cache.get("u1", "k") is None
+    assert cache.get("u2", "k") == "v2"
+    assert cache.get_stats()["invalidated_by_write"] == 1
+
+
+def test_global_bump_invalidates_all():
+    cache = RetrievalCache()
+    cache.put("u1", "k", "v1", cache.generation("u1"))
+    cache.put("u2", "k", "v2", cache.generation("u2"))
+    cache.bump_all()
+    assert cache.get("u1", "k") is None
+    assert cache.get("u2", "k") is None
+
+
+def test_generation_captured_before_concurrent_write_is_stale():
+    cache = RetrievalCache()
+    generation = cache.generation("u1")
+    # 检索期间其他请求写入了该用户的记忆
+    cache.bump(["u1"])
+    cache.put("u1", "k", "old", generation)
+    assert cache.get("u1", "k") is None
+
+
+def test_bump_counts_each_user_once_per_call():
+    cache = RetrievalCache()
+    cache.bump(["u1", "u1", "u1"])
+    assert cache.generation("u1") == (0, 1)
+
+
+def test_ttl_expiry():
+    cache = RetrievalCache(ttl_seconds=0.05)
+    cache.put("u1", "k", "v", cache.generation("u1"))
+    time.sleep(0.1)
+    assert cache.get("u1", "k") is None
+    assert cache.get_stats()["expired"] == 1
+
+
+def test_lru_eviction():
+    cache = RetrievalCache(max_entries=2)
+    generation = cache.generation("u1")
+    cache.put("u1", "a", 1, generation)
+    cache.put("u1", "b", 2, generation)
+    assert cache.get("u1", "a") == 1
+    cache.put("u1", "c", 3, generation)
+    assert cache.get("u1", "b") is None
+    assert cache.get("u1", "a") == 1
+    assert cache.get("u1", "c") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_cache_hit_records_access_in_background(make_memory_system):
+    system = make_memory_system(retrieval_cache_size=8)
+    first = system.process_user_message("我下周要去杭州出差", "user-a")
+    second = system.process_user_message("我下周要去杭州出差", "user-a")
+    assert second[1] == first[1]
+    assert system.get_retrieval_stats()["retrieval_cache"]["hits"] == 1
+
+    # 命中不阻塞请求，访问记录在后台写入后与完整流程的计数一致
+    assert system.flush_pending_writes(timeout=10)
+    doc_id = system._generate_md5("我下周要去杭州出差", "user-a")
+    metadata = system.chroma_service.get_documents(system.long_term_collection_name, ids=[doc_id])["metadatas"][0]
+    assert metadata["total_access_count"] == 2
+    assert system.get_retrieval_stats()["retrieval_cache"]["hit_access_recorded"] == 1
+    # 命中时的写入不会使缓存项失效
+    system.process_user_message("我下周要去杭州出差", "user-a")
+    assert system.get_retrieval_stats()["retrieval_cache"]["hits"] == 2
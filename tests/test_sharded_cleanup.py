@@ -0,0 +1,67 @@
+"""
+分片并行清理测试：按用户分桶分片后删除的记录与单线程范围清理一致
+"""
+
+from datetime import datetime, timedelta
+
+from bionicmemory.algorithms.newton_cooling_helper import CoolingRate
+from bionicmemory.services.memory_cleanup_scheduler import MemoryCleanupScheduler
+
+
+def _seed_users(system, seed_records, collection):
+    old = datetime.now() - timedelta(days=365)
+    records = []
+    for n in range(12):
+        user_id = f"user-{n}"
+        records += [
+            {"id": f"{user_id}-expired", "user_id": user_id, "expires_in": -60},
+            {"id": f"{user_id}-expired_chunk_0", "user_id": user_id, "parent_id": f"{user_id}-expired",
+             "expires_at": None},
+            {"id": f"{user_id}-live", "user_id": user_id},
+        ]
+    # 尚未回填 expires_at 的历史记录：分片清理按衰减值判定
+    records.append({
+        "id": "legacy", "user_id": "user-legacy", "expires_at": None, "valid_access_count": 1e-6,
+        "last_updated": old.isoformat(), "last_updated_ts": old.timestamp(),
+    })
+    seed_records(system, collection, records)
+
+
+def test_sharded_cleanup_deletes_expired_records_across_buckets(make_memory_system, seed_records):
+    system = make_memory_system()
+    collection = system.long_term_collection_name
+    _seed_users(system, seed_records, collection)
+    # 用户分布在多个分桶，清理需要跨分片进行
+    assert len({system._user_bucket(f"user-{n}") for n in range(12)}) > 1
+    scheduler = MemoryCleanupScheduler(system, cleanup_workers=4, cleanup_partitions=4)
+
+    report = scheduler._run_full_cleanup(collection, CoolingRate.DAYS_31, system.long_term_threshold)
+
+    assert report["mode"] == "partition"
+    assert report["deleted"] == 13
+    assert report["chunks"] == 12
+    remaining = set(system.chroma_service.get_documents(collection, include=[])["ids"])
+    assert remaining == {f"user-{n}-live" for n in range(12)}
+
+    partitions = scheduler.last_partition_reports[collection]["partitions"]
+    assert sorted(partition["partition"] for partition in partitions) == [0, 1, 2, 3]
+    assert all("error" not in partition for partition in partitions)
+    # 每条记录只属于一个分片，分片扫描数之和等于集合记录数
+    assert sum(partition["scanned"] for partition in partitions) == 12 * 3 + 1
+
+
+def test_sharded_cleanup_matches_range_cleanup(make_memory_system, seed_records):
+    system = make_memory_system()
+    collection = system.long_term_collection_name
+    _seed_users(system, seed_records, collection)
+    scheduler = MemoryCleanupScheduler(system, cleanup_workers=4, cleanup_partitions=4)
+
+    sharded = scheduler._run_full_cleanup(
+        collection, CoolingRate.DAYS_31, system.long_term_threshold, dry_run=True
+    )
+    ranged = system._cleanup_collection(collection, dry_run=True)
+
+    # 除缺少 expires_at 的历史记录外，两种方式判定的过期记录与级联分块一致
+    assert sharded["expired"] == ranged.expired + 1
+    assert sharded["chunks"] == ranged.chunks == 12
+    assert sharded["deleted"] == ranged.deleted == 0
@@ -0,0 +1,70 @@
+"""
+短期记忆快照测试：保存后恢复记录与向量，按停机时长衰减并丢弃过期记录，恢复后删除快照文件
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+def _seed(system, seed_records):
+    old = datetime.now() - timedelta(days=1)
+    seed_records(system, system.short_term_collection_name, [
+        {"id": "kept-1", "valid_access_count": 5.0},
+        {"id": "kept-2", "user_id": "user-b", "valid_access_count": 5.0},
+        {"id": "decayed", "valid_access_count": 1e-6, "last_updated": old.isoformat(), "last_updated_ts": old.timestamp()},
+    ])
+
+
+def test_snapshot_round_trip(make_memory_system, seed_records, tmp_path):
+    system = make_memory_system()
+    _seed(system, seed_records)
+    collection = system.short_term_collection_name
+    before = system.chroma_service.get_documents(collection, ids=["kept-1", "kept-2"], include=["embeddings"])
+    path = str(tmp_path / "snapshots" / "short_term.npz")
+
+    # 快照时已衰减到阈值以下的记录不写入
+    assert system.snapshot_short_term_memory(path) == 2
+    system.reset_short_term_memory()
+    assert system.chroma_service.count_documents(collection) == 0
+
+    stats = system.restore_short_term_memory(path)
+
+    assert stats == {"total": 2, "restored": 2, "expired": 0}
+    assert not os.path.exists(path)
+    restored = system.chroma_service.get_documents(
+        collection, ids=["kept-1", "kept-2"], include=["documents", "metadatas", "embeddings"]
+    )
+    by_id = {doc_id: i for i, doc_id in enumerate(restored["ids"])}
+    assert set(by_id) == {"kept-1", "kept-2"}
+    assert restored["metadatas"][by_id["kept-2"]]["user_id"] == "user-b"
+    assert restored["documents"][by_id["kept-1"]] == "content of kept-1"
+    for i, doc_id in enumerate(before["ids"]):
+        np.testing.assert_allclose(restored["embeddings"][by_id[doc_id]], before["embeddings"][i], atol=1e-6)
+    for metadata in restored["metadatas"]:
+        assert 0 < metadata["valid_access_count"] <= 5.0
+        assert metadata["expires_at"] > datetime.now().timestamp()
+
+
+def test_restore_drops_records_expired_during_downtime(make_memory_system, seed_records, tmp_path):
+    system = make_memory_system()
+    _seed(system, seed_records)
+    path = str(tmp_path / "short_term.npz")
+    system.snapshot_short_term_memory(path)
+    system.reset_short_term_memory()
+
+    # 模拟停机一天：快照时刻前移后，恢复时按停机时长衰减，全部过期
+    with np.load(path, allow_pickle=False) as data:
+        embeddings = data["embeddings"]
+        snapshot = json.loads(str(data["records"]))
+    snapshot["saved_at"] -= 86400
+    with open(path, "wb") as f:
+        np.savez(f, embeddings=embeddings, records=np.array(json.dumps(snapshot)))
+
+    stats = system.restore_short_term_memory(path)
+
+    assert stats == {"total": 2, "restored": 0, "expired": 2}
+    assert system.chroma_service.count_documents(system.short_term_collection_name) == 0
+    assert not os.path.exists(path)
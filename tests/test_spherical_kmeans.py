@@ -0,0 +1,69 @@
+"""
+球面k-means聚类测试
+"""
+
+import numpy as np
+import pytest
+
+from bionicmemory.algorithms.spherical_kmeans import SphericalKMeans, normalize_rows
+
+
+def _blobs(centers, per_cluster=20, noise=0.05, seed=0):
+    """围绕给定方向生成带噪声的样本"""
+    rng = np.random.default_rng(seed)
+    centers = np.asarray(centers, dtype=np.float64)
+    X = np.vstack([c + noise * rng.normal(size=(per_cluster, centers.shape[1])) for c in centers])
+    y = np.repeat(np.arange(len(centers)), per_cluster)
+    return X, y
+
+
+def test_normalize_rows_unit_norm_and_zero_row():
+    X = np.array([[3.0, 4.0], [0.0, 0.0]])
+    normalized = normalize_rows(X)
+    assert np.allclose(normalized[0], [0.6, 0.8])
+    assert np.all(np.isfinite(normalized[1]))
+
+
+def test_separates_orthogonal_directions():
+    X, y = _blobs(np.eye(3) * 5.0)
+    labels = SphericalKMeans(n_clusters=3, n_init=3).fit_predict(X)
+    # 每个真实簇只对应一个标签，且标签两两不同
+    label_sets = [set(labels[y == cluster].tolist()) for cluster in range(3)]
+    assert all(len(label_set) == 1 for label_set in label_sets)
+    assert len(set.union(*label_sets)) == 3
+
+
+def test_scale_invariant():
+    X, _ = _blobs(np.eye(3))
+    scales = np.random.default_rng(1).uniform(0.1, 10.0, size=(len(X), 1))
+    labels = SphericalKMeans(n_clusters=3, random_state=7).fit_predict(X)
+    scaled_labels = SphericalKMeans(n_clusters=3, random_state=7).fit_predict(X * scales)
+    assert np.array_equal(labels, scaled_labels)
+
+
+def test_centers_unit_norm_and_clusters_capped_by_samples():
+    X = np.random.default_rng(2).normal(size=(4, 8))
+    model = SphericalKMeans(n_clusters=10).fit(X)
+    assert model.cluster_centers_.shape == (4, 8)
+    assert np.allclose(np.linalg.norm(model.cluster_centers_, axis=1), 1.0, atol=1e-5)
+    assert model.labels_.shape == (4,)
+
+
+def test_deterministic_with_seed():
+    X = np.random.default_rng(3).normal(size=(60, 16))
+    first = SphericalKMeans(n_clusters=5, random_state=11).fit_predict(X)
+    second = SphericalKMeans(n_clusters=5, random_state=11).fit_predict(X)
+    assert np.array_equal(first, second)
+
+
+def test_warm_start_converges_quickly():
+    X, _ = _blobs(np.eye(4) * 3.0, seed=4)
+    cold = SphericalKMeans(n_clusters=4, n_init=3).fit(X)
+    warm = SphericalKMeans(n_clusters=4, init=cold.cluster_centers_).fit(X)
+    assert warm.n_iter_ <= cold.n_iter_
+    assert np.array_equal(warm.labels_, cold.labels_)
+
+
+def test_empty_input_raises():
+    with pytest.raises(ValueError):
+        SphericalKMeans(n_clusters=2).fit(np.empty((0, 3)))
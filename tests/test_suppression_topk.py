@@ -0,0 +1,59 @@
+"""
+抑制策略topK选择测试
+"""
+
+import numpy as np
+
+from bionicmemory.algorithms.suppression_strategy import (
+    PARTITION_MIN_SIZE,
+    dual_topk_indices,
+    similarity_softmax,
+    stable_topk_indices,
+)
+
+
+def test_stable_topk_matches_stable_argsort():
+    rng = np.random.default_rng(0)
+    for n in (1, 5, PARTITION_MIN_SIZE - 1, PARTITION_MIN_SIZE, 1000):
+        # 取值范围小，保证存在大量并列
+        keys = rng.integers(0, 10, size=n).astype(np.float64)
+        for k in (1, 3, n // 2, n, n + 5):
+            expected = np.argsort(keys, kind="stable")[:k]
+            assert np.array_equal(stable_topk_indices(keys, k), expected), (n, k)
+
+
+def test_stable_topk_empty_and_nonpositive_k():
+    assert stable_topk_indices(np.array([1.0, 2.0]), 0).size == 0
+    assert stable_topk_indices(np.array([1.0, 2.0]), -1).size == 0
+    assert stable_topk_indices(np.array([]), 3).size == 0
+
+
+def test_dual_topk_relevance_first_then_counts():
+    distances = np.array([0.5, 0.1, 0.9, 0.3])
+    counts = np.array([1.0, 2.0, 10.0, 5.0])
+    # 相关度一路：1、3；计数一路：2、3（3已选中，去重）
+    assert dual_topk_indices(distances, counts, 2).tolist() == [1, 3, 2]
+
+
+def test_dual_topk_nan_distance_is_farthest():
+    distances = np.array([np.nan, 0.2, 0.4])
+    counts = np.array([0.0, 1.0, 2.0])
+    assert dual_topk_indices(distances, counts, 2).tolist() == [1, 2]
+
+
+def test_dual_topk_large_input_matches_reference():
+    rng = np.random.default_rng(1)
+    distances = rng.random(500)
+    counts = rng.integers(0, 20, size=500).astype(np.float64)
+    k = 10
+    by_relevance = np.argsort(distances, kind="stable")[:k].tolist()
+    by_count = [i for i in np.argsort(-counts, kind="stable")[:k].tolist() if i not in by_relevance]
+    assert dual_topk_indices(distances, counts, k).tolist() == by_relevance + by_count
+
+
+def test_similarity_softmax():
+    probabilities = similarity_softmax(np.array([0.1, 0.5, np.nan]))
+    assert np.isclose(probabilities.sum(), 1.0)
+    expected = np.exp([0.9, 0.5, 0.0])
+    assert np.allclose(probabilities, expected / expected.sum())
+    assert similarity_softmax(np.array([])).size == 0
@@ -0,0 +1,48 @@
+"""
+分级检索测试：短期命中的相似度按集合的 hnsw:space 由距离换算
+"""
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("space", [None, "l2", "cosine", "ip"])
+def test_short_term_similarity_matches_cosine_for_each_space(make_memory_system, tmp_path, space):
+    chromadb = pytest.importorskip("chromadb")
+    # 先按指定距离空间建好短期集合，记忆系统初始化时沿用已有集合
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    client.create_collection("short_term_memory", metadata={"hnsw:space": space} if space else None)
+    del client
+    system = make_memory_system()
+    assert system.chroma_service.get_distance_space("short_term_memory") == (space or "l2")
+
+    rng = np.random.default_rng(7)
+    query = rng.normal(size=16)
+    query /= np.linalg.norm(query)
+    # 与查询余弦相似度约0.85的近邻：l2空间下 1 - distance 只有约0.7，会被误判为未命中
+    noise = rng.normal(size=16)
+    noise -= noise.dot(query) * query
+    noise /= np.linalg.norm(noise)
+    neighbour = 0.85 * query + np.sqrt(1 - 0.85 ** 2) * noise
+    embeddings = [neighbour, noise, -query]
+    if space == "ip":
+        # 内积空间只对单位向量等价于余弦，非单位向量需除以模长
+        embeddings = [embedding * 3.0 for embedding in embeddings]
+    system.chroma_service.add_documents(
+        "short_term_memory",
+        documents=["near", "orthogonal", "opposite"],
+        embeddings=[embedding.tolist() for embedding in embeddings],
+        ids=["near", "orthogonal", "opposite"],
+        metadatas=[{"user_id": "user-a"}] * 3
+    )
+
+    results = system.chroma_service.query_documents(
+        "short_term_memory", query_embeddings=[query.tolist()], n_results=3
+    )
+    for doc_id, distance, embedding in zip(results["ids"][0], results["distances"][0], results["embeddings"][0]):
+        record = {"doc_id": doc_id, "distance": distance, "embedding": list(embedding)}
+        expected = float(np.dot(query, embedding) / np.linalg.norm(embedding))
+        assert system._short_term_similarity(record, query.tolist()) == pytest.approx(expected, abs=1e-4)
+
+    near = {"distance": results["distances"][0][0], "embedding": None}
+    assert system._short_term_similarity(near, query.tolist()) >= system.tiered_similarity_threshold
@@ -0,0 +1,112 @@
+"""
+记忆写入后台写回队列测试
+"""
+
+import threading
+
+import pytest
+
+from bionicmemory.core.write_behind import WriteBehindQueue
+
+
+def test_batches_preserve_submission_order():
+    applied = []
+    queue = WriteBehindQueue(applied.extend, batch_size=4)
+    for i in range(20):
+        queue.submit("add", i)
+    assert queue.flush(timeout=5)
+    assert applied == [("add", i) for i in range(20)]
+    stats = queue.get_stats()
+    assert stats["applied"] == 20
+    assert stats["pending"] == 0
+    assert stats["avg_batch_size"] <= 4
+    queue.close()
+
+
+def test_failed_batch_does_not_stop_worker():
+    applied = []
+
+    def apply_batch(batch):
+        if any(kind == "bad" for kind, _ in batch):
+            raise RuntimeError("boom")
+        applied.extend(batch)
+
+    queue = WriteBehindQueue(apply_batch, batch_size=1, max_retries=2, retry_delay_seconds=0)
+    queue.submit("bad", 0)
+    queue.submit("add", 1)
+    assert queue.flush(timeout=5)
+    assert applied == [("add", 1)]
+    stats = queue.get_stats()
+    # 整批重试两次后丢弃
+    assert stats["retried"] == 2
+    assert stats["failed"] == 1
+    assert stats["last_error"] == "boom"
+    queue.close()
+
+
+def test_only_returned_failures_are_retried():
+    attempts = []
+
+    def apply_batch(batch):
+        attempts.append(list(batch))
+        # 第一次只有 flaky 失败，重试时成功
+        return [op for op in batch if op[0] == "flaky"] if len(attempts) == 1 else None
+
+    queue = WriteBehindQueue(apply_batch, batch_size=8, retry_delay_seconds=0)
+    queue.submit("add", 0)
+    queue.submit("flaky", 1)
+    assert queue.flush(timeout=5)
+    assert attempts == [[("add", 0), ("flaky", 1)], [("flaky", 1)]]
+    stats = queue.get_stats()
+    assert (stats["applied"], stats["retried"], stats["failed"]) == (2, 1, 0)
+    queue.close()
+
+
+def test_full_queue_blocks_submitter():
+    started = threading.Event()
+    release = threading.Event()
+    applied = []
+
+    def apply_batch(batch):
+        started.set()
+        release.wait(5)
+        applied.extend(batch)
+
+    queue = WriteBehindQueue(apply_batch, max_pending=1, batch_size=1)
+    queue.submit("add", 0)
+    # 等待刷写线程取走第一个写操作并阻塞在处理函数中
+    assert started.wait(5)
+    queue.submit("add", 1)
+
+    submitted = threading.Event()
+    blocked = threading.Thread(target=lambda: (queue.submit("add", 2), submitted.set()))
+    blocked.start()
+    assert not submitted.wait(0.1)
+    release.set()
+    blocked.join(5)
+    assert submitted.is_set()
+    assert queue.flush(timeout=5)
+    assert applied == [("add", 0), ("add", 1), ("add", 2)]
+    assert queue.get_stats()["blocked_submits"] == 1
+    queue.close()
+
+
+def test_flush_timeout():
+    release = threading.Event()
+    queue = WriteBehindQueue(lambda batch: release.wait(5))
+    queue.submit("add", 0)
+    assert queue.flush(timeout=0.05) is False
+    release.set()
+    assert queue.flush(timeout=5)
+    queue.close()
+
+
+def test_close_drains_and_rejects_new_writes():
+    applied = []
+    queue = WriteBehindQueue(applied.extend, batch_size=2)
+    for i in range(5):
+        queue.submit("add", i)
+    queue.close()
+    assert len(applied) == 5
+    with pytest.raises(RuntimeError):
+        queue.submit("add", 5)
@@ -0,0 +1,99 @@
+"""
+ChromaDB写入合并测试
+"""
+
+import threading
+
+import pytest
+
+from bionicmemory.core.write_coalescer import PendingWrite, WriteCoalescer
+
+
+class RecordingExecutor:
+    """记录每次批量调用的执行函数"""
+
+    def __init__(self, fail_ids=()):
+        self.calls = []
+        self.fail_ids = set(fail_ids)
+        self.lock = threading.Lock()
+
+    def __call__(self, collection_name, operation, columns):
+        if self.fail_ids & set(columns["ids"]):
+            raise RuntimeError("write failed")
+        with self.lock:
+            self.calls.append((collection_name, operation, columns))
+
+
+def test_concurrent_writes_are_merged():
+    executor = RecordingExecutor()
+    coalescer = WriteCoalescer(executor, max_delay_ms=50, max_batch_records=1000)
+    futures = [coalescer.submit("c", "add", [f"id{i}"], documents=[f"d{i}"]) for i in range(10)]
+    for future in futures:
+        future.result(timeout=5)
+    assert len(executor.calls) == 1
+    _, operation, columns = executor.calls[0]
+    assert operation == "add"
+    assert columns["ids"] == [f"id{i}" for i in range(10)]
+    assert columns["documents"] == [f"d{i}" for i in range(10)]
+    assert columns["metadatas"] is None
+    stats = coalescer.get_stats()
+    assert stats["store_calls"] == 1
+    assert stats["writes_per_call"] == 10
+    coalescer.close()
+
+
+def test_segments_preserve_per_id_order():
+    coalescer = WriteCoalescer(RecordingExecutor(), max_delay_ms=1000)
+    coalescer.close()
+    writes = [
+        PendingWrite("add", ["a"], None, None, None),
+        PendingWrite("update", ["a"], None, None, None),
+        PendingWrite("add", ["b"], None, None, None),
+        PendingWrite("delete", ["a"], None, None, None),
+        PendingWrite("add", ["c"], None, None, None),
+    ]
+    segments = coalescer._segments(writes)
+    # 不同ID的add合并进第一段，a上的 add -> update -> delete 顺序不变
+    assert [[w.ids for w in segment] for segment in segments] == [[["a"], ["b"], ["c"]], [["a"]], [["a"]]]
+    assert [segment[0].operation for segment in segments] == ["add", "update", "delete"]
+
+
+def test_batch_size_limit_triggers_immediate_write():
+    executor = RecordingExecutor()
+    coalescer = WriteCoalescer(executor, max_delay_ms=10000, max_batch_records=3)
+    futures = [coalescer.submit("c", "delete", [f"id{i}"]) for i in range(3)]
+    for future in futures:
+        future.result(timeout=5)
+    assert len(executor.calls) == 1
+    coalescer.close()
+
+
+def test_failure_only_affects_failing_write():
+    executor = RecordingExecutor(fail_ids={"bad"})
+    coalescer = WriteCoalescer(executor, max_delay_ms=50)
+    good = coalescer.submit("c", "delete", ["ok1"])
+    bad = coalescer.submit("c", "delete", ["bad"])
+    other = coalescer.submit("c", "delete", ["ok2"])
+    assert good.result(timeout=5) == ["ok1"]
+    assert other.result(timeout=5) == ["ok2"]
+    with pytest.raises(RuntimeError):
+        bad.result(timeout=5)
+    assert coalescer.get_stats()["failed"] == 1
+    coalescer.close()
+
+
+def test_flush_and_close():
+    executor = RecordingExecutor()
+    coalescer = WriteCoalescer(executor, max_delay_ms=10000)
+    coalescer.submit("c1", "delete", ["a"])
+    coalescer.submit("c2", "delete", ["b"])
+    coalescer.flush("c1")
+    assert any(call[0] == "c1" for call in executor.calls)
+    coalescer.flush()
+    assert {call[0] for call in executor.calls} == {"c1", "c2"}
+    assert coalescer.get_stats()["pending_records"] == 0
+    coalescer.submit("c1", "delete", ["c"])
+    coalescer.close()
+    assert executor.calls[-1][2]["ids"] == ["c"]
+    with pytest.raises(RuntimeError):
+        coalescer.submit("c1", "delete", ["d"])